@@ -2,35 +2,62 @@
 
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.ext.asyncio import AsyncSession
 from jose import JWTError
 from pydantic import UUID4
 
-from app.db.session import get_db_session
+from app.db.session import get_db_session, get_read_db_session, get_primary_read_db_session # noqa: F401 - endpoints use them as deps.get_db_session
 from app.core.security import decode_token, TokenPayload
-from app.models.user import User
+from app.core.config import settings
+from app.models.user import User, Principal
 from app.crud import crud_user # Assuming you have a crud_user.py
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login") # Path to your login endpoint
 
-async def get_current_user(
-    db: AsyncSession = Depends(get_db_session), token: str = Depends(oauth2_scheme)
-) -> User: # Returns a Pydantic User model
+async def get_current_user(token: str = Depends(oauth2_scheme)) -> User: # Returns a Pydantic User model
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
     token_data = decode_token(token)
-    if token_data is None or token_data.user_id is None:
+    # Refresh tokens are signed with the same key but are only good for /auth/refresh-token
+    if token_data is None or token_data.user_id is None or token_data.type != "access":
         raise credentials_exception
-    
-    user_dict = await crud_user.get_user_by_id(db, user_id=UUID4(token_data.user_id))
+
+    # Cache hit means no DB round trip
+    user = crud_user.principal_cache.get(token_data.user_id)
+    if user is not None:
+        return user
+
+    # Through the shared primary loader: a burst of requests from the same or other users costs one query
+    user_dict = await crud_user.load_principal(token_data.user_id)
     if user_dict is None:
         raise credentials_exception
     
-    # Convert dict to Pydantic model User (excluding password_hash)
-    return User(**user_dict)
+    # Convert dict to Pydantic model User
+    user = User(**user_dict)
+    crud_user.principal_cache.set(user.id, user)
+    return user
+
+async def get_current_principal(token: str = Depends(oauth2_scheme)) -> Principal:
+    """
+    For endpoints that only need the caller's id and role.
+    With TRUST_TOKEN_CLAIMS on, these come straight from the (signed, unexpired) JWT.
+    """
+    if not settings.TRUST_TOKEN_CLAIMS:
+        return await get_current_user(token=token) # User has every Principal field
+
+    token_data = decode_token(token)
+    if (
+        token_data is None or token_data.type != "access"
+        or token_data.user_id is None or token_data.sub is None or token_data.role is None
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return Principal(id=token_data.user_id, username=token_data.sub, role=token_data.role)
 
 async def get_current_active_user(current_user: User = Depends(get_current_user)) -> User:
     # Add logic here if users can be deactivated
@@ -4,13 +4,25 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import timedelta
 
 from app.api import deps
-from app.crud import crud_user
-from app.models.user import UserCreate, User as PydanticUser, Token
-from app.core.security import create_access_token, create_refresh_token, verify_password
+from app.api.responses import model_response
+from app.crud import crud_user, crud_refresh_token
+from app.models.user import UserCreate, User as PydanticUser, Token, Principal, RefreshTokenRequest, LogoutRequest
+from app.core.security import create_access_token, decode_token
+from app.core.hashing import HashQueueFullError, verify_and_update_password
 from app.core.config import settings
 
 router = APIRouter()
 
+# bcrypt hash of a random password, at the default cost of security.pwd_context() (12 rounds)
+_DUMMY_PASSWORD_HASH = "$2b$12$PPTd0n7iAIx9mg1rpd.xzeJFPdK/SGxr/aUSK/wkNhw8aokCM7lU2"
+
+def _hashers_busy() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Server is busy, please retry shortly.",
+        headers={"Retry-After": "1"},
+    )
+
 @router.post("/register", response_model=PydanticUser, status_code=status.HTTP_201_CREATED)
 async def register_new_user(
     user_in: UserCreate,
@@ -19,40 +31,49 @@ async def register_new_user(
     """
     Create new user.
     """
-    db_user_by_email = await crud_user.get_user_by_email(db, email=user_in.email)
-    if db_user_by_email:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="User with this email already exists.",
-        )
-    db_user_by_username = await crud_user.get_user_by_username(db, username=user_in.username)
-    if db_user_by_username:
+    try:
+        created_user_dict = await crud_user.create_user(db=db, user_in=user_in)
+    except crud_user.UserAlreadyExistsError as exc:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail="User with this username already exists.",
+            detail=f"User with this {exc.field} already exists.",
         )
-    
-    created_user_dict = await crud_user.create_user(db=db, user_in=user_in)
+    except HashQueueFullError:
+        raise _hashers_busy()
     if not created_user_dict:
          raise HTTPException(status_code=500, detail="Could not create user.")
-    return PydanticUser(**created_user_dict)
+    return model_response(PydanticUser, created_user_dict, status_code=status.HTTP_201_CREATED)
 
 
 @router.post("/login", response_model=Token)
 async def login_for_access_token(
-    db: AsyncSession = Depends(deps.get_db_session),
+    # Primary (a user who just registered must be found), and no connection held while bcrypt runs
+    read_db: AsyncSession = Depends(deps.get_primary_read_db_session),
+    db: AsyncSession = Depends(deps.get_db_session), # Checked out after the password check, to store the refresh token
     form_data: OAuth2PasswordRequestForm = Depends() # username and password from form
 ):
     """
     OAuth2 compatible token login, get an access token for future requests.
     """
-    user_dict = await crud_user.get_user_by_username(db, username=form_data.username)
-    if not user_dict or not verify_password(form_data.password, user_dict["password_hash"]):
+    user_dict = await crud_user.get_user_by_username(read_db, username=form_data.username)
+    try:
+        if user_dict:
+            is_valid, new_hash = await verify_and_update_password(form_data.password, user_dict["password_hash"])
+        else:
+            # Same bcrypt work as a real check, so response time doesn't tell which usernames exist
+            await verify_and_update_password(form_data.password, _DUMMY_PASSWORD_HASH)
+            is_valid, new_hash = False, None
+    except HashQueueFullError:
+        raise _hashers_busy()
+    if not is_valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
+    if new_hash:
+        # Stored hash uses outdated bcrypt settings; upgrade it now that we know the password
+        await crud_user.update_user_password_hash(db, user_id=user_dict["id"], password_hash=new_hash)
     
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
@@ -61,16 +82,8 @@ async def login_for_access_token(
         role=user_dict["role"],
         expires_delta=access_token_expires
     )
-    
-    refresh_token_expires = timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
-    refresh_token = create_refresh_token(
-        subject=user_dict["username"],
-        user_id=user_dict["id"],
-        role=user_dict["role"],
-        expires_delta=refresh_token_expires
-    )
-    # Here you might want to store the refresh_token (hashed) in the DB (e.g., in 'refresh_tokens' table)
-    # For simplicity now, just returning it.
+    # Stored hashed; each login starts its own token family (one per device/session)
+    refresh_token = await crud_refresh_token.issue_refresh_token(db, user_id=user_dict["id"])
 
     return {
         "access_token": access_token,
@@ -80,44 +93,30 @@ async def login_for_access_token(
 
 @router.post("/refresh-token", response_model=Token)
 async def refresh_access_token(
-    # In a real app, you'd validate the refresh token against a DB store
-    # and ensure it's not revoked.
-    # For this example, we'll assume the refresh token is passed in a header or body.
-    # Let's assume it's passed in the body for simplicity.
-    refresh_token_body: str, # Simplified: In reality, use a Pydantic model for the request body
+    body: RefreshTokenRequest,
     db: AsyncSession = Depends(deps.get_db_session)
 ):
     """
-    Refresh an access token using a refresh token.
-    A more robust implementation would:
-    1. Expect refresh token in Authorization header (e.g., Bearer <refresh_token>) or secure cookie.
-    2. Decode the refresh token.
-    3. Check if the refresh token is present (hashed) in the database and not revoked.
-    4. If valid, issue a new access token (and optionally a new refresh token - token rotation).
-    5. Invalidate the old refresh token if rotating.
+    Exchange a refresh token for a new access token and a new refresh token (rotation).
+    The old refresh token stops working; presenting it again revokes the whole session.
     """
-    from app.core.security import decode_token # Import locally to avoid circular dependency if deps imports this
-    
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate refresh token",
         headers={"WWW-Authenticate": "Bearer"},
     )
     
-    token_data = decode_token(refresh_token_body) # Use the raw refresh token string
-    
-    if not token_data or token_data.user_id is None or getattr(token_data, 'type', None) != 'refresh':
+    token_data = decode_token(body.refresh_token)
+    if not token_data or token_data.user_id is None or token_data.type != "refresh":
         raise credentials_exception
 
-    user_dict = await crud_user.get_user_by_id(db, user_id=token_data.user_id)
-    if not user_dict:
+    try:
+        rotated = await crud_refresh_token.rotate_refresh_token(db, body.refresh_token, token_data)
+    except crud_refresh_token.RefreshTokenReuseError:
         raise credentials_exception
-
-    # Check if refresh token is in DB and valid (if you implement DB storage for refresh tokens)
-    # For example:
-    # stored_refresh_token = await crud_refresh_token.get_by_user_id_and_verify(db, user_id=token_data.user_id, token_to_check=refresh_token_body)
-    # if not stored_refresh_token:
-    #     raise credentials_exception
+    if rotated is None:
+        raise credentials_exception
+    user_dict, new_refresh_token = rotated
 
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     new_access_token = create_access_token(
@@ -126,27 +125,28 @@ async def refresh_access_token(
         role=user_dict["role"],
         expires_delta=access_token_expires
     )
-    
-    # Optionally, issue a new refresh token (token rotation)
-    # new_refresh_token = create_refresh_token(...)
-    # await crud_refresh_token.revoke(db, old_refresh_token)
-    # await crud_refresh_token.store(db, new_refresh_token_hashed, user_id, expiry)
 
     return {
         "access_token": new_access_token,
-        "refresh_token": refresh_token_body, # or new_refresh_token if rotating
+        "refresh_token": new_refresh_token,
         "token_type": "bearer",
     }
 
-@router.post("/logout") # Placeholder
+@router.post("/logout")
 async def logout(
-    # Invalidate refresh token if stored server-side
-    # Client should discard tokens
-    current_user: PydanticUser = Depends(deps.get_current_active_user)
+    body: LogoutRequest,
+    db: AsyncSession = Depends(deps.get_db_session),
+    current_user: Principal = Depends(deps.get_current_principal)
 ):
     """
-    Logout user. (Client-side token discard is primary. Server-side for refresh token invalidation).
-    If you store refresh tokens in the DB, mark the used one as revoked.
+    Logout: revoke the session `refresh_token` belongs to, or with `all_sessions` every session
+    of the user. Access tokens already issued stay valid until they expire; clients should discard them.
     """
-    # Example: await crud_refresh_token.revoke_for_user(db, user_id=current_user.id)
-    return {"message": "Successfully logged out. Please discard your tokens."}
\ No newline at end of file
+    if not body.all_sessions and body.refresh_token is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Provide refresh_token or set all_sessions."
+        )
+    revoked = await crud_refresh_token.revoke_refresh_tokens(
+        db, user_id=current_user.id, token=None if body.all_sessions else body.refresh_token
+    )
+    return {"message": "Successfully logged out. Please discard your tokens.", "revoked_tokens": revoked}
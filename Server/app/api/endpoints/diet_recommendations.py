@@ -0,0 +1,72 @@
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from pydantic import UUID4
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api import deps
+from app.core.jobs import Job, QueueFullError
+from app.crud import crud_diet_recommendation
+from app.models.diet_recommendation import DietRecommendation, DietRecommendationJob
+from app.models.user import Principal
+
+router = APIRouter()
+
+def _job_response(job: Job) -> DietRecommendationJob:
+    return DietRecommendationJob(
+        job_id=job.id,
+        status=job.status,
+        recommendation=DietRecommendation(**job.result) if job.status == Job.SUCCEEDED else None,
+        error=job.error,
+    )
+
+@router.post("/", response_model=DietRecommendationJob, status_code=status.HTTP_202_ACCEPTED)
+async def request_diet_recommendation(
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(deps.get_read_db_session),
+    current_user: Principal = Depends(deps.get_current_principal),
+):
+    """
+    Ask for a recommendation based on the last two weeks of food and health logs and the
+    profile's goals. If those are unchanged since a stored recommendation, it is returned
+    right away (200). Otherwise a job is queued (202); poll GET /jobs/{job_id}. Repeated
+    requests while a job is pending return that same job.
+    """
+    try:
+        stored, job = await crud_diet_recommendation.request_recommendation(db, current_user.id)
+    except QueueFullError:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many recommendations are being generated, please retry shortly.",
+            headers={"Retry-After": "5"},
+        )
+    if stored is not None:
+        response.status_code = status.HTTP_200_OK
+        return DietRecommendationJob(status=Job.SUCCEEDED, cached=True, recommendation=DietRecommendation(**stored))
+    response.headers["Location"] = str(request.url_for("read_diet_recommendation_job", job_id=str(job.id)))
+    return _job_response(job)
+
+@router.get("/jobs/{job_id}", response_model=DietRecommendationJob)
+async def read_diet_recommendation_job(
+    job_id: UUID4,
+    current_user: Principal = Depends(deps.get_current_principal),
+):
+    """
+    Status of a recommendation job. Finished jobs can be polled for about ten minutes.
+    """
+    job = crud_diet_recommendation.diet_jobs.get(job_id)
+    if job is None or job.owner != current_user.id:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job not found.")
+    return _job_response(job)
+
+@router.get("/latest", response_model=DietRecommendation)
+async def read_latest_diet_recommendation(
+    db: AsyncSession = Depends(deps.get_read_db_session),
+    current_user: Principal = Depends(deps.get_current_principal),
+):
+    """
+    The most recently generated recommendation for the current user.
+    """
+    recommendation = await crud_diet_recommendation.get_latest_recommendation(db, current_user.id)
+    if recommendation is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No recommendation yet.")
+    return DietRecommendation(**recommendation)
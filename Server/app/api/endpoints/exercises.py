@@ -0,0 +1,22 @@
+from fastapi import APIRouter, Depends, Query
+from typing import List
+
+from app.api import deps
+from app.crud.crud_exercise import exercise_catalog
+from app.models.workout import ExerciseSearchResult
+from app.models.user import Principal
+
+router = APIRouter()
+
+@router.get("/search", response_model=List[ExerciseSearchResult])
+async def search_exercises(
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(10, ge=1, le=50),
+    current_user: Principal = Depends(deps.get_current_principal),
+):
+    """
+    Exercise names logged across all users that match `q` (prefixes and typos included), best
+    match first with popular names ahead. Served from memory; new names show up within
+    EXERCISE_SEARCH_REFRESH_SECONDS.
+    """
+    return [ExerciseSearchResult(**result) for result in exercise_catalog.search(q, limit)]
@@ -0,0 +1,85 @@
+from datetime import date, timedelta
+from fastapi import APIRouter, Depends, HTTPException, Response, status
+from pydantic import UUID4
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List
+
+from app.api import deps
+from app.crud import crud_food_log
+from app.models.food_log import FoodLog, FoodLogCreate, FoodLogUpdate, NutritionSummary
+from app.models.user import Principal
+
+router = APIRouter()
+
+# Longest range /summary serves in one call
+MAX_SUMMARY_DAYS = 366
+
+@router.post("/", response_model=FoodLog, status_code=status.HTTP_201_CREATED)
+async def create_food_log(
+    food_log_in: FoodLogCreate,
+    db: AsyncSession = Depends(deps.get_db_session),
+    current_user: Principal = Depends(deps.get_current_principal),
+):
+    """
+    Log a food item for the current user. The daily totals are updated in the same transaction.
+    """
+    food_log = await crud_food_log.create_food_log(db, current_user.id, food_log_in.dict())
+    return FoodLog(**food_log)
+
+@router.get("/", response_model=List[FoodLog])
+async def read_food_logs(
+    day: date,
+    db: AsyncSession = Depends(deps.get_read_db_session),
+    current_user: Principal = Depends(deps.get_current_principal),
+):
+    """
+    The current user's items for one (UTC) day, oldest first.
+    """
+    return [FoodLog(**food_log) for food_log in await crud_food_log.get_food_logs_for_day(db, current_user.id, day)]
+
+@router.get("/summary", response_model=NutritionSummary)
+async def read_nutrition_summary(
+    start_day: date,
+    end_day: date,
+    db: AsyncSession = Depends(deps.get_read_db_session),
+    current_user: Principal = Depends(deps.get_current_principal),
+):
+    """
+    Calories and macros per day and per meal for [start_day, end_day] (UTC days, inclusive).
+    Served from the daily totals only, so cost grows with the number of days, not items.
+    """
+    if end_day < start_day:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="end_day must not be before start_day.")
+    if end_day - start_day >= timedelta(days=MAX_SUMMARY_DAYS):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail=f"Ranges are limited to {MAX_SUMMARY_DAYS} days."
+        )
+    return await crud_food_log.get_nutrition_summary(db, current_user.id, start_day, end_day)
+
+@router.put("/{food_log_id}", response_model=FoodLog)
+async def replace_food_log(
+    food_log_id: UUID4,
+    food_log_in: FoodLogUpdate,
+    db: AsyncSession = Depends(deps.get_db_session),
+    current_user: Principal = Depends(deps.get_current_principal),
+):
+    """
+    Replace one of the current user's items. Moving it to another day or meal moves its totals too.
+    """
+    food_log = await crud_food_log.replace_food_log(db, current_user.id, food_log_id, food_log_in.dict())
+    if food_log is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Food log not found.")
+    return FoodLog(**food_log)
+
+@router.delete("/{food_log_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_food_log(
+    food_log_id: UUID4,
+    db: AsyncSession = Depends(deps.get_db_session),
+    current_user: Principal = Depends(deps.get_current_principal),
+):
+    """
+    Delete one of the current user's items and take it out of the daily totals.
+    """
+    if not await crud_food_log.delete_food_log(db, current_user.id, food_log_id):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Food log not found.")
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
@@ -0,0 +1,71 @@
+from datetime import datetime, timezone
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api import deps
+from app.core.config import settings
+from app.crud import crud_health_log
+from app.models.health_log import IngestResult, HealthSeries, SeriesResolution
+from app.models.user import Principal
+
+router = APIRouter()
+
+_FORMATS = {
+    "application/x-ndjson": "ndjson",
+    "application/jsonl": "ndjson",
+    "text/csv": "csv",
+}
+
+@router.post("/bulk", response_model=IngestResult)
+async def ingest_health_logs(
+    request: Request,
+    db: AsyncSession = Depends(deps.get_db_session),
+    current_user: Principal = Depends(deps.get_current_principal),
+):
+    """
+    Bulk-ingest samples for the current user from a streamed body.
+
+    `Content-Type: application/x-ndjson`: one `{"log_type", "value", "log_date"}` object per line.
+    `Content-Type: text/csv`: a header naming log_type, value and log_date, then one row per line.
+
+    Rows are validated as they arrive and written in batches of HEALTH_INGEST_BATCH_SIZE, each
+    committed on its own. Invalid rows are counted and reported, not fatal; samples already stored
+    for the same (log_type, log_date) count as duplicates.
+    """
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    fmt = _FORMATS.get(content_type)
+    if fmt is None:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail="Send application/x-ndjson or text/csv.",
+        )
+    try:
+        return await crud_health_log.ingest_health_logs(
+            db, current_user.id, request.stream(), fmt, batch_size=settings.HEALTH_INGEST_BATCH_SIZE
+        )
+    except crud_health_log.IngestFormatError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
+
+@router.get("/series", response_model=HealthSeries)
+async def read_health_series(
+    log_type: str,
+    start: datetime,
+    end: datetime,
+    points: int = Query(200, ge=3, le=2000),
+    resolution: SeriesResolution = SeriesResolution.auto,
+    db: AsyncSession = Depends(deps.get_read_db_session),
+    current_user: Principal = Depends(deps.get_current_principal),
+):
+    """
+    Chart data for one log_type over [start, end). Timestamps without an offset are UTC.
+
+    `auto` serves ranges up to a week from raw samples and longer ones from the finest of the
+    day/week/month rollups that fits in `points`. `raw` is downsampled (LTTB) to `points`;
+    an explicit rollup resolution returns every bucket in the range.
+    """
+    start, end = (ts if ts.tzinfo else ts.replace(tzinfo=timezone.utc) for ts in (start, end))
+    if end <= start:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="end must be after start.")
+    return await crud_health_log.get_series(
+        db, current_user.id, log_type, start, end, max_points=points, resolution=resolution.value
+    )
@@ -0,0 +1,44 @@
+from fastapi import APIRouter, Depends, status
+from pydantic import UUID4
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api import deps
+from app.crud import crud_like
+from app.models.post import LikeStatus
+from app.models.user import Principal
+
+router = APIRouter()
+
+@router.put("/{post_id}", status_code=status.HTTP_202_ACCEPTED)
+async def like_post(
+    post_id: UUID4,
+    current_user: Principal = Depends(deps.get_current_principal),
+):
+    """
+    Like a post. Buffered and written within LIKES_FLUSH_INTERVAL_SECONDS; likes on posts that
+    no longer exist are dropped at that point. Idempotent.
+    """
+    crud_like.like_buffer.set_liked(post_id, current_user.id, True)
+    return {"post_id": post_id, "liked": True}
+
+@router.delete("/{post_id}", status_code=status.HTTP_202_ACCEPTED)
+async def unlike_post(
+    post_id: UUID4,
+    current_user: Principal = Depends(deps.get_current_principal),
+):
+    """
+    Remove the current user's like from a post. Buffered the same way as liking. Idempotent.
+    """
+    crud_like.like_buffer.set_liked(post_id, current_user.id, False)
+    return {"post_id": post_id, "liked": False}
+
+@router.get("/{post_id}", response_model=LikeStatus)
+async def read_like_status(
+    post_id: UUID4,
+    db: AsyncSession = Depends(deps.get_read_db_session),
+    current_user: Principal = Depends(deps.get_current_principal),
+):
+    """
+    Like count for a post and whether the current user likes it, including their own unflushed toggles.
+    """
+    return LikeStatus(**await crud_like.get_like_status(db, post_id, current_user.id))
@@ -0,0 +1,40 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
+
+from app.api import deps
+from app.crud import crud_post
+from app.models.post import Post, PostCreate, FeedPage
+from app.models.user import Principal
+
+router = APIRouter()
+
+@router.post("/", response_model=Post, status_code=status.HTTP_201_CREATED)
+async def create_post(
+    post_in: PostCreate,
+    db: AsyncSession = Depends(deps.get_db_session),
+    current_user: Principal = Depends(deps.get_current_principal),
+):
+    """
+    Create a post as the current user.
+    """
+    if not post_in.content and not post_in.media_url:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="A post needs content or media.")
+    post = await crud_post.create_post(db, user_id=current_user.id, content=post_in.content, media_url=post_in.media_url)
+    return Post(**post)
+
+@router.get("/feed", response_model=FeedPage)
+async def read_feed(
+    cursor: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100),
+    db: AsyncSession = Depends(deps.get_read_db_session),
+    current_user: Principal = Depends(deps.get_current_principal),
+):
+    """
+    Global feed, newest first. Follow `next_cursor` for older posts (keyset pagination, no OFFSET).
+    """
+    try:
+        posts, next_cursor = await crud_post.get_feed(db, viewer_id=current_user.id, cursor=cursor, limit=limit)
+    except crud_post.InvalidCursorError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor.")
+    return FeedPage(items=[Post(**post) for post in posts], next_cursor=next_cursor)
@@ -0,0 +1,46 @@
+from fastapi import APIRouter, Depends, HTTPException, Request
+from sqlalchemy.ext.asyncio import AsyncSession
+from pydantic import UUID4
+
+from app.api import deps
+from app.api.responses import model_response, validators, is_conditional, is_not_modified, not_modified
+from app.crud import crud_profile
+from app.models.profile import Profile, ProfileUpdate
+from app.models.user import Principal
+
+router = APIRouter()
+
+@router.get("/{user_id}", response_model=Profile)
+async def read_profile(
+    user_id: UUID4,
+    request: Request,
+    db: AsyncSession = Depends(deps.get_read_db_session),
+):
+    """
+    A user's profile. Send the ETag back as If-None-Match (or Last-Modified as
+    If-Modified-Since) to get a 304 while the profile is unchanged.
+    """
+    if is_conditional(request):
+        updated_at = await crud_profile.get_profile_version(db, user_id=user_id)
+        if updated_at is None:
+            raise HTTPException(status_code=404, detail="Profile not found.")
+        if is_not_modified(request, updated_at):
+            return not_modified(updated_at)
+    profile = await crud_profile.get_profile_by_user_id(db, user_id=user_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found.")
+    return model_response(Profile, profile, headers=validators(profile["updated_at"]))
+
+@router.put("/me", response_model=Profile)
+async def update_my_profile(
+    profile_in: ProfileUpdate,
+    db: AsyncSession = Depends(deps.get_db_session),
+    current_user: Principal = Depends(deps.get_current_principal),
+):
+    """
+    Update the current user's profile; fields left out are unchanged.
+    """
+    profile = await crud_profile.update_profile(db, user_id=current_user.id, profile_in=profile_in)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found.")
+    return model_response(Profile, profile, headers=validators(profile["updated_at"]))
@@ -1,33 +1,62 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import UUID4
+from typing import List, Optional
 
 from app.api import deps
-from app.models.user import User, UserUpdate
-from app.crud import crud_user
+from app.api.responses import FastJSONResponse, serializer_for, model_response, validators, is_conditional, is_not_modified, not_modified
+from app.core.config import settings
+from app.models.export import ExportFormat, ExportSection
+from app.models.user import User, UserPublic, UserUpdate, Principal
+from app.crud import crud_export, crud_user
 
 router = APIRouter()
 
+MAX_BATCH_IDS = 100
+
+@router.get("/", response_model=List[UserPublic])
+async def read_users_by_ids(
+    ids: List[UUID4] = Query(..., min_items=1, max_items=MAX_BATCH_IDS),
+    current_user: Principal = Depends(deps.get_current_principal),
+):
+    """
+    Many users in one call: `?ids=<uuid>&ids=<uuid>...` (up to 100). Users come back in the
+    order asked for; unknown ids are left out. Emails are only included for admins.
+    """
+    users = await crud_user.load_users(ids)
+    serialize = serializer_for(User if current_user.role == "admin" else UserPublic)
+    return FastJSONResponse([serialize(users[user_id]) for user_id in dict.fromkeys(ids) if user_id in users])
+
 @router.get("/{user_id}", response_model=User)
 async def read_user_by_id(
     user_id: UUID4,
-    db: AsyncSession = Depends(deps.get_db_session),
+    request: Request,
+    db: AsyncSession = Depends(deps.get_read_db_session),
     # current_user: User = Depends(deps.get_current_active_user) # Optional: if only logged-in users can view
 ):
     """
-    Retrieve user details.
+    Retrieve user details. Send the ETag back as If-None-Match (or Last-Modified as
+    If-Modified-Since) to get a 304 while the user is unchanged.
     """
-    user = await crud_user.get_user_by_id(db, user_id=user_id)
+    if is_conditional(request):
+        # Version cache or a probe of updated_at only: no row fetch, no serialization
+        updated_at = await crud_user.get_user_version(db, user_id=user_id)
+        if updated_at is None:
+            raise HTTPException(status_code=404, detail="User not found")
+        if is_not_modified(request, updated_at):
+            return not_modified(updated_at)
+    user = await crud_user.load_user(user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
-    return User(**user)
+    return model_response(User, user, headers=validators(user["updated_at"]))
 
 @router.put("/{user_id}", response_model=User)
 async def update_user_details(
     user_id: UUID4,
     user_in: UserUpdate,
     db: AsyncSession = Depends(deps.get_db_session),
-    current_user: User = Depends(deps.get_current_active_user),
+    current_user: Principal = Depends(deps.get_current_principal),
 ):
     """
     Update user details.
@@ -43,12 +72,93 @@ async def update_user_details(
     updated_user_dict = await crud_user.update_user(db=db, user_id=user_id, user_in=user_in)
     if not updated_user_dict:
         raise HTTPException(status_code=500, detail="Could not update user.") # Or 404 if update target not found
-    return User(**updated_user_dict)
+    return model_response(User, updated_user_dict, headers=validators(updated_user_dict["updated_at"]))
 
 # GET /users/me - for current user to get their own details
 @router.get("/me/", response_model=User)
-async def read_users_me(current_user: User = Depends(deps.get_current_active_user)):
+async def read_users_me(request: Request, current_user: User = Depends(deps.get_current_active_user)):
+    """
+    Get current user. Supports If-None-Match / If-Modified-Since like GET /users/{user_id}.
+    """
+    if is_not_modified(request, current_user.updated_at):
+        return not_modified(current_user.updated_at)
+    return model_response(User, current_user, headers=validators(current_user.updated_at))
+
+_EXPORT_MEDIA_TYPES = {ExportFormat.ndjson: "application/x-ndjson", ExportFormat.csv: "text/csv"}
+
+class _ExportResponse(StreamingResponse):
+    # Gives the export slot back however the response ends: done, client gone, or failed mid-stream
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            crud_export.release_export_slot()
+
+def _accepts_gzip(request: Request) -> bool:
+    for coding in request.headers.get("accept-encoding", "").split(","):
+        name, _, params = coding.strip().partition(";")
+        if name.strip().lower() in ("gzip", "*"):
+            return params.replace(" ", "") not in ("q=0", "q=0.0", "q=0.00", "q=0.000")
+    return False
+
+def _export_response(
+    request: Request, user_id: UUID4, fmt: ExportFormat, sections: Optional[List[ExportSection]]
+) -> StreamingResponse:
+    section_names = list(dict.fromkeys(section.value for section in sections or ExportSection))
+    if fmt == ExportFormat.csv and len(section_names) != 1:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="CSV exports take exactly one section.",
+        )
+    try:
+        crud_export.acquire_export_slot()
+    except crud_export.ExportBusyError:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many exports are running, please retry shortly.",
+            headers={"Retry-After": "5"},
+        )
+    compress = _accepts_gzip(request)
+    filename = f"export-{user_id}" + (f"-{section_names[0]}" if sections and len(section_names) == 1 else "")
+    filename += f".{fmt.value}"
+    headers = {
+        "Content-Disposition": f'attachment; filename="{filename}"',
+        "Cache-Control": "no-store",
+        "Vary": "Accept-Encoding",
+    }
+    if compress:
+        headers["Content-Encoding"] = "gzip"
+    body = crud_export.export_user_data(
+        user_id, section_names, fmt.value, compress=compress, batch_size=settings.EXPORT_FETCH_BATCH_SIZE
+    )
+    return _ExportResponse(body, media_type=_EXPORT_MEDIA_TYPES[fmt], headers=headers)
+
+@router.get("/me/export", response_class=StreamingResponse)
+async def export_my_data(
+    request: Request,
+    format: ExportFormat = ExportFormat.ndjson,
+    sections: Optional[List[ExportSection]] = Query(None),
+    current_user: Principal = Depends(deps.get_current_principal),
+):
     """
-    Get current user.
+    Download everything stored for the current user, streamed as it is read.
+
+    `ndjson` (default): a header line, then one `{"section": ..., ...}` line per row, for every
+    section or just the `sections` given. `csv`: exactly one section, with a header row.
+    Compressed with gzip on the fly when the client sends `Accept-Encoding: gzip`.
     """
-    return current_user
\ No newline at end of file
+    return _export_response(request, current_user.id, format, sections)
+
+@router.get("/{user_id}/export", response_class=StreamingResponse)
+async def export_user_data(
+    user_id: UUID4,
+    request: Request,
+    format: ExportFormat = ExportFormat.ndjson,
+    sections: Optional[List[ExportSection]] = Query(None),
+    current_user: User = Depends(deps.get_current_admin_user),
+):
+    """
+    Admins only: the export of any user, as GET /users/me/export.
+    """
+    if await crud_user.load_user(user_id) is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    return _export_response(request, user_id, format, sections)
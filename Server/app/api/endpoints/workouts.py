@@ -0,0 +1,93 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from pydantic import UUID4
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
+
+from app.api import deps
+from app.crud import crud_workout
+from app.crud.base import InvalidCursorError
+from app.models.workout import Workout, WorkoutCreate, WorkoutPage, ExerciseOrder
+from app.models.user import Principal
+
+router = APIRouter()
+
+@router.get("/", response_model=WorkoutPage)
+async def read_workouts(
+    cursor: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100),
+    db: AsyncSession = Depends(deps.get_read_db_session),
+    current_user: Principal = Depends(deps.get_current_principal),
+):
+    """
+    The current user's workouts with their exercises, newest first. Follow `next_cursor` for older ones.
+    """
+    try:
+        workouts, next_cursor = await crud_workout.get_workouts(db, current_user.id, cursor=cursor, limit=limit)
+    except InvalidCursorError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor.")
+    return WorkoutPage(items=[Workout(**workout) for workout in workouts], next_cursor=next_cursor)
+
+@router.post("/", response_model=Workout, status_code=status.HTTP_201_CREATED)
+async def create_workout(
+    workout_in: WorkoutCreate,
+    db: AsyncSession = Depends(deps.get_db_session),
+    current_user: Principal = Depends(deps.get_current_principal),
+):
+    """
+    Create a workout together with its exercises, in the given order.
+    """
+    return Workout(**await crud_workout.create_workout(db, current_user.id, workout_in.dict()))
+
+@router.get("/{workout_id}", response_model=Workout)
+async def read_workout(
+    workout_id: UUID4,
+    db: AsyncSession = Depends(deps.get_read_db_session),
+    current_user: Principal = Depends(deps.get_current_principal),
+):
+    workout = await crud_workout.get_workout(db, current_user.id, workout_id)
+    if workout is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Workout not found.")
+    return Workout(**workout)
+
+@router.put("/{workout_id}", response_model=Workout)
+async def replace_workout(
+    workout_id: UUID4,
+    workout_in: WorkoutCreate,
+    db: AsyncSession = Depends(deps.get_db_session),
+    current_user: Principal = Depends(deps.get_current_principal),
+):
+    """
+    Replace a workout and its whole exercise list (exercises get new ids).
+    """
+    workout = await crud_workout.replace_workout(db, current_user.id, workout_id, workout_in.dict())
+    if workout is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Workout not found.")
+    return Workout(**workout)
+
+@router.put("/{workout_id}/exercise-order", response_model=Workout)
+async def reorder_exercises(
+    workout_id: UUID4,
+    order_in: ExerciseOrder,
+    db: AsyncSession = Depends(deps.get_db_session),
+    current_user: Principal = Depends(deps.get_current_principal),
+):
+    """
+    Reorder a workout's exercises. `exercise_ids` must list each of its exercises exactly once.
+    """
+    try:
+        workout = await crud_workout.reorder_exercises(db, current_user.id, workout_id, order_in.exercise_ids)
+    except crud_workout.InvalidExerciseOrderError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
+    if workout is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Workout not found.")
+    return Workout(**workout)
+
+@router.delete("/{workout_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_workout(
+    workout_id: UUID4,
+    db: AsyncSession = Depends(deps.get_db_session),
+    current_user: Principal = Depends(deps.get_current_principal),
+):
+    if not await crud_workout.delete_workout(db, current_user.id, workout_id):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Workout not found.")
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
@@ -0,0 +1,135 @@
+import enum
+import uuid
+from datetime import datetime, timezone
+from decimal import Decimal
+from email.utils import format_datetime, parsedate_to_datetime
+from functools import lru_cache
+from typing import Any, Callable, Dict, Mapping, Optional, Type, Union
+
+import orjson
+from fastapi import Request, Response
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+from pydantic.fields import SHAPE_LIST, SHAPE_SINGLETON
+
+Serializer = Callable[[Mapping[str, Any]], Dict[str, Any]]
+
+
+def _default(value: Any) -> Any:
+    # Only called for what orjson can't encode itself, e.g. asyncpg's own UUID type
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, enum.Enum):
+        return value.value
+    if isinstance(value, BaseModel):
+        return value.dict()
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSON rendered by orjson: what the stdlib encoder produces for our payloads, several times faster."""
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+@lru_cache(maxsize=None)
+def serializer_for(model: Type[BaseModel]) -> Serializer:
+    """
+    Compiled once per model: picks the model's fields (by alias) out of a row mapping, recursing
+    into nested models and lists of them, and leaves the values as they are. Extra keys such as
+    password_hash are dropped. There is no validation: only use it on trusted data, i.e. rows
+    shaped by our own queries.
+
+    Values go out exactly as stored, so validators that would rewrite them are skipped: a
+    User's email is not re-normalized by EmailStr (which lowercases the domain). The API
+    only writes emails through EmailStr (UserCreate/UserUpdate), so its own rows come out
+    as before; rows written around it (e.g. by hand in SQL) are sent as they are.
+    """
+    plain = []
+    nested = []
+    for name, field in model.__fields__.items():
+        inner = field.type_
+        if isinstance(inner, type) and issubclass(inner, BaseModel) and field.shape in (SHAPE_SINGLETON, SHAPE_LIST):
+            nested.append((name, field.alias, serializer_for(inner), field.shape == SHAPE_LIST))
+        else:
+            plain.append((name, field.alias))
+
+    if not nested:
+        def serialize(row: Mapping[str, Any]) -> Dict[str, Any]:
+            return {alias: row.get(name) for name, alias in plain}
+        return serialize
+
+    def serialize(row: Mapping[str, Any]) -> Dict[str, Any]:
+        out = {alias: row.get(name) for name, alias in plain}
+        for name, alias, inner, many in nested:
+            value = row.get(name)
+            if value is None:
+                out[alias] = None
+            elif many:
+                out[alias] = [inner(_as_mapping(item)) for item in value]
+            else:
+                out[alias] = inner(_as_mapping(value))
+        return out
+    return serialize
+
+
+def _as_mapping(value: Union[Mapping[str, Any], BaseModel]) -> Mapping[str, Any]:
+    return value.__dict__ if isinstance(value, BaseModel) else value
+
+
+def model_response(
+    model: Type[BaseModel],
+    row: Union[Mapping[str, Any], BaseModel],
+    status_code: int = 200,
+    headers: Optional[Dict[str, str]] = None,
+) -> FastJSONResponse:
+    """
+    `row` serialized as `model` straight to an orjson response. Returning a Response makes FastAPI
+    skip its own response_model validation and encoding, which is the point; keep response_model
+    on the route for the OpenAPI schema.
+    """
+    return FastJSONResponse(serializer_for(model)(_as_mapping(row)), status_code=status_code, headers=headers)
+
+
+# Conditional GET. A resource's version is its updated_at (kept current by trigger_set_timestamp),
+# so validators come from one timestamp and checking them never needs the full row.
+
+def etag_for(updated_at: datetime) -> str:
+    # Weak: it names a version of the row, not the exact bytes of one representation
+    return f'W/"{int(updated_at.timestamp() * 1_000_000):x}"'
+
+def validators(updated_at: datetime) -> Dict[str, str]:
+    """ETag and Last-Modified for a resource last changed at `updated_at`; clients must revalidate."""
+    return {
+        "ETag": etag_for(updated_at),
+        "Last-Modified": format_datetime(updated_at.astimezone(timezone.utc), usegmt=True),
+        "Cache-Control": "no-cache",
+    }
+
+def is_conditional(request: Request) -> bool:
+    return "if-none-match" in request.headers or "if-modified-since" in request.headers
+
+def is_not_modified(request: Request, updated_at: datetime) -> bool:
+    """Whether the client's copy is current. If-None-Match wins over If-Modified-Since (RFC 9110)."""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        if if_none_match.strip() == "*":
+            return True
+        current = etag_for(updated_at).removeprefix("W/")
+        return any(tag.strip().removeprefix("W/") == current for tag in if_none_match.split(","))
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        return updated_at.replace(microsecond=0) <= since # HTTP dates have whole seconds
+    return False
+
+def not_modified(updated_at: datetime) -> Response:
+    return Response(status_code=304, headers=validators(updated_at))
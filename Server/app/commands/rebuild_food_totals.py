@@ -0,0 +1,36 @@
+"""
+Recompute food_log_daily_totals from the raw food_logs rows, e.g. after a manual data fix or
+to verify the incrementally maintained totals. Run from the Server directory:
+    python -m app.commands.rebuild_food_totals [--user-id UUID]
+
+Food log writes wait on a table lock while it runs and apply on top of the rebuilt totals.
+"""
+import argparse
+import asyncio
+import time
+from uuid import UUID
+
+from app.crud import crud_food_log
+from app.db import session as db_session
+
+
+async def run(args) -> None:
+    db_session.init_engines()
+    try:
+        started = time.perf_counter()
+        async with db_session.AsyncSessionLocal() as db:
+            rows = await crud_food_log.rebuild_daily_totals(db, user_id=args.user_id)
+        scope = f"user {args.user_id}" if args.user_id else "all users"
+        print(f"rebuilt {rows} daily total rows for {scope} in {time.perf_counter() - started:.2f}s")
+    finally:
+        await db_session.dispose_engines()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--user-id", type=UUID, default=None, help="Only rebuild this user's totals")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+import asyncio
+import heapq
+import itertools
+from typing import Dict, List, Optional, Tuple
+
+from app.core import metrics
+from app.core.config import settings
+
+# Admission control: each route class (bcrypt-bound auth, DB reads, DB writes) may run at most
+# `limit` requests at once, with at most `max_queue` waiting up to `timeout` seconds for a slot.
+# Anything beyond that gets a 503 straight away, so an overload in one class can't drive every
+# route into the DB pool's queue and the latencies of unrelated routes stay apart.
+
+HIGH = 0   # Cheap and latency-sensitive (token refresh): served first, may displace queued NORMAL work
+NORMAL = 1
+
+
+class OverloadedError(Exception):
+    def __init__(self, reason: str):
+        super().__init__(reason)
+        self.reason = reason # "queue_full", "timeout" or "shed"
+
+
+class AdmissionLimiter:
+    """
+    A semaphore with a bounded priority queue. Waiters are served by (priority, arrival);
+    when the queue is full, a HIGH request sheds the newest NORMAL waiter instead of being
+    turned away itself. A released slot is handed straight to the next waiter, so newcomers
+    can't overtake the queue.
+    """
+
+    def __init__(self, name: str, limit: int, max_queue: int, timeout: float):
+        self.name = name
+        self.limit = max(1, limit)
+        self.max_queue = max(0, max_queue)
+        self.timeout = timeout
+        self.active = 0
+        self.queued = 0
+        self.rejected: Dict[str, int] = {"queue_full": 0, "timeout": 0, "shed": 0}
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = [] # Heap; settled futures are skipped lazily
+        self._arrivals = itertools.count()
+
+    async def acquire(self, priority: int = NORMAL) -> None:
+        if self.active < self.limit and not self.queued:
+            self.active += 1
+            return
+        if self.queued >= self.max_queue and not (priority == HIGH and self._shed_one()):
+            self._reject("queue_full")
+
+        waiter = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._arrivals), waiter))
+        self.queued += 1
+        try:
+            await asyncio.wait_for(waiter, self.timeout)
+        except asyncio.TimeoutError:
+            self._reject("timeout")
+        except BaseException:
+            # Cancelled (e.g. the client went away) just as a slot was handed over: give it back
+            if waiter.done() and not waiter.cancelled() and waiter.exception() is None:
+                self.release()
+            raise
+        finally:
+            if not waiter.done() or waiter.cancelled():
+                self.queued -= 1 # Timed out or cancelled; a granted or shed waiter was already counted out
+
+    def release(self) -> None:
+        while self._waiters:
+            _, _, waiter = heapq.heappop(self._waiters)
+            if not waiter.done():
+                self.queued -= 1
+                waiter.set_result(None) # The slot passes to the waiter; active stays the same
+                return
+        self.active -= 1
+
+    def _shed_one(self) -> bool:
+        live = [entry for entry in self._waiters if entry[0] != HIGH and not entry[2].done()]
+        if not live:
+            return False
+        _, _, waiter = max(live, key=lambda entry: entry[1])
+        self.queued -= 1
+        self.rejected["shed"] += 1
+        waiter.set_exception(OverloadedError("shed"))
+        return True
+
+    def _reject(self, reason: str) -> None:
+        self.rejected[reason] += 1
+        raise OverloadedError(reason)
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "active": self.active, "limit": self.limit, "queued": self.queued,
+            "max_queue": self.max_queue, "rejected": dict(self.rejected),
+        }
+
+
+API_PREFIX = "/api/v1"
+
+# Never limited: probes and monitoring must answer precisely when everything else is saturated
+EXEMPT_PATHS = (f"{API_PREFIX}/health", f"{API_PREFIX}/metrics", f"{API_PREFIX}/openapi.json", "/docs", "/redoc")
+# bcrypt in the hashing pool; their own class so a login storm doesn't starve DB reads and writes
+AUTH_PATHS = (f"{API_PREFIX}/auth/login", f"{API_PREFIX}/auth/register")
+# One indexed UPDATE each, and clients are stuck until they succeed
+PRIORITY_PATHS = (f"{API_PREFIX}/auth/refresh-token", f"{API_PREFIX}/auth/logout")
+
+limiters = {
+    "auth": AdmissionLimiter(
+        "auth", settings.ADMISSION_AUTH_CONCURRENCY, settings.ADMISSION_AUTH_MAX_QUEUE,
+        settings.ADMISSION_AUTH_QUEUE_TIMEOUT_SECONDS,
+    ),
+    "read": AdmissionLimiter(
+        "read", settings.ADMISSION_READ_CONCURRENCY, settings.ADMISSION_READ_MAX_QUEUE,
+        settings.ADMISSION_READ_QUEUE_TIMEOUT_SECONDS,
+    ),
+    "write": AdmissionLimiter(
+        "write", settings.ADMISSION_WRITE_CONCURRENCY, settings.ADMISSION_WRITE_MAX_QUEUE,
+        settings.ADMISSION_WRITE_QUEUE_TIMEOUT_SECONDS,
+    ),
+}
+
+
+def _matches(path: str, prefixes: Tuple[str, ...]) -> bool:
+    # Whole path segments only: /api/v1/health must not catch /api/v1/health-logs
+    return any(path == prefix or path.startswith(prefix + "/") for prefix in prefixes)
+
+def classify(method: str, path: str) -> Optional[Tuple[str, int]]:
+    """(route class, priority) for a request, or None if it is never limited."""
+    path = path.rstrip("/")
+    if method == "OPTIONS" or _matches(path, EXEMPT_PATHS):
+        return None
+    if _matches(path, AUTH_PATHS):
+        return "auth", NORMAL
+    if _matches(path, PRIORITY_PATHS):
+        return "write", HIGH
+    return ("read" if method in ("GET", "HEAD") else "write"), NORMAL
+
+
+def stats() -> Dict[str, Dict[str, object]]:
+    return {name: limiter.stats() for name, limiter in limiters.items()}
+
+
+metrics.registry.register(metrics.Gauge(
+    "admission_active_requests", "Requests holding an admission slot, by route class.", ("route_class",),
+    callback=lambda: {(name,): limiter.active for name, limiter in limiters.items()},
+))
+metrics.registry.register(metrics.Gauge(
+    "admission_queued_requests", "Requests waiting for an admission slot, by route class.", ("route_class",),
+    callback=lambda: {(name,): limiter.queued for name, limiter in limiters.items()},
+))
+metrics.registry.register(metrics.Counter(
+    "admission_rejected_total", "Requests answered 503 by admission control.", ("route_class", "reason"),
+    callback=lambda: {
+        (name, reason): count for name, limiter in limiters.items() for reason, count in limiter.rejected.items()
+    },
+))
+
+_BUSY_BODY = b'{"detail":"Server is busy, please retry shortly."}'
+
+
+class AdmissionControlMiddleware:
+    """
+    Plain ASGI middleware holding one admission slot of the request's class for as long as
+    the app handles it (response body included). Requests that can't get one in time are
+    answered 503 with Retry-After without ever reaching the app.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        route_class = classify(scope["method"], scope["path"]) if scope["type"] == "http" else None
+        if route_class is None or not settings.ADMISSION_CONTROL_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        limiter = limiters[route_class[0]]
+        try:
+            await limiter.acquire(route_class[1])
+        except OverloadedError:
+            await send({
+                "type": "http.response.start",
+                "status": 503,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(_BUSY_BODY)).encode()),
+                    (b"retry-after", str(settings.ADMISSION_RETRY_AFTER_SECONDS).encode()),
+                ],
+            })
+            await send({"type": "http.response.body", "body": _BUSY_BODY})
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limiter.release()
@@ -1,7 +1,11 @@
 import os
+from typing import Optional
 from dotenv import load_dotenv
 from pydantic import BaseSettings
 
+# Kept at import on purpose: reading .env and building Settings is local and takes under a
+# millisecond, and many modules size caches, pools and limits from settings at import, so a
+# lazy get_settings() would be called at import anyway. Nothing here touches the network.
 load_dotenv()
 
 class Settings(BaseSettings):
@@ -16,11 +20,92 @@ class Settings(BaseSettings):
     DATABASE_URL: str = os.getenv("DATABASE_URL") or \
         f"postgresql+asyncpg://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{POSTGRES_SERVER}:{POSTGRES_PORT}/{POSTGRES_DB}"
 
+    # Optional read replica. Read-only sessions use it while it is reachable and not lagging too far behind.
+    DATABASE_REPLICA_URL: Optional[str] = os.getenv("DATABASE_REPLICA_URL") or None
+    REPLICA_MAX_LAG_SECONDS: float = float(os.getenv("REPLICA_MAX_LAG_SECONDS", 5))
+    REPLICA_CHECK_INTERVAL_SECONDS: float = float(os.getenv("REPLICA_CHECK_INTERVAL_SECONDS", 5))
+
+    # Pooled connections opened during startup, before the app reports ready (0 = connect on first request)
+    DB_POOL_WARMUP_CONNECTIONS: int = int(os.getenv("DB_POOL_WARMUP_CONNECTIONS", 2))
+
+    # Global feed page cache (per worker), cleared when this worker creates a post
+    FEED_CACHE_SIZE: int = int(os.getenv("FEED_CACHE_SIZE", 256))
+    FEED_CACHE_TTL_SECONDS: int = int(os.getenv("FEED_CACHE_TTL_SECONDS", 5))
+
+    # Likes are buffered in memory and written in batches; flushed early once this many toggles are pending
+    LIKES_FLUSH_INTERVAL_SECONDS: float = float(os.getenv("LIKES_FLUSH_INTERVAL_SECONDS", 1))
+    LIKES_MAX_PENDING: int = int(os.getenv("LIKES_MAX_PENDING", 10000))
+
+    # Rows per INSERT (and per commit) for bulk health log ingestion
+    HEALTH_INGEST_BATCH_SIZE: int = int(os.getenv("HEALTH_INGEST_BATCH_SIZE", 1000))
+
+    # Diet recommendations are generated by background workers; requests beyond the queue get a 503
+    DIET_RECOMMENDATION_WORKERS: int = int(os.getenv("DIET_RECOMMENDATION_WORKERS", 2))
+    DIET_RECOMMENDATION_MAX_QUEUE: int = int(os.getenv("DIET_RECOMMENDATION_MAX_QUEUE", 100))
+    DIET_RECOMMENDATION_GENERATOR: str = os.getenv(
+        "DIET_RECOMMENDATION_GENERATOR", "app.core.diet_generator:DeterministicGenerator"
+    )
+
+    # Exercise name search index (per worker): names kept, seconds between incremental refreshes and full reloads
+    EXERCISE_SEARCH_MAX_NAMES: int = int(os.getenv("EXERCISE_SEARCH_MAX_NAMES", 200000))
+    EXERCISE_SEARCH_REFRESH_SECONDS: float = float(os.getenv("EXERCISE_SEARCH_REFRESH_SECONDS", 30))
+    EXERCISE_SEARCH_RELOAD_SECONDS: float = float(os.getenv("EXERCISE_SEARCH_RELOAD_SECONDS", 3600))
+
+    # Account exports stream from server-side cursors, this many rows per fetch; each one holds a pooled
+    # connection until it is done, so only this many run at once per worker (503 beyond)
+    EXPORT_FETCH_BATCH_SIZE: int = int(os.getenv("EXPORT_FETCH_BATCH_SIZE", 1000))
+    EXPORT_MAX_CONCURRENT: int = int(os.getenv("EXPORT_MAX_CONCURRENT", 2))
+
+    # Timeout for the DB ping done by /health?deep=true
+    HEALTH_DB_TIMEOUT_SECONDS: float = float(os.getenv("HEALTH_DB_TIMEOUT_SECONDS", 2))
+
+    # asyncpg keeps this many prepared statements per pooled connection
+    DB_PREPARED_STATEMENT_CACHE_SIZE: int = int(os.getenv("DB_PREPARED_STATEMENT_CACHE_SIZE", 256))
+    # Behind pgbouncer in transaction mode: no statement caches, uniquely named prepared statements
+    DB_PGBOUNCER_TRANSACTION_MODE: bool = os.getenv("DB_PGBOUNCER_TRANSACTION_MODE", "false").lower() in ("1", "true", "yes")
 
     SECRET_KEY: str = os.getenv("SECRET_KEY", "supersecretkey")
     ALGORITHM: str = os.getenv("ALGORITHM", "HS256")
     ACCESS_TOKEN_EXPIRE_MINUTES: int = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 30))
     REFRESH_TOKEN_EXPIRE_DAYS: int = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", 7))
+    # Hashes of revoked refresh tokens remembered per worker (rejected without a DB lookup)
+    REFRESH_TOKEN_REVOKED_CACHE_SIZE: int = int(os.getenv("REFRESH_TOKEN_REVOKED_CACHE_SIZE", 100000))
+    # Expired refresh_tokens rows are deleted every interval, this many per statement
+    REFRESH_TOKEN_PURGE_INTERVAL_SECONDS: float = float(os.getenv("REFRESH_TOKEN_PURGE_INTERVAL_SECONDS", 3600))
+    REFRESH_TOKEN_PURGE_BATCH_SIZE: int = int(os.getenv("REFRESH_TOKEN_PURGE_BATCH_SIZE", 1000))
+
+    # Password hashing (bcrypt runs in a process pool, off the event loop)
+    PASSWORD_HASH_WORKERS: int = int(os.getenv("PASSWORD_HASH_WORKERS", os.cpu_count() or 2))
+    PASSWORD_HASH_MAX_QUEUE: int = int(os.getenv("PASSWORD_HASH_MAX_QUEUE", 64)) # Waiting jobs before we answer 503
+
+    # Authenticated principal cache (avoids a users lookup on every request)
+    PRINCIPAL_CACHE_SIZE: int = int(os.getenv("PRINCIPAL_CACHE_SIZE", 10000))
+    PRINCIPAL_CACHE_TTL_SECONDS: int = int(os.getenv("PRINCIPAL_CACHE_TTL_SECONDS", 60))
+    # When true, endpoints that only need id/role trust the JWT claims and skip the DB entirely
+    TRUST_TOKEN_CLAIMS: bool = os.getenv("TRUST_TOKEN_CLAIMS", "false").lower() in ("1", "true", "yes")
+
+    # Concurrent lookups of users by id are merged into one query of at most this many ids
+    USER_LOADER_MAX_BATCH_SIZE: int = int(os.getenv("USER_LOADER_MAX_BATCH_SIZE", 100))
+
+    # updated_at of users/profiles cached per worker to answer conditional GETs (304) without a query.
+    # Changes made through another worker can go unnoticed for up to the TTL.
+    VERSION_CACHE_SIZE: int = int(os.getenv("VERSION_CACHE_SIZE", 10000))
+    VERSION_CACHE_TTL_SECONDS: float = float(os.getenv("VERSION_CACHE_TTL_SECONDS", 5))
+
+    # Admission control: concurrent requests per route class (auth = login/register, reads, writes), how many
+    # may wait for a slot and for how long. Beyond that requests get a 503 with Retry-After. Reads + writes
+    # default to the primary pool's 30 connections (pool_size + max_overflow).
+    ADMISSION_CONTROL_ENABLED: bool = os.getenv("ADMISSION_CONTROL_ENABLED", "true").lower() in ("1", "true", "yes")
+    ADMISSION_AUTH_CONCURRENCY: int = int(os.getenv("ADMISSION_AUTH_CONCURRENCY", 16))
+    ADMISSION_AUTH_MAX_QUEUE: int = int(os.getenv("ADMISSION_AUTH_MAX_QUEUE", 64))
+    ADMISSION_AUTH_QUEUE_TIMEOUT_SECONDS: float = float(os.getenv("ADMISSION_AUTH_QUEUE_TIMEOUT_SECONDS", 5))
+    ADMISSION_READ_CONCURRENCY: int = int(os.getenv("ADMISSION_READ_CONCURRENCY", 20))
+    ADMISSION_READ_MAX_QUEUE: int = int(os.getenv("ADMISSION_READ_MAX_QUEUE", 200))
+    ADMISSION_READ_QUEUE_TIMEOUT_SECONDS: float = float(os.getenv("ADMISSION_READ_QUEUE_TIMEOUT_SECONDS", 2))
+    ADMISSION_WRITE_CONCURRENCY: int = int(os.getenv("ADMISSION_WRITE_CONCURRENCY", 10))
+    ADMISSION_WRITE_MAX_QUEUE: int = int(os.getenv("ADMISSION_WRITE_MAX_QUEUE", 100))
+    ADMISSION_WRITE_QUEUE_TIMEOUT_SECONDS: float = float(os.getenv("ADMISSION_WRITE_QUEUE_TIMEOUT_SECONDS", 2))
+    ADMISSION_RETRY_AFTER_SECONDS: int = int(os.getenv("ADMISSION_RETRY_AFTER_SECONDS", 1))
 
     # For media uploads (example)
     # S3_BUCKET_NAME: str = os.getenv("S3_BUCKET_NAME")
@@ -0,0 +1,77 @@
+import abc
+import importlib
+import json
+import time
+from statistics import mean
+from typing import Any, Dict
+
+
+class RecommendationGenerator(abc.ABC):
+    """
+    Turns a user's recent inputs into a recommendation (stored as text, JSON here).
+
+    `generate` is synchronous and may be slow (model calls, heavy computation); it is always run
+    in the diet recommendation worker pool, never on the event loop. Implementations must be
+    thread-safe. Select one with DIET_RECOMMENDATION_GENERATOR="package.module:ClassName".
+    """
+
+    name = "base"
+
+    @abc.abstractmethod
+    def generate(self, inputs: Dict[str, Any]) -> str:
+        ...
+
+
+class DeterministicGenerator(RecommendationGenerator):
+    """
+    Rule-based stand-in: the same inputs always give the same output, with no external calls.
+    `delay_seconds` simulates a slow generator for benchmarks.
+    """
+
+    name = "deterministic-v1"
+
+    def __init__(self, delay_seconds: float = 0.0):
+        self.delay_seconds = delay_seconds
+
+    def generate(self, inputs: Dict[str, Any]) -> str:
+        if self.delay_seconds:
+            time.sleep(self.delay_seconds)
+        food_days = inputs.get("food_days") or []
+        goals = (inputs.get("goals") or "").lower()
+        weights = [day["avg"] for day in inputs.get("health_days") or [] if day["log_type"] == "weight_kg"]
+
+        avg_calories = round(mean(day["calories"] for day in food_days)) if food_days else None
+        target = 2200
+        if "lose" in goals or "cut" in goals:
+            target = 1800
+        elif "gain" in goals or "bulk" in goals or "muscle" in goals:
+            target = 2700
+        protein_target = round(1.8 * weights[-1]) if weights else 120
+
+        advice = []
+        if avg_calories is None:
+            advice.append("Log your meals for a few days to get personalised advice.")
+        elif avg_calories > target * 1.1:
+            advice.append(f"You average {avg_calories} kcal/day; aim for about {target}.")
+        elif avg_calories < target * 0.9:
+            advice.append(f"You average {avg_calories} kcal/day; you can eat up to about {target}.")
+        else:
+            advice.append("Your calorie intake is on target.")
+        if food_days and mean(day["protein"] for day in food_days) < protein_target * 0.8:
+            advice.append(f"Increase protein towards {protein_target} g/day.")
+
+        return json.dumps({
+            "generator": self.name,
+            "calorie_target": target,
+            "protein_target_g": protein_target,
+            "average_calories": avg_calories,
+            "advice": advice,
+        }, sort_keys=True)
+
+
+def load_generator(path: str) -> RecommendationGenerator:
+    """Instantiate a generator from "package.module:ClassName"."""
+    module_name, _, class_name = path.partition(":")
+    if not class_name:
+        raise ValueError(f"Generator path {path!r} must look like 'package.module:ClassName'")
+    return getattr(importlib.import_module(module_name), class_name)()
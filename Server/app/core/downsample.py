@@ -0,0 +1,40 @@
+from itertools import accumulate
+from typing import List, Sequence
+
+
+def lttb(xs: Sequence[float], ys: Sequence[float], threshold: int) -> List[int]:
+    """
+    Largest-Triangle-Three-Buckets: indexes of at most `threshold` points that keep the visual
+    shape of the series (peaks and dips survive, unlike plain averaging). `xs` must be ascending.
+
+    Bucket averages come from prefix sums, so each bucket costs one pass over its own points.
+    """
+    n = len(xs)
+    if threshold >= n or n <= 2:
+        return list(range(n))
+    threshold = max(threshold, 3)
+
+    sum_x = [0.0, *accumulate(xs)]
+    sum_y = [0.0, *accumulate(ys)]
+    every = (n - 2) / (threshold - 2)
+    # Bucket i (0-based, excluding the fixed first and last point) covers [bounds[i], bounds[i + 1])
+    bounds = [int(i * every) + 1 for i in range(threshold - 1)]
+    bounds[-1] = n - 1
+
+    selected = [0]
+    a = 0
+    for i in range(threshold - 2):
+        start, end = bounds[i], bounds[i + 1]
+        # Average of the next bucket (the last point for the final bucket)
+        next_start, next_end = (bounds[i + 1], bounds[i + 2]) if i + 2 < len(bounds) else (n - 1, n)
+        count = next_end - next_start
+        avg_x = (sum_x[next_end] - sum_x[next_start]) / count
+        avg_y = (sum_y[next_end] - sum_y[next_start]) / count
+
+        ax, ay = xs[a], ys[a]
+        dx, dy = avg_x - ax, avg_y - ay
+        # Twice the triangle area, up to sign; the constant terms don't change the argmax
+        a = max(range(start, end), key=lambda j: abs(dx * (ys[j] - ay) - dy * (xs[j] - ax)))
+        selected.append(a)
+    selected.append(n - 1)
+    return selected
@@ -0,0 +1,99 @@
+import asyncio
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Tuple
+
+from app.core.config import settings
+from app.core import metrics, security
+
+
+class HashQueueFullError(Exception):
+    """Every hash worker is busy and PASSWORD_HASH_MAX_QUEUE jobs are already waiting."""
+
+
+class PasswordHasher:
+    """
+    Runs bcrypt hashing/verification in a process pool so it never blocks the event loop.
+
+    At most `max_workers` jobs run at once; up to `max_queue` more may wait for a slot.
+    Anything beyond that is rejected straight away with HashQueueFullError instead of piling up.
+    """
+
+    def __init__(self, max_workers: int, max_queue: int):
+        self.max_workers = max(1, max_workers)
+        self.max_queue = max(0, max_queue)
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._slots = asyncio.Semaphore(self.max_workers)
+        self._waiting = 0
+
+    @property
+    def queue_depth(self) -> int:
+        return self._waiting
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # "spawn" so workers never inherit the running event loop or open DB sockets
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._executor
+
+    async def _run(self, fn, *args):
+        if self._slots.locked() and self._waiting >= self.max_queue:
+            raise HashQueueFullError()
+        queued_at = time.perf_counter()
+        self._waiting += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self._waiting -= 1
+        metrics.password_hash_wait.observe(time.perf_counter() - queued_at)
+        started = time.perf_counter()
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_executor(), fn, *args)
+        finally:
+            self._slots.release()
+            metrics.password_hash_duration.observe(time.perf_counter() - started, fn.__name__)
+
+    async def hash(self, password: str) -> str:
+        return await self._run(security.get_password_hash, password)
+
+    async def verify_and_update(self, plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+        return await self._run(security.verify_and_update_password, plain_password, hashed_password)
+
+    async def start(self) -> None:
+        # Spawning workers takes a while; do it at startup instead of on the first login
+        loop = asyncio.get_running_loop()
+        executor = self._get_executor()
+        await asyncio.gather(*(loop.run_in_executor(executor, int) for _ in range(self.max_workers)))
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+
+password_hasher = PasswordHasher(
+    max_workers=settings.PASSWORD_HASH_WORKERS,
+    max_queue=settings.PASSWORD_HASH_MAX_QUEUE,
+)
+
+metrics.registry.register(metrics.Gauge(
+    "password_hash_queue_depth", "Hash jobs waiting for a free worker.",
+    callback=lambda: {(): password_hasher.queue_depth},
+))
+
+
+async def hash_password(password: str) -> str:
+    return await password_hasher.hash(password)
+
+
+async def verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """
+    Returns (is_valid, new_hash). `new_hash` is set when the stored hash uses
+    outdated parameters and should be written back (rehash-on-login).
+    """
+    return await password_hasher.verify_and_update(plain_password, hashed_password)
@@ -0,0 +1,128 @@
+import asyncio
+import logging
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional
+
+from app.core.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+
+class QueueFullError(Exception):
+    pass
+
+
+class Job:
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
+    def __init__(self, key: Hashable, owner: Any, run: Callable[[], Awaitable[Any]]):
+        self.id = uuid.uuid4()
+        self.key = key
+        self.owner = owner # Whoever may poll it (e.g. a user id)
+        self.status = Job.QUEUED
+        self.result: Any = None
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.finished_at: Optional[float] = None
+        self._run = run
+
+    @property
+    def done(self) -> bool:
+        return self.status in (Job.SUCCEEDED, Job.FAILED)
+
+
+class JobQueue:
+    """
+    In-process background jobs run by `workers` asyncio tasks, with at most `max_queue` waiting.
+
+    Submitting a key that already has a queued or running job returns that job instead of a new
+    one (coalescing). Finished jobs stay pollable for `retention` seconds. Jobs live in this worker
+    process only; a restart loses queued work, so callers should persist results, not jobs.
+    A failed job's `error` is always `error_message`; the exception itself is only logged, since
+    its text (SQL, parameters, upstream responses) isn't for whoever polls the job.
+    """
+
+    def __init__(self, workers: int, max_queue: int, retention: float = 600, error_message: str = "Job failed"):
+        self.workers = max(1, workers)
+        self.error_message = error_message
+        self.max_queue = max(0, max_queue)
+        self._queue: "asyncio.Queue[Job]" = asyncio.Queue()
+        self._inflight: Dict[Hashable, Job] = {}
+        self._finished = TTLCache(maxsize=10000, ttl=retention)
+        self._by_id: Dict[uuid.UUID, Job] = {}
+        self._tasks: List[asyncio.Task] = []
+        self.coalesced = 0
+        self.rejected = 0
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize()
+
+    @property
+    def running(self) -> int:
+        return len(self._inflight) - self._queue.qsize()
+
+    def join(self, key: Hashable) -> Optional[Job]:
+        """The queued or running job for `key`, if any (counted as coalesced)."""
+        job = self._inflight.get(key)
+        if job is not None:
+            self.coalesced += 1
+        return job
+
+    def submit(self, key: Hashable, owner: Any, run: Callable[[], Awaitable[Any]]) -> Job:
+        job = self.join(key)
+        if job is not None:
+            return job
+        if self._queue.qsize() >= self.max_queue:
+            self.rejected += 1
+            raise QueueFullError("Job queue is full")
+        job = Job(key, owner, run)
+        self._inflight[key] = job
+        self._by_id[job.id] = job
+        self._queue.put_nowait(job)
+        return job
+
+    def get(self, job_id: uuid.UUID) -> Optional[Job]:
+        return self._by_id.get(job_id) or self._finished.get(job_id)
+
+    async def _work(self) -> None:
+        while True:
+            job = await self._queue.get()
+            job.status = Job.RUNNING
+            try:
+                job.result = await job._run()
+                job.status = Job.SUCCEEDED
+            except Exception:
+                logger.exception("Job %s failed", job.id)
+                job.error = self.error_message
+                job.status = Job.FAILED
+            finally:
+                job.finished_at = time.time()
+                job._run = None # Drop whatever the closure holds on to
+                self._inflight.pop(job.key, None)
+                self._by_id.pop(job.id, None)
+                self._finished.set(job.id, job)
+                self._queue.task_done()
+
+    def start(self) -> None:
+        if not self._tasks:
+            self._tasks = [asyncio.create_task(self._work()) for _ in range(self.workers)]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "workers": self.workers,
+            "queued": self.queue_depth,
+            "running": self.running,
+            "coalesced": self.coalesced,
+            "rejected": self.rejected,
+        }
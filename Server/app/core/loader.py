@@ -0,0 +1,82 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterable, List, Optional, Set
+
+BatchFunction = Callable[[List[Hashable]], Awaitable[Dict[Hashable, Any]]]
+
+
+class BatchLoader:
+    """
+    DataLoader-style lookups shared by every request of this worker.
+
+    `load(key)` calls made during one pass of the event loop are collected and answered
+    by a single `batch_fn(keys)` call (at most `max_batch_size` keys each), which returns
+    {key: value} and simply leaves out keys that don't exist. A key whose batch is already
+    in flight joins it instead of being queried again (singleflight).
+
+    Nothing is cached: once a batch completes, the next load of its keys queries again.
+    Not thread-safe; it is meant to be used from the event loop only.
+    """
+
+    def __init__(self, batch_fn: BatchFunction, max_batch_size: int):
+        self.batch_fn = batch_fn
+        self.max_batch_size = max(1, max_batch_size)
+        self._pending: Dict[Hashable, asyncio.Future] = {} # Collected this pass, not dispatched yet
+        self._in_flight: Dict[Hashable, asyncio.Future] = {}
+        self._dispatch_scheduled = False
+        self._tasks: Set[asyncio.Task] = set()
+        self.batches = 0
+        self.keys_loaded = 0
+        self.coalesced = 0 # Loads answered by a query another caller had already asked for
+
+    async def load(self, key: Hashable) -> Optional[Any]:
+        future = self._in_flight.get(key) or self._pending.get(key)
+        if future is not None:
+            self.coalesced += 1
+        else:
+            loop = asyncio.get_running_loop()
+            future = self._pending[key] = loop.create_future()
+            if not self._dispatch_scheduled:
+                self._dispatch_scheduled = True
+                loop.call_soon(self._dispatch)
+        # Shielded: a caller that gives up must not cancel the lookup for everyone else
+        return await asyncio.shield(future)
+
+    async def load_many(self, keys: Iterable[Hashable]) -> Dict[Hashable, Any]:
+        """The values found for `keys`, in one batch for all keys not already in flight."""
+        keys = list(dict.fromkeys(keys))
+        values = await asyncio.gather(*(self.load(key) for key in keys))
+        return {key: value for key, value in zip(keys, values) if value is not None}
+
+    def _dispatch(self) -> None:
+        self._dispatch_scheduled = False
+        pending, self._pending = self._pending, {}
+        keys = list(pending)
+        for start in range(0, len(keys), self.max_batch_size):
+            batch = {key: pending[key] for key in keys[start:start + self.max_batch_size]}
+            self._in_flight.update(batch)
+            task = asyncio.create_task(self._run(batch))
+            self._tasks.add(task) # The loop only keeps weak references to tasks
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: Dict[Hashable, asyncio.Future]) -> None:
+        self.batches += 1
+        self.keys_loaded += len(batch)
+        try:
+            values = await self.batch_fn(list(batch))
+        except Exception as exc:
+            for future in batch.values():
+                if not future.done():
+                    future.set_exception(exc)
+                    future.exception() # Marked retrieved: every waiter may have gone already
+        except BaseException:
+            for future in batch.values():
+                future.cancel() # e.g. the loop shutting down
+            raise
+        else:
+            for key, future in batch.items():
+                if not future.done():
+                    future.set_result(values.get(key))
+        finally:
+            for key, future in batch.items():
+                if self._in_flight.get(key) is future:
+                    del self._in_flight[key]
@@ -0,0 +1,233 @@
+import heapq
+import math
+import re
+from array import array
+from bisect import bisect_left, insort
+from collections import Counter
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+_NON_ALNUM = re.compile(r"[^0-9a-z]+")
+
+# Names re-scored exactly per query
+CANDIDATES = 100
+# Names walked in popularity order looking for candidates before switching to set intersection
+SCAN_BUDGET = 1000
+# Vocabulary words a (partial) query word may expand to, by prefix and by typo
+MAX_PREFIX_WORDS = 20
+MAX_FUZZY_WORDS = 5
+# Trigram similarity a vocabulary word needs to count as a typo of a query word
+MIN_WORD_SIMILARITY = 0.4
+
+
+def normalize(text: str) -> str:
+    return _NON_ALNUM.sub(" ", text.lower()).strip()
+
+
+def trigrams(word: str) -> Set[str]:
+    """pg_trgm-style trigrams of one word, padded with two spaces in front and one behind."""
+    padded = f"  {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def one_edit_apart(a: str, b: str) -> bool:
+    """True if `b` is `a` with one character inserted, removed, replaced, or two neighbours swapped."""
+    if a == b or abs(len(a) - len(b)) > 1:
+        return False
+    i = 0
+    while i < min(len(a), len(b)) and a[i] == b[i]:
+        i += 1
+    if len(a) == len(b):
+        swapped = i + 1 < len(a) and a[i] == b[i + 1] and a[i + 1] == b[i]
+        return a[i + 1:] == b[i + 1:] or (swapped and a[i + 2:] == b[i + 2:])
+    return a[i + 1:] == b[i:] if len(a) > len(b) else a[i:] == b[i + 1:]
+
+
+class SearchIndex:
+    """
+    In-memory name search, typo-tolerant and ranked by popularity (`weight`).
+
+    Two levels: names are indexed by their words, and the (much smaller) word vocabulary by
+    trigrams. A query word matches vocabulary words exactly, by prefix (the last word, as the
+    user is still typing) or by trigram similarity (typos); a name is a candidate when it has a
+    match for every query word. Candidates are re-scored by how much of the name the query covers,
+    then popularity.
+
+    `load` numbers names by descending weight, so each word's postings are already in popularity
+    order and the most popular candidates are found without scanning everything. Names added
+    later by `upsert` go to the end (and a weight change doesn't move a name) until the next
+    `load`, which only affects which candidates are found first, not their score.
+
+    Holds at most `max_entries` names; `load` keeps the most popular and `upsert` ignores new
+    names once full. Not thread-safe; use it from the event loop.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._clear()
+
+    def _clear(self) -> None:
+        self._keys: List[str] = []
+        self._names: List[str] = []
+        self._weights: List[int] = []
+        self._ids: Dict[str, int] = {}
+        self._postings: Dict[str, array] = {} # word -> ids of the names containing it
+        self._vocabulary: List[str] = [] # sorted, for prefix matches
+        self._word_grams: Dict[str, List[str]] = {} # trigram -> vocabulary words
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def load(self, entries: Iterable[Tuple[str, int]]) -> None:
+        """Replace the contents with `entries` (name, weight), keeping the `max_entries` heaviest."""
+        self._clear()
+        for name, weight in heapq.nlargest(self.max_entries, entries, key=lambda entry: entry[1]):
+            self.upsert(name, weight)
+
+    def upsert(self, name: str, weight: int) -> bool:
+        """Add a name or update its weight. False if the index is full and the name is new."""
+        key = normalize(name)
+        if not key:
+            return False
+        entry_id = self._ids.get(key)
+        if entry_id is not None:
+            self._names[entry_id] = name
+            self._weights[entry_id] = weight
+            return True
+        if len(self._keys) >= self.max_entries:
+            return False
+        entry_id = len(self._keys)
+        self._keys.append(key)
+        self._names.append(name)
+        self._weights.append(weight)
+        self._ids[key] = entry_id
+        for word in set(key.split()):
+            postings = self._postings.get(word)
+            if postings is None:
+                postings = self._postings[word] = array("I")
+                insort(self._vocabulary, word)
+                for gram in trigrams(word):
+                    self._word_grams.setdefault(gram, []).append(word)
+            postings.append(entry_id)
+        return True
+
+    def _expand(self, word: str, prefix: bool) -> Dict[str, float]:
+        """Vocabulary words `word` may stand for, with how well each matches (1.0 exact)."""
+        matches = {}
+        if prefix:
+            start = bisect_left(self._vocabulary, word)
+            words = []
+            for candidate in self._vocabulary[start:]:
+                if not candidate.startswith(word):
+                    break
+                words.append(candidate)
+            for candidate in heapq.nlargest(MAX_PREFIX_WORDS, words, key=lambda w: len(self._postings[w])):
+                matches[candidate] = 0.9
+        known = word in self._postings
+        if len(word) >= 3:
+            grams = trigrams(word)
+            shared = Counter(w for gram in grams for w in self._word_grams.get(gram, ()))
+            fuzzy = []
+            for candidate, count in shared.items():
+                similarity = count / (len(grams) + len(candidate) + 2 - count) # A word has len + 2 trigrams
+                if similarity < MIN_WORD_SIMILARITY and not known and one_edit_apart(word, candidate):
+                    similarity = MIN_WORD_SIMILARITY # Short words share few trigrams even one typo apart
+                if similarity >= MIN_WORD_SIMILARITY:
+                    fuzzy.append((similarity, candidate))
+            for similarity, candidate in heapq.nlargest(MAX_FUZZY_WORDS, fuzzy):
+                matches[candidate] = max(matches.get(candidate, 0.0), 0.8 * similarity)
+        if known:
+            matches[word] = 1.0
+        return matches
+
+    def _ids_in_order(self, words: Iterable[str]) -> Iterator[int]:
+        """Ids of the names containing any of `words`, roughly most popular first, without repeats."""
+        postings = [self._postings[word] for word in words]
+        merged = postings[0] if len(postings) == 1 else heapq.merge(*postings)
+        last = -1
+        for entry_id in merged:
+            if entry_id != last:
+                last = entry_id
+                yield entry_id
+
+    def _matches_all(self, entry_id: int, groups: List[Dict[str, float]]) -> bool:
+        words = self._keys[entry_id].split()
+        return all(any(word in group for word in words) for group in groups)
+
+    def _scan(self, groups: List[Dict[str, float]]) -> Optional[Set[int]]:
+        """
+        Walk the first (rarest) group's names in popularity order, keeping those that match every
+        other group, until there are CANDIDATES of them. Cheap when most names match (typing a
+        prefix); None if SCAN_BUDGET names weren't enough or nothing matched.
+        """
+        candidates = set()
+        scanned = 0
+        for entry_id in self._ids_in_order(groups[0]):
+            if self._matches_all(entry_id, groups[1:]):
+                candidates.add(entry_id)
+                if len(candidates) >= CANDIDATES:
+                    break
+            scanned += 1
+            if scanned >= SCAN_BUDGET:
+                return None
+        return candidates or None
+
+    def _intersect(self, groups: List[Dict[str, float]]) -> Set[int]:
+        """
+        Intersect the groups' postings from the rarest up (set.intersection runs in C over each
+        array) and keep the lowest ids, which were numbered most popular first. Cheap when few
+        names match every word.
+        """
+        rarest = set().union(*(self._postings[word] for word in groups[0]))
+        remaining = rarest
+        for group in groups[1:]:
+            remaining = set().union(*(remaining.intersection(self._postings[word]) for word in group))
+            if not remaining: # No name has every word; settle for the rarest one's most popular names
+                remaining = rarest
+                break
+        return set(heapq.nsmallest(CANDIDATES, remaining))
+
+    def search(self, query: str, limit: int = 10) -> List[Tuple[str, int, float]]:
+        """[(name, weight, score)], best first."""
+        key = normalize(query)
+        if not key:
+            return []
+        query_words = key.split()
+        groups = [self._expand(word, prefix=i == len(query_words) - 1) for i, word in enumerate(query_words)]
+        matched = [group for group in groups if group]
+        if not matched:
+            return []
+
+        matched.sort(key=lambda group: sum(len(self._postings[word]) for word in group))
+        # Scanning pays off when a fair share of the rarest group's names match the rest; guess
+        # that share from the other groups' sizes as if words were independent
+        share = 1.0
+        for group in matched[1:]:
+            share *= min(1.0, sum(len(self._postings[word]) for word in group) / len(self._keys))
+        candidates = self._scan(matched) if SCAN_BUDGET * share >= CANDIDATES else None
+        if candidates is None:
+            candidates = self._intersect(matched)
+        if key in self._ids:
+            candidates.add(self._ids[key])
+
+        results = []
+        for entry_id in candidates:
+            entry_key = self._keys[entry_id]
+            entry_words = entry_key.split()
+            covered = sum(max(group.get(word, 0.0) for word in entry_words) for group in groups)
+            # Share of the words on both sides that match: extra words in the name cost too
+            score = covered / max(len(groups), len(entry_words))
+            if entry_key.startswith(key):
+                score += 0.1
+            weight = self._weights[entry_id]
+            score += 0.02 * math.log1p(weight) # Popularity breaks near-ties and lifts common names a little
+            results.append((score, weight, entry_id))
+        top = heapq.nlargest(limit, results)
+        return [(self._names[i], weight, round(score, 4)) for score, weight, i in top]
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "entries": len(self._keys),
+            "max_entries": self.max_entries,
+            "words": len(self._vocabulary),
+            "postings": sum(len(ids) for ids in self._postings.values()),
+        }
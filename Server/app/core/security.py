@@ -1,11 +1,17 @@
+import uuid
+from functools import lru_cache
 from datetime import datetime, timedelta
-from typing import Any, Union, Optional
+from typing import Any, Union, Optional, Tuple
 from jose import jwt, JWTError
-from passlib.context import CryptContext
 from pydantic import BaseModel, UUID4
 from app.core.config import settings
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+@lru_cache(maxsize=None)
+def pwd_context():
+    # Built on first use: hashing runs in the password hash workers (app.core.hashing), so the
+    # API process never needs to import passlib (about 25 ms)
+    from passlib.context import CryptContext
+    return CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 ALGORITHM = settings.ALGORITHM
 JWT_SECRET_KEY = settings.SECRET_KEY
@@ -18,6 +24,8 @@ class TokenPayload(BaseModel):
     user_id: Optional[UUID4] = None
     role: Optional[str] = None
     exp: Optional[datetime] = None
+    type: Optional[str] = None # "access" or "refresh"; only access tokens are accepted as bearer tokens
+    jti: Optional[str] = None
 
 def create_access_token(subject: Union[str, Any], user_id: UUID4, role: str, expires_delta: timedelta = None) -> str:
     if expires_delta:
@@ -29,12 +37,14 @@ def create_access_token(subject: Union[str, Any], user_id: UUID4, role: str, exp
         "exp": expire,
         "sub": str(subject), # Usually email or username
         "user_id": str(user_id),
-        "role": role
+        "role": role,
+        "type": "access",
     }
     encoded_jwt = jwt.encode(to_encode, JWT_SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-def create_refresh_token(subject: Union[str, Any], user_id: UUID4, role: str, expires_delta: timedelta = None) -> str:
+def create_refresh_token(user_id: UUID4, expires_delta: timedelta = None) -> str:
+    # No username or role: rotation reads them from the user row, so renames and role changes apply
     if expires_delta:
         expire = datetime.utcnow() + expires_delta
     else:
@@ -42,19 +52,22 @@ def create_refresh_token(subject: Union[str, Any], user_id: UUID4, role: str, ex
 
     to_encode = {
         "exp": expire,
-        "sub": str(subject),
         "user_id": str(user_id),
-        "role": role,
-        "type": "refresh" # Differentiate from access token
+        "type": "refresh", # Differentiate from access token
+        "jti": uuid.uuid4().hex, # Unique per token, so every token has its own hash in refresh_tokens
     }
     encoded_jwt = jwt.encode(to_encode, JWT_SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+    return pwd_context().verify(plain_password, hashed_password)
+
+def verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    # Second item is a fresh hash when the stored one is deprecated (needs_update)
+    return pwd_context().verify_and_update(plain_password, hashed_password)
 
 def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
+    return pwd_context().hash(password)
 
 def decode_token(token: str) -> Optional[TokenPayload]:
     try:
@@ -0,0 +1,110 @@
+import base64
+import time
+from datetime import datetime
+from itertools import combinations
+from typing import Any, Dict, Iterable, Optional, Tuple
+from uuid import UUID
+
+from sqlalchemy import text
+from sqlalchemy.engine import Result
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncResult, AsyncSession
+from sqlalchemy.sql.elements import TextClause
+
+from app.core import metrics
+
+
+class StatementRegistry:
+    """
+    Named SQL statements, built once at import time and shared by every CRUD module.
+
+    Reusing the same `text()` object (and therefore the same SQL string) lets SQLAlchemy
+    hit its compiled cache and lets asyncpg reuse its per-connection prepared statement
+    (see DB_PREPARED_STATEMENT_CACHE_SIZE). Executions are counted and timed per name.
+    """
+
+    def __init__(self):
+        self._statements: Dict[str, TextClause] = {}
+        self._stats: Dict[str, Dict[str, float]] = {}
+
+    def register(self, name: str, sql: str) -> TextClause:
+        if name in self._statements:
+            raise ValueError(f"Statement {name!r} is already registered")
+        statement = text(sql)
+        self._statements[name] = statement
+        self._stats[name] = {"calls": 0, "total_seconds": 0.0, "max_seconds": 0.0}
+        return statement
+
+    def register_update_variants(
+        self, name: str, table: str, columns: Iterable[str], where: str, returning: str
+    ) -> None:
+        """
+        Pre-build one UPDATE per non-empty subset of `columns`, so a partial update
+        never produces SQL we haven't seen before. Look them up with `update_name`.
+        """
+        columns = sorted(columns)
+        for size in range(1, len(columns) + 1):
+            for subset in combinations(columns, size):
+                set_clause = ", ".join(f"{column} = :{column}" for column in subset)
+                self.register(
+                    self.update_name(name, subset),
+                    f"UPDATE {table} SET {set_clause} WHERE {where} RETURNING {returning}",
+                )
+
+    @staticmethod
+    def update_name(name: str, columns: Iterable[str]) -> str:
+        return f"{name}[{','.join(sorted(columns))}]"
+
+    def get(self, name: str) -> TextClause:
+        return self._statements[name]
+
+    async def execute(self, db: AsyncSession, name: str, params: Optional[Dict[str, Any]] = None) -> Result:
+        statement = self._statements[name]
+        started = time.perf_counter()
+        result = None
+        try:
+            result = await db.execute(statement, params or {})
+            return result
+        finally:
+            elapsed = time.perf_counter() - started
+            stats = self._stats[name]
+            stats["calls"] += 1
+            stats["total_seconds"] += elapsed
+            if elapsed > stats["max_seconds"]:
+                stats["max_seconds"] = elapsed
+            metrics.db_query_duration.observe(elapsed, name)
+            if result is not None and result.rowcount > 0:
+                metrics.db_query_rows.inc(name, amount=result.rowcount)
+
+    async def stream(
+        self, conn: AsyncConnection, name: str, params: Optional[Dict[str, Any]], batch_size: int
+    ) -> AsyncResult:
+        """
+        Run a statement on a server-side cursor, fetching `batch_size` rows at a time (use
+        `result.partitions()`). asyncpg only opens cursors inside a transaction. Only calls are
+        counted: how long a stream stays open depends on whoever consumes it.
+        """
+        self._stats[name]["calls"] += 1
+        return await conn.stream(self._statements[name], params or {}, execution_options={"yield_per": batch_size})
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        return {name: dict(values) for name, values in self._stats.items() if values["calls"]}
+
+
+statements = StatementRegistry()
+
+
+# Opaque keyset cursors over (created_at, id), shared by the newest-first lists
+class InvalidCursorError(ValueError):
+    pass
+
+def encode_cursor(created_at: datetime, row_id: UUID) -> str:
+    raw = f"{created_at.isoformat()}|{row_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[datetime, UUID]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, row_id = raw.split("|")
+        return datetime.fromisoformat(created_at), UUID(row_id)
+    except ValueError as exc: # Also covers binascii.Error and UnicodeDecodeError
+        raise InvalidCursorError("Invalid cursor") from exc
@@ -0,0 +1,161 @@
+import asyncio
+import hashlib
+import json
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, time, timedelta, timezone
+from sqlalchemy.ext.asyncio import AsyncSession
+from uuid import UUID
+from typing import Optional, Dict, Any, Tuple
+
+from app.core import metrics
+from app.core.config import settings
+from app.core.diet_generator import RecommendationGenerator, load_generator
+from app.core.jobs import Job, JobQueue
+from app.crud.base import statements
+
+# How far back the generator looks at food and health logs
+INPUT_DAYS = 14
+
+_RECOMMENDATION_COLUMNS = "id, user_id, recommendation, input_hash, generated_at"
+
+# Everything the generator sees, in one round trip and from the summary tables only. Values are
+# rounded and ordered so that unchanged data always serialises (and hashes) the same way.
+statements.register("diet.inputs", """
+    SELECT
+        (SELECT fitness_goals FROM profiles WHERE user_id = :user_id) AS goals,
+        (SELECT COALESCE(json_agg(json_build_object(
+                'day', d.log_day, 'items', d.items, 'calories', d.calories, 'protein', d.protein,
+                'carbs', d.carbs, 'fat', d.fat
+            ) ORDER BY d.log_day), '[]')
+         FROM (
+            SELECT log_day, sum(item_count) AS items,
+                round(CAST(sum(calories) AS numeric), 1) AS calories, round(CAST(sum(protein) AS numeric), 1) AS protein,
+                round(CAST(sum(carbs) AS numeric), 1) AS carbs, round(CAST(sum(fat) AS numeric), 1) AS fat
+            FROM food_log_daily_totals
+            WHERE user_id = :user_id AND log_day >= :since_day AND item_count > 0
+            GROUP BY log_day
+         ) d) AS food_days,
+        (SELECT COALESCE(json_agg(json_build_object(
+                'log_type', log_type, 'day', CAST(bucket_start AT TIME ZONE 'UTC' AS date),
+                'avg', round(CAST(value_sum / value_count AS numeric), 2)
+            ) ORDER BY log_type, bucket_start), '[]')
+         FROM health_log_rollups
+         WHERE user_id = :user_id AND bucket = 'day' AND bucket_start >= :since) AS health_days
+""")
+statements.register("diet.get_by_hash", f"""
+    SELECT {_RECOMMENDATION_COLUMNS} FROM diet_recommendations
+    WHERE user_id = :user_id AND input_hash = :input_hash
+    ORDER BY generated_at DESC
+    LIMIT 1
+""")
+statements.register("diet.get_latest", f"""
+    SELECT {_RECOMMENDATION_COLUMNS} FROM diet_recommendations
+    WHERE user_id = :user_id
+    ORDER BY generated_at DESC
+    LIMIT 1
+""")
+statements.register("diet.create", f"""
+    INSERT INTO diet_recommendations (user_id, recommendation, input_hash)
+    VALUES (:user_id, :recommendation, :input_hash)
+    RETURNING {_RECOMMENDATION_COLUMNS}
+""")
+
+# Keyed by user id, so repeated requests from one user share the job already queued or running
+diet_jobs = JobQueue(
+    workers=settings.DIET_RECOMMENDATION_WORKERS,
+    max_queue=settings.DIET_RECOMMENDATION_MAX_QUEUE,
+    error_message="Recommendation generation failed",
+)
+_executor: Optional[ThreadPoolExecutor] = None
+_generator: Optional[RecommendationGenerator] = None
+
+metrics.registry.register(metrics.Gauge(
+    "diet_recommendation_jobs", "Diet recommendation jobs by state.", ("state",),
+    callback=lambda: {("queued",): diet_jobs.queue_depth, ("running",): diet_jobs.running},
+))
+metrics.registry.register(metrics.Counter(
+    "diet_recommendation_requests_total", "Diet recommendation requests not answered by a new job.", ("result",),
+    callback=lambda: {("coalesced",): diet_jobs.coalesced, ("rejected",): diet_jobs.rejected},
+))
+
+
+def get_generator() -> RecommendationGenerator:
+    global _generator
+    if _generator is None:
+        _generator = load_generator(settings.DIET_RECOMMENDATION_GENERATOR)
+    return _generator
+
+def set_generator(generator: RecommendationGenerator) -> None:
+    """Swap the generator at runtime (tests, benchmarks)."""
+    global _generator
+    _generator = generator
+
+def start_workers() -> None:
+    global _executor
+    get_generator() # A bad DIET_RECOMMENDATION_GENERATOR fails startup, not the first job
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=diet_jobs.workers, thread_name_prefix="diet-recommendation")
+    diet_jobs.start()
+
+async def stop_workers() -> None:
+    global _executor
+    await diet_jobs.stop()
+    if _executor is not None:
+        _executor.shutdown(wait=True, cancel_futures=True)
+        _executor = None
+
+
+def hash_inputs(generator: RecommendationGenerator, inputs: Dict[str, Any]) -> str:
+    canonical = json.dumps({"generator": generator.name, "inputs": inputs}, sort_keys=True, default=str)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+async def get_inputs(db: AsyncSession, user_id: UUID) -> Dict[str, Any]:
+    since_day = datetime.now(timezone.utc).date() - timedelta(days=INPUT_DAYS)
+    result = await statements.execute(db, "diet.inputs", {
+        "user_id": user_id,
+        "since_day": since_day,
+        "since": datetime.combine(since_day, time.min, tzinfo=timezone.utc),
+    })
+    row = result.fetchone()
+    return {
+        "goals": row.goals,
+        "food_days": json.loads(row.food_days) if isinstance(row.food_days, str) else row.food_days,
+        "health_days": json.loads(row.health_days) if isinstance(row.health_days, str) else row.health_days,
+    }
+
+async def get_latest_recommendation(db: AsyncSession, user_id: UUID) -> Optional[Dict[str, Any]]:
+    result = await statements.execute(db, "diet.get_latest", {"user_id": user_id})
+    row = result.fetchone()
+    return dict(row._mapping) if row else None
+
+async def _generate_and_store(user_id: UUID, inputs: Dict[str, Any], input_hash: str) -> Dict[str, Any]:
+    from app.db import session as db_session # Runs outside any request, with its own session
+
+    generator = get_generator()
+    loop = asyncio.get_running_loop()
+    recommendation = await loop.run_in_executor(_executor, generator.generate, inputs)
+    db_session.init_engines()
+    async with db_session.AsyncSessionLocal() as db:
+        result = await statements.execute(db, "diet.create", {
+            "user_id": user_id, "recommendation": recommendation, "input_hash": input_hash,
+        })
+        row = result.fetchone()
+        await db.commit()
+    return dict(row._mapping)
+
+async def request_recommendation(db: AsyncSession, user_id: UUID) -> Tuple[Optional[Dict[str, Any]], Optional[Job]]:
+    """
+    (stored recommendation, None) when one exists for the user's current inputs, otherwise
+    (None, job) for a queued or already in-flight generation. Raises QueueFullError.
+    """
+    job = diet_jobs.join(user_id)
+    if job is not None:
+        return None, job
+
+    inputs = await get_inputs(db, user_id)
+    input_hash = hash_inputs(get_generator(), inputs)
+    result = await statements.execute(db, "diet.get_by_hash", {"user_id": user_id, "input_hash": input_hash})
+    row = result.fetchone()
+    if row is not None:
+        return dict(row._mapping), None
+    return None, diet_jobs.submit(user_id, user_id, lambda: _generate_and_store(user_id, inputs, input_hash))
@@ -0,0 +1,138 @@
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import Optional, Dict, Any, List
+
+from app.core import metrics
+from app.core.config import settings
+from app.core.search import SearchIndex
+from app.crud.base import statements
+
+logger = logging.getLogger(__name__)
+
+# Same normalisation as app.core.search.normalize, so one catalog entry is one index entry.
+# idx_exercises_name_key is on this expression.
+_NAME_KEY = "btrim(regexp_replace(lower({}), '[^0-9a-z]+', ' ', 'g'))"
+
+# Exercise names as users typed them, one entry per normalised name, popularity = how many
+# exercises use it. The most common spelling is the one shown.
+statements.register("exercises.catalog", f"""
+    SELECT DISTINCT ON (name_key) name_key, name, CAST(sum(uses) OVER (PARTITION BY name_key) AS int) AS uses, last_updated
+    FROM (
+        SELECT {_NAME_KEY.format("name")} AS name_key, name, count(*) AS uses, max(updated_at) AS last_updated
+        FROM exercises
+        GROUP BY 1, 2
+    ) spellings
+    ORDER BY name_key, uses DESC
+""")
+# Names touched since :since (idx_exercises_updated_at), recounted in full so that applying
+# the same change twice is harmless
+statements.register("exercises.catalog_changes", f"""
+    WITH changed AS (
+        SELECT DISTINCT {_NAME_KEY.format("name")} AS name_key FROM exercises WHERE updated_at > :since
+    ), spellings AS (
+        SELECT c.name_key, e.name, count(*) AS uses, max(e.updated_at) AS last_updated
+        FROM changed c
+        JOIN exercises e ON {_NAME_KEY.format("e.name")} = c.name_key
+        GROUP BY 1, 2
+    )
+    SELECT DISTINCT ON (name_key) name_key, name, CAST(sum(uses) OVER (PARTITION BY name_key) AS int) AS uses,
+        max(last_updated) OVER (PARTITION BY name_key) AS last_updated
+    FROM spellings
+    ORDER BY name_key, uses DESC
+""")
+
+
+class ExerciseCatalog:
+    """
+    Searchable catalog of exercise names, kept in memory (one copy per worker process).
+
+    Loaded in full at startup, then refreshed every `refresh_interval` seconds from the rows
+    changed since the last refresh. Rows written by long transactions can carry an older
+    updated_at, so each refresh looks back `overlap` seconds further. Deleted exercises (and
+    names nobody uses any more) only drop out at the full reload every `reload_interval`
+    seconds, which also re-sorts names added since by popularity.
+    """
+
+    def __init__(self, max_names: int, refresh_interval: float, reload_interval: float, overlap: float = 60):
+        self.index = SearchIndex(max_entries=max_names)
+        self.refresh_interval = refresh_interval
+        self.reload_interval = reload_interval
+        self.overlap = timedelta(seconds=overlap)
+        self._watermark: Optional[datetime] = None
+        self._loaded_at = 0.0
+        self._task: Optional[asyncio.Task] = None
+        self.refreshes = 0
+
+    async def reload(self) -> None:
+        from app.db import session as db_session # Runs outside any request, with its own session
+
+        # Always the primary: a lagging replica would let changes slip under the watermark
+        db_session.init_engines()
+        async with db_session.ReadOnlySessionLocal() as db:
+            rows = (await statements.execute(db, "exercises.catalog")).fetchall()
+        # Built off the event loop into a fresh index, then swapped in; searches keep using the old one meanwhile
+        index = SearchIndex(max_entries=self.index.max_entries)
+        await asyncio.to_thread(index.load, [(row.name, row.uses) for row in rows])
+        self.index = index
+        self._watermark = max((row.last_updated for row in rows if row.last_updated), default=None)
+        self._loaded_at = time.monotonic()
+        logger.info("Exercise catalog loaded: %d names (%d indexed)", len(rows), len(self.index))
+
+    async def refresh(self) -> int:
+        """Apply names changed since the last load or refresh. Returns how many were updated."""
+        if self._watermark is None or time.monotonic() - self._loaded_at >= self.reload_interval:
+            await self.reload()
+            return len(self.index)
+
+        from app.db import session as db_session
+
+        db_session.init_engines()
+        async with db_session.ReadOnlySessionLocal() as db:
+            result = await statements.execute(db, "exercises.catalog_changes", {"since": self._watermark - self.overlap})
+            rows = result.fetchall()
+        for row in rows:
+            self.index.upsert(row.name, row.uses)
+            self._watermark = max(self._watermark, row.last_updated)
+        self.refreshes += 1
+        return len(rows)
+
+    def search(self, query: str, limit: int) -> List[Dict[str, Any]]:
+        return [{"name": name, "uses": uses, "score": score} for name, uses, score in self.index.search(query, limit)]
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            try:
+                await self.refresh()
+            except Exception:
+                logger.exception("Exercise catalog refresh failed; will retry")
+
+    async def start(self) -> None:
+        """Load the catalog (search works from the first request) and keep it fresh in the background."""
+        try:
+            await self.reload()
+        except Exception: # Serve without search results rather than not at all; the loop retries
+            logger.exception("Exercise catalog load failed; will retry")
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+exercise_catalog = ExerciseCatalog(
+    max_names=settings.EXERCISE_SEARCH_MAX_NAMES,
+    refresh_interval=settings.EXERCISE_SEARCH_REFRESH_SECONDS,
+    reload_interval=settings.EXERCISE_SEARCH_RELOAD_SECONDS,
+)
+metrics.registry.register(metrics.Gauge(
+    "exercise_catalog_names", "Exercise names in the search index.", callback=lambda: {(): len(exercise_catalog.index)},
+))
@@ -0,0 +1,177 @@
+import csv
+import io
+import zlib
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence, Tuple
+from uuid import UUID
+
+import orjson
+
+from app.core import metrics
+from app.core.config import settings
+from app.crud.base import statements
+
+# A user's whole account, one section per table. Each statement is streamed from a server-side
+# cursor in the order given, so the worker only ever holds one fetch batch of one section.
+# Orders follow existing indexes where the tables can get big (health_logs, food_logs).
+EXPORT_SECTIONS = {
+    "account": """
+        SELECT u.id, u.username, u.email, u.role, p.bio, p.profile_picture_url, p.fitness_goals,
+            u.created_at, u.updated_at
+        FROM users u LEFT JOIN profiles p ON p.user_id = u.id
+        WHERE u.id = :user_id
+    """,
+    "posts": """
+        SELECT id, content, media_url, created_at, updated_at
+        FROM posts WHERE user_id = :user_id ORDER BY created_at, id
+    """,
+    "comments": """
+        SELECT id, post_id, content, created_at, updated_at
+        FROM comments WHERE user_id = :user_id ORDER BY created_at, id
+    """,
+    "workouts": """
+        SELECT id, name, description, created_at, updated_at
+        FROM workouts WHERE user_id = :user_id ORDER BY created_at, id
+    """,
+    "exercises": """
+        SELECT e.id, e.workout_id, e.name, e.sets, e.reps, e.weight, e.duration_seconds, e.notes,
+            e.order_in_workout, e.created_at, e.updated_at
+        FROM exercises e JOIN workouts w ON w.id = e.workout_id
+        WHERE w.user_id = :user_id
+        ORDER BY w.created_at, w.id, e.order_in_workout
+    """,
+    "health_logs": """
+        SELECT id, log_type, value, log_date, created_at, updated_at
+        FROM health_logs WHERE user_id = :user_id ORDER BY log_type, log_date
+    """,
+    "food_logs": """
+        SELECT id, food_name, external_food_id, calories, protein, carbs, fat, serving_size, meal_type,
+            log_date, created_at, updated_at
+        FROM food_logs WHERE user_id = :user_id ORDER BY log_date
+    """,
+    "diet_recommendations": """
+        SELECT id, recommendation, generated_at, created_at
+        FROM diet_recommendations WHERE user_id = :user_id ORDER BY generated_at
+    """,
+}
+for _section, _sql in EXPORT_SECTIONS.items():
+    statements.register(f"export.{_section}", _sql)
+
+# Each running export holds a pooled connection (and an open snapshot) until the client has it all
+export_slots_in_use = 0
+active_exports = 0
+exported_rows: Dict[str, int] = dict.fromkeys(EXPORT_SECTIONS, 0)
+metrics.registry.register(metrics.Gauge(
+    "account_exports_active", "Account exports currently streaming.", callback=lambda: {(): active_exports},
+))
+metrics.registry.register(metrics.Counter(
+    "account_export_rows_total", "Rows streamed by account exports, by section.", ("section",),
+    callback=lambda: {(section,): count for section, count in exported_rows.items()},
+))
+
+
+class ExportBusyError(Exception):
+    """EXPORT_MAX_CONCURRENT exports are already running in this worker."""
+
+
+async def stream_sections(
+    user_id: UUID, sections: Sequence[str], batch_size: int
+) -> AsyncIterator[Tuple[str, List[str], List[Tuple[Any, ...]]]]:
+    """
+    (section, column names, up to `batch_size` rows) for each fetch of each section, read from
+    one REPEATABLE READ READ ONLY transaction so all sections come from the same snapshot. The
+    next batch is only fetched once the consumer asks for it: a slow client pauses the cursor
+    instead of rows piling up in memory.
+    """
+    from app.db import session as db_session # Outlives the request's dependencies; uses its own connection
+
+    engine = db_session.read_engine()
+    async with engine.connect() as conn:
+        await conn.execution_options(isolation_level="REPEATABLE READ", postgresql_readonly=True)
+        async with conn.begin():
+            for section in sections:
+                result = await statements.stream(conn, f"export.{section}", {"user_id": user_id}, batch_size)
+                columns = list(result.keys())
+                empty = True
+                async for rows in result.partitions(batch_size):
+                    empty = False
+                    exported_rows[section] += len(rows)
+                    yield section, columns, [tuple(row) for row in rows]
+                await result.close()
+                if empty:
+                    yield section, columns, [] # So CSV still gets its header row
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, UUID): # asyncpg's own UUID subclass isn't handled by orjson
+        return str(value)
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+def encode_ndjson(section: str, columns: List[str], rows: List[Tuple[Any, ...]]) -> bytes:
+    return b"".join(
+        orjson.dumps({"section": section, **dict(zip(columns, row))}, default=_json_default) + b"\n" for row in rows
+    )
+
+def _csv_value(value: Any) -> Any:
+    return value.isoformat() if isinstance(value, datetime) else value
+
+def encode_csv(columns: Optional[List[str]], rows: List[Tuple[Any, ...]]) -> bytes:
+    """CSV lines for `rows`, preceded by a header line if `columns` is given."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if columns is not None:
+        writer.writerow(columns)
+    writer.writerows([_csv_value(value) for value in row] for row in rows)
+    return buffer.getvalue().encode()
+
+
+async def export_user_data(
+    user_id: UUID, sections: Sequence[str], fmt: str, compress: bool, batch_size: int
+) -> AsyncIterator[bytes]:
+    """
+    The export as body chunks, one per fetched batch: NDJSON (a header line, then one
+    {"section": ..., <columns>} line per row) or CSV (exactly one section, with a header row).
+    With `compress`, chunks are gzipped on the fly. Memory stays at about one batch however
+    big the account is. Callers hold an export slot (`acquire_export_slot`) while it runs.
+    """
+    global active_exports
+    active_exports += 1
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None # 31: gzip container
+    try:
+        if fmt == "ndjson":
+            header = {
+                "section": "export", "user_id": str(user_id), "sections": list(sections),
+                "exported_at": datetime.now(timezone.utc).isoformat(),
+            }
+            chunk = orjson.dumps(header) + b"\n"
+            if compressor is not None:
+                chunk = compressor.compress(chunk) # Usually empty: zlib buffers small inputs
+            if chunk:
+                yield chunk
+        header_written = False
+        async for section, columns, rows in stream_sections(user_id, sections, batch_size):
+            if fmt == "ndjson":
+                chunk = encode_ndjson(section, columns, rows)
+            else:
+                chunk = encode_csv(None if header_written else columns, rows)
+                header_written = True
+            if compressor is not None:
+                chunk = compressor.compress(chunk)
+            if chunk:
+                yield chunk
+        if compressor is not None:
+            yield compressor.flush()
+    finally:
+        active_exports -= 1
+
+
+def acquire_export_slot() -> None:
+    """Claim one of EXPORT_MAX_CONCURRENT export slots, or raise ExportBusyError. Give it back with release_export_slot."""
+    global export_slots_in_use
+    if export_slots_in_use >= settings.EXPORT_MAX_CONCURRENT:
+        raise ExportBusyError()
+    export_slots_in_use += 1
+
+def release_export_slot() -> None:
+    global export_slots_in_use
+    export_slots_in_use -= 1
@@ -0,0 +1,177 @@
+from datetime import date, datetime, time, timedelta, timezone
+from sqlalchemy.ext.asyncio import AsyncSession
+from uuid import UUID
+from typing import Optional, Dict, Any, List
+
+from app.crud.base import statements
+
+_FOOD_LOG_COLUMNS = (
+    "id, user_id, food_name, external_food_id, calories, protein, carbs, fat, serving_size, meal_type, "
+    "log_date, created_at, updated_at"
+)
+_NUTRIENTS = ("calories", "protein", "carbs", "fat")
+# Items listed per day; the totals are always complete
+MAX_ITEMS_PER_DAY = 500
+
+
+def _delta(source: str, sign: int) -> str:
+    """One food_log_daily_totals delta row per row of `source` (a CTE holding food_logs rows)."""
+    nutrients = ", ".join(f"{sign} * COALESCE({column}, 0) AS {column}" for column in _NUTRIENTS)
+    return f"""
+        SELECT user_id, CAST(log_date AT TIME ZONE 'UTC' AS date) AS log_day, COALESCE(meal_type, '') AS meal_type,
+            {sign} AS item_count, {nutrients}
+        FROM {source}
+    """
+
+# Every write folds its delta into food_log_daily_totals in the same statement (so the same
+# transaction), which keeps the totals exact without triggers or a second round trip.
+_APPLY_DELTA = f"""
+    INSERT INTO food_log_daily_totals AS t (user_id, log_day, meal_type, item_count, {", ".join(_NUTRIENTS)})
+    SELECT user_id, log_day, meal_type, sum(item_count), {", ".join(f"sum({column})" for column in _NUTRIENTS)}
+    FROM delta
+    GROUP BY user_id, log_day, meal_type
+    ON CONFLICT (user_id, log_day, meal_type) DO UPDATE SET
+        item_count = t.item_count + EXCLUDED.item_count,
+        {", ".join(f"{column} = t.{column} + EXCLUDED.{column}" for column in _NUTRIENTS)}
+"""
+_WRITABLE_COLUMNS = (
+    "food_name", "external_food_id", "calories", "protein", "carbs", "fat", "serving_size", "meal_type", "log_date",
+)
+
+statements.register("food_logs.create", f"""
+    WITH changed AS (
+        INSERT INTO food_logs (user_id, {", ".join(_WRITABLE_COLUMNS)})
+        VALUES (:user_id, {", ".join(f":{column}" for column in _WRITABLE_COLUMNS[:-1])},
+            COALESCE(CAST(:log_date AS timestamptz), now()))
+        RETURNING {_FOOD_LOG_COLUMNS}
+    ), delta AS ({_delta("changed", 1)}
+    ), totals AS ({_APPLY_DELTA})
+    SELECT {_FOOD_LOG_COLUMNS} FROM changed
+""")
+# `old` sees the row as it was before the UPDATE (all CTEs share one snapshot); FOR UPDATE makes
+# a concurrent edit of the same item wait, so its delta is taken against our new values.
+statements.register("food_logs.replace", f"""
+    WITH old AS (
+        SELECT {_FOOD_LOG_COLUMNS} FROM food_logs WHERE id = :id AND user_id = :user_id FOR UPDATE
+    ), changed AS (
+        UPDATE food_logs f SET {", ".join(f"{column} = :{column}" for column in _WRITABLE_COLUMNS)}
+        FROM old WHERE f.id = old.id
+        RETURNING {", ".join(f"f.{column}" for column in _FOOD_LOG_COLUMNS.split(", "))}
+    ), delta AS ({_delta("old", -1)} UNION ALL {_delta("changed", 1)}
+    ), totals AS ({_APPLY_DELTA})
+    SELECT {_FOOD_LOG_COLUMNS} FROM changed
+""")
+statements.register("food_logs.delete", f"""
+    WITH changed AS (
+        DELETE FROM food_logs WHERE id = :id AND user_id = :user_id
+        RETURNING {_FOOD_LOG_COLUMNS}
+    ), delta AS ({_delta("changed", -1)}
+    ), totals AS ({_APPLY_DELTA})
+    SELECT id FROM changed
+""")
+statements.register("food_logs.list_range", f"""
+    SELECT {_FOOD_LOG_COLUMNS}
+    FROM food_logs
+    WHERE user_id = :user_id AND log_date >= :start AND log_date < :end
+    ORDER BY log_date, id
+    LIMIT :limit
+""")
+statements.register("food_logs.daily_totals", f"""
+    SELECT log_day, meal_type, item_count, {", ".join(_NUTRIENTS)}
+    FROM food_log_daily_totals
+    WHERE user_id = :user_id AND log_day BETWEEN :start_day AND :end_day AND item_count > 0
+    ORDER BY log_day, meal_type
+""")
+
+# Rebuild: the EXCLUSIVE lock waits for writers that already touched the totals and holds new ones
+# back until the recomputed rows are committed, after which their deltas apply on top as usual.
+_REBUILD_SELECT = f"""
+    INSERT INTO food_log_daily_totals (user_id, log_day, meal_type, item_count, {", ".join(_NUTRIENTS)})
+    SELECT user_id, CAST(log_date AT TIME ZONE 'UTC' AS date), COALESCE(meal_type, ''), count(*),
+        {", ".join(f"COALESCE(sum({column}), 0)" for column in _NUTRIENTS)}
+    FROM food_logs
+    {{where}}
+    GROUP BY 1, 2, 3
+"""
+statements.register("food_logs.lock_totals", "LOCK TABLE food_log_daily_totals IN EXCLUSIVE MODE")
+statements.register("food_logs.clear_totals", "DELETE FROM food_log_daily_totals")
+statements.register("food_logs.clear_user_totals", "DELETE FROM food_log_daily_totals WHERE user_id = :user_id")
+statements.register("food_logs.rebuild_totals", _REBUILD_SELECT.format(where=""))
+statements.register("food_logs.rebuild_user_totals", _REBUILD_SELECT.format(where="WHERE user_id = :user_id"))
+
+
+def _params(food_log: Dict[str, Any]) -> Dict[str, Any]:
+    return {column: food_log.get(column) for column in _WRITABLE_COLUMNS}
+
+async def create_food_log(db: AsyncSession, user_id: UUID, food_log: Dict[str, Any]) -> Dict[str, Any]:
+    result = await statements.execute(db, "food_logs.create", {"user_id": user_id, **_params(food_log)})
+    row = result.fetchone()
+    await db.commit()
+    return dict(row._mapping)
+
+async def replace_food_log(
+    db: AsyncSession, user_id: UUID, food_log_id: UUID, food_log: Dict[str, Any]
+) -> Optional[Dict[str, Any]]:
+    """Overwrite every field of one of the user's items. None if it doesn't exist (or isn't theirs)."""
+    result = await statements.execute(
+        db, "food_logs.replace", {"id": food_log_id, "user_id": user_id, **_params(food_log)}
+    )
+    row = result.fetchone()
+    await db.commit()
+    return dict(row._mapping) if row else None
+
+async def delete_food_log(db: AsyncSession, user_id: UUID, food_log_id: UUID) -> bool:
+    result = await statements.execute(db, "food_logs.delete", {"id": food_log_id, "user_id": user_id})
+    deleted = result.fetchone() is not None
+    await db.commit()
+    return deleted
+
+async def get_food_logs_for_day(db: AsyncSession, user_id: UUID, day: date) -> List[Dict[str, Any]]:
+    start = datetime.combine(day, time.min, tzinfo=timezone.utc)
+    result = await statements.execute(db, "food_logs.list_range", {
+        "user_id": user_id, "start": start, "end": start + timedelta(days=1), "limit": MAX_ITEMS_PER_DAY,
+    })
+    return [dict(row._mapping) for row in result.fetchall()]
+
+def _totals(rows: List[Dict[str, Any]]) -> Dict[str, Any]:
+    totals = {"item_count": sum(row["item_count"] for row in rows)}
+    for column in _NUTRIENTS:
+        # Repeated +/- of floats leaves dust like 1e-13 behind; totals are shown to 0.01 anyway
+        totals[column] = round(sum(row[column] for row in rows), 2)
+    return totals
+
+async def get_nutrition_summary(db: AsyncSession, user_id: UUID, start_day: date, end_day: date) -> Dict[str, Any]:
+    """Per-day and per-meal totals for [start_day, end_day], read from food_log_daily_totals only."""
+    result = await statements.execute(
+        db, "food_logs.daily_totals", {"user_id": user_id, "start_day": start_day, "end_day": end_day}
+    )
+    days: Dict[date, List[Dict[str, Any]]] = {}
+    for row in result.fetchall():
+        meal = dict(row._mapping)
+        days.setdefault(meal.pop("log_day"), []).append(meal)
+
+    summary_days = []
+    for day, meals in days.items():
+        summary_days.append({
+            "day": day,
+            **_totals(meals),
+            "meals": [{**_totals([meal]), "meal_type": meal["meal_type"] or None} for meal in meals],
+        })
+    return {
+        "start_day": start_day,
+        "end_day": end_day,
+        "totals": _totals(summary_days),
+        "days": summary_days,
+    }
+
+async def rebuild_daily_totals(db: AsyncSession, user_id: Optional[UUID] = None) -> int:
+    """Recompute food_log_daily_totals from food_logs (all users, or one). Returns the rows written."""
+    await statements.execute(db, "food_logs.lock_totals")
+    if user_id is None:
+        await statements.execute(db, "food_logs.clear_totals")
+        result = await statements.execute(db, "food_logs.rebuild_totals")
+    else:
+        await statements.execute(db, "food_logs.clear_user_totals", {"user_id": user_id})
+        result = await statements.execute(db, "food_logs.rebuild_user_totals", {"user_id": user_id})
+    await db.commit()
+    return result.rowcount
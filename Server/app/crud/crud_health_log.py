@@ -0,0 +1,296 @@
+import csv
+import json
+import math
+from datetime import datetime, timedelta, timezone
+from sqlalchemy.ext.asyncio import AsyncSession
+from uuid import UUID
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from app.core import metrics
+from app.core.downsample import lttb
+from app.crud.base import statements
+
+# A line longer than this is rejected without being buffered
+MAX_LINE_BYTES = 8192
+# Rejections listed per batch in the response; the counts are always complete
+MAX_ERRORS_PER_BATCH = 10
+# Raw series reads stop here (and say so) instead of loading a user's whole history
+RAW_SERIES_MAX_ROWS = 100_000
+# Ranges up to this long are served from raw samples when resolution is "auto"
+RAW_SERIES_MAX_RANGE = timedelta(days=7)
+# Rollup buckets, finest first, with their (approximate, for months) length
+ROLLUP_BUCKETS = (
+    ("day", timedelta(days=1)),
+    ("week", timedelta(weeks=1)),
+    ("month", timedelta(days=30.44)),
+)
+
+ingest_rows = metrics.registry.register(metrics.Counter(
+    "health_ingest_rows_total", "Bulk health log rows by outcome.", ("result",),
+))
+
+# One multi-row INSERT per batch, from three arrays so the statement (and its prepared plan) is the
+# same whatever the batch size. Samples already stored for (user_id, log_type, log_date) are skipped,
+# and only the rows actually inserted are merged into health_log_rollups, in the same statement.
+statements.register("health_logs.insert_batch", """
+    WITH inserted AS (
+        INSERT INTO health_logs (user_id, log_type, value, log_date)
+        SELECT CAST(:user_id AS uuid), t.log_type, t.value, t.log_date
+        FROM unnest(
+            CAST(:log_types AS varchar[]), CAST(:values AS float8[]), CAST(:log_dates AS timestamptz[])
+        ) AS t(log_type, value, log_date)
+        ON CONFLICT (user_id, log_type, log_date) DO NOTHING
+        RETURNING user_id, log_type, value, log_date
+    ), rolled_up AS (
+        INSERT INTO health_log_rollups AS r
+            (user_id, log_type, bucket, bucket_start, value_count, value_sum, value_min, value_max)
+        SELECT i.user_id, i.log_type, b.bucket, date_trunc(b.bucket, i.log_date, 'UTC'),
+            count(*), sum(i.value), min(i.value), max(i.value)
+        FROM inserted i CROSS JOIN (VALUES ('day'), ('week'), ('month')) AS b(bucket)
+        GROUP BY 1, 2, 3, 4
+        ON CONFLICT (user_id, log_type, bucket, bucket_start) DO UPDATE SET
+            value_count = r.value_count + EXCLUDED.value_count,
+            value_sum = r.value_sum + EXCLUDED.value_sum,
+            value_min = LEAST(r.value_min, EXCLUDED.value_min),
+            value_max = GREATEST(r.value_max, EXCLUDED.value_max)
+    )
+    SELECT count(*) FROM inserted
+""")
+
+statements.register("health_logs.series_rollup", """
+    SELECT bucket_start AS timestamp, value_sum / value_count AS avg, value_min AS min, value_max AS max,
+        value_count AS count
+    FROM health_log_rollups
+    WHERE user_id = :user_id AND log_type = :log_type AND bucket = :bucket
+        AND bucket_start >= :start AND bucket_start < :end
+    ORDER BY bucket_start
+""")
+statements.register("health_logs.series_raw", """
+    SELECT log_date, value
+    FROM health_logs
+    WHERE user_id = :user_id AND log_type = :log_type AND log_date >= :start AND log_date < :end
+    ORDER BY log_date
+    LIMIT :limit
+""")
+
+HealthSample = Tuple[str, float, datetime]
+
+
+class IngestFormatError(ValueError):
+    """The body as a whole can't be read (e.g. a CSV header without the required columns)."""
+
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[Tuple[int, Optional[bytes]]]:
+    """
+    Split a streamed body into (line_number, line) without holding more than one line.
+    Lines over MAX_LINE_BYTES come out as (line_number, None) and are skipped, not buffered.
+    """
+    buffer = bytearray()
+    line_number = 0
+    overflow = False
+    async for chunk in chunks:
+        start = 0
+        while True:
+            end = chunk.find(b"\n", start)
+            if end == -1:
+                if not overflow:
+                    buffer += chunk[start:]
+                    if len(buffer) > MAX_LINE_BYTES:
+                        overflow = True
+                        buffer.clear()
+                break
+            line_number += 1
+            if overflow:
+                overflow = False
+                yield line_number, None
+            else:
+                buffer += chunk[start:end]
+                yield line_number, (bytes(buffer) if len(buffer) <= MAX_LINE_BYTES else None)
+                buffer.clear()
+            start = end + 1
+    if overflow or buffer:
+        yield line_number + 1, None if overflow else bytes(buffer)
+
+
+def _validate(log_type: Any, value: Any, log_date: Any) -> HealthSample:
+    if not isinstance(log_type, str) or not log_type.strip():
+        raise ValueError("log_type is required")
+    log_type = log_type.strip()
+    if len(log_type) > 100:
+        raise ValueError("log_type is longer than 100 characters")
+    if isinstance(value, bool) or value is None:
+        raise ValueError("value must be a number")
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        raise ValueError("value must be a number")
+    if not math.isfinite(value):
+        raise ValueError("value must be finite")
+    if not isinstance(log_date, str):
+        raise ValueError("log_date must be an ISO 8601 timestamp")
+    try:
+        parsed = datetime.fromisoformat(log_date.strip())
+    except ValueError:
+        raise ValueError("log_date must be an ISO 8601 timestamp")
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc) # Wearables often omit the offset; treat as UTC
+    return log_type, value, parsed
+
+
+def parse_ndjson_line(line: bytes) -> HealthSample:
+    try:
+        row = json.loads(line)
+    except ValueError:
+        raise ValueError("not valid JSON")
+    if not isinstance(row, dict):
+        raise ValueError("expected a JSON object")
+    return _validate(row.get("log_type"), row.get("value"), row.get("log_date"))
+
+
+class CsvLineParser:
+    """Parses one CSV line at a time against the header seen on the first line (quoted newlines aren't supported)."""
+
+    REQUIRED_COLUMNS = ("log_type", "value", "log_date")
+
+    def __init__(self, header: bytes):
+        try:
+            header_line = header.decode("utf-8-sig").rstrip("\r")
+        except UnicodeDecodeError:
+            raise IngestFormatError("CSV header is not valid UTF-8")
+        columns = [column.strip() for column in next(csv.reader([header_line]), [])]
+        missing = [column for column in self.REQUIRED_COLUMNS if column not in columns]
+        if missing:
+            raise IngestFormatError(f"CSV header is missing: {', '.join(missing)}")
+        self._indexes = [columns.index(column) for column in self.REQUIRED_COLUMNS]
+        self._width = max(self._indexes) + 1
+
+    def __call__(self, line: bytes) -> HealthSample:
+        fields = next(csv.reader([line.decode().rstrip("\r")]), [])
+        if len(fields) < self._width:
+            raise ValueError(f"expected at least {self._width} columns, got {len(fields)}")
+        log_type, value, log_date = (fields[index] for index in self._indexes)
+        return _validate(log_type, value.strip(), log_date)
+
+
+async def _write_batch(db: AsyncSession, user_id: UUID, samples: Dict[Tuple[str, datetime], float]) -> int:
+    if not samples:
+        return 0
+    result = await statements.execute(db, "health_logs.insert_batch", {
+        "user_id": user_id,
+        "log_types": [log_type for log_type, _ in samples],
+        "values": list(samples.values()),
+        "log_dates": [log_date for _, log_date in samples],
+    })
+    inserted = result.scalar_one()
+    await db.commit() # Each batch stands on its own: a later failure doesn't undo earlier ones
+    return inserted
+
+
+async def ingest_health_logs(
+    db: AsyncSession, user_id: UUID, chunks: AsyncIterator[bytes], fmt: str, batch_size: int
+) -> Dict[str, Any]:
+    """
+    Validate and store a streamed NDJSON or CSV body in batches of `batch_size` rows.
+    At most one batch (plus one line) is held in memory. Returns totals and per-batch counts.
+    """
+    totals = {"accepted": 0, "duplicates": 0, "rejected": 0, "batches": []}
+    parse = parse_ndjson_line if fmt == "ndjson" else None
+    samples: Dict[Tuple[str, datetime], float] = {}
+    batch: Dict[str, Any] = {}
+    rows_in_batch = 0
+
+    async def flush() -> None:
+        nonlocal samples, batch, rows_in_batch
+        inserted = await _write_batch(db, user_id, samples)
+        batch["accepted"] = inserted
+        batch["duplicates"] += len(samples) - inserted
+        for key in ("accepted", "duplicates", "rejected"):
+            totals[key] += batch[key]
+            ingest_rows.inc(key, amount=batch[key])
+        totals["batches"].append(batch)
+        samples, batch, rows_in_batch = {}, {}, 0
+
+    async for line_number, line in iter_lines(chunks):
+        if line is not None and not line.strip():
+            continue
+        if parse is None: # CSV, first non-empty line is the header
+            if line is None:
+                raise IngestFormatError("CSV header line is too long")
+            parse = CsvLineParser(line)
+            continue
+        if not batch:
+            batch = {"batch": len(totals["batches"]) + 1, "accepted": 0, "duplicates": 0, "rejected": 0, "errors": []}
+        rows_in_batch += 1
+        try:
+            if line is None:
+                raise ValueError(f"line is longer than {MAX_LINE_BYTES} bytes")
+            log_type, value, log_date = parse(line)
+        except ValueError as exc: # Includes UnicodeDecodeError
+            batch["rejected"] += 1
+            if len(batch["errors"]) < MAX_ERRORS_PER_BATCH:
+                batch["errors"].append({"line": line_number, "error": str(exc)})
+        else:
+            if (log_type, log_date) in samples:
+                batch["duplicates"] += 1 # Repeated within the batch; the first one wins
+            else:
+                samples[(log_type, log_date)] = value
+        if rows_in_batch >= batch_size:
+            await flush()
+    if batch:
+        await flush()
+    return totals
+
+
+def bucket_start(ts: datetime, bucket: str) -> datetime:
+    """Same truncation as date_trunc(bucket, ts, 'UTC') in the rollup statement."""
+    day = ts.astimezone(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    if bucket == "week":
+        return day - timedelta(days=day.weekday())
+    if bucket == "month":
+        return day.replace(day=1)
+    return day
+
+
+def choose_resolution(start: datetime, end: datetime, max_points: int) -> str:
+    """
+    Short ranges come from raw samples. Otherwise the finest rollup whose bucket count still
+    fits in `max_points` (i.e. no coarser than needed); months if even those don't fit.
+    """
+    if end - start <= RAW_SERIES_MAX_RANGE:
+        return "raw"
+    for bucket, length in ROLLUP_BUCKETS:
+        if (end - start) / length + 1 <= max_points:
+            return bucket
+    return ROLLUP_BUCKETS[-1][0]
+
+
+async def get_series(
+    db: AsyncSession, user_id: UUID, log_type: str, start: datetime, end: datetime, max_points: int, resolution: str
+) -> Dict[str, Any]:
+    """
+    Points for one log_type over [start, end). Rollup resolutions read only health_log_rollups;
+    "raw" reads the samples and LTTB-downsamples them to `max_points`.
+    """
+    if resolution == "auto":
+        resolution = choose_resolution(start, end, max_points)
+    params = {"user_id": user_id, "log_type": log_type, "end": end}
+    if resolution != "raw":
+        params.update(bucket=resolution, start=bucket_start(start, resolution))
+        result = await statements.execute(db, "health_logs.series_rollup", params)
+        points = [dict(row._mapping) for row in result.fetchall()]
+        return {"log_type": log_type, "resolution": resolution, "points": points}
+
+    params.update(start=start, limit=RAW_SERIES_MAX_ROWS)
+    result = await statements.execute(db, "health_logs.series_raw", params)
+    rows = result.fetchall()
+    dates: List[datetime] = [row.log_date for row in rows]
+    values: List[float] = [row.value for row in rows]
+    keep = lttb([date.timestamp() for date in dates], values, max_points)
+    return {
+        "log_type": log_type,
+        "resolution": "raw",
+        "points": [
+            {"timestamp": dates[i], "avg": values[i], "min": values[i], "max": values[i], "count": 1} for i in keep
+        ],
+        "truncated": len(rows) == RAW_SERIES_MAX_ROWS,
+    }
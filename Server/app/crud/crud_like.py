@@ -0,0 +1,151 @@
+import asyncio
+import logging
+from sqlalchemy.ext.asyncio import AsyncSession
+from uuid import UUID
+from typing import Optional, Dict, Tuple
+
+from app.core import metrics
+from app.core.config import settings
+from app.crud.base import statements
+
+logger = logging.getLogger(__name__)
+
+# One statement per flush: apply the batched likes/unlikes and move post_like_counts by exactly
+# the rows that changed (ON CONFLICT / missing rows contribute nothing). Toggles for posts or
+# users deleted in the meantime are dropped by the joins instead of failing the whole batch.
+statements.register("likes.flush", """
+    WITH wanted AS (
+        SELECT d.post_id, d.user_id
+        FROM unnest(CAST(:like_post_ids AS uuid[]), CAST(:like_user_ids AS uuid[])) AS d(post_id, user_id)
+        JOIN posts p ON p.id = d.post_id
+        JOIN users u ON u.id = d.user_id
+    ), inserted AS (
+        INSERT INTO likes (post_id, user_id)
+        SELECT post_id, user_id FROM wanted
+        ON CONFLICT (post_id, user_id) DO NOTHING
+        RETURNING post_id
+    ), deleted AS (
+        DELETE FROM likes l
+        USING unnest(CAST(:unlike_post_ids AS uuid[]), CAST(:unlike_user_ids AS uuid[])) AS d(post_id, user_id)
+        WHERE l.post_id = d.post_id AND l.user_id = d.user_id
+        RETURNING l.post_id
+    ), delta AS (
+        SELECT post_id, 1 AS change FROM inserted
+        UNION ALL
+        SELECT post_id, -1 AS change FROM deleted
+    )
+    INSERT INTO post_like_counts (post_id, like_count)
+    SELECT post_id, sum(change) FROM delta GROUP BY post_id
+    ON CONFLICT (post_id) DO UPDATE SET like_count = post_like_counts.like_count + EXCLUDED.like_count
+""")
+statements.register("likes.get_count", """
+    SELECT COALESCE((SELECT like_count FROM post_like_counts WHERE post_id = :post_id), 0) AS like_count,
+        EXISTS (SELECT 1 FROM likes WHERE post_id = :post_id AND user_id = :user_id) AS liked_by_me
+""")
+
+
+class LikeBuffer:
+    """
+    Write-behind buffer for likes. Each (post_id, user_id) keeps only its latest desired state,
+    so like/unlike/like within one interval costs a single row change at flush time.
+
+    Flushes every `interval` seconds, early once `max_pending` toggles are waiting, and on
+    shutdown (stop()). A failed flush puts its toggles back unless newer ones arrived.
+    Buffers are per worker process: toggles are only durable after the next flush.
+    """
+
+    def __init__(self, interval: float, max_pending: int):
+        self.interval = interval
+        self.max_pending = max_pending
+        self._pending: Dict[Tuple[UUID, UUID], bool] = {}
+        self._wakeup = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self.flushed_rows = 0
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def set_liked(self, post_id: UUID, user_id: UUID, liked: bool) -> None:
+        self._pending[(post_id, user_id)] = liked
+        if len(self._pending) >= self.max_pending:
+            self._wakeup.set()
+
+    def pending_state(self, post_id: UUID, user_id: UUID) -> Optional[bool]:
+        """The caller's not-yet-flushed state for this post, if any (read-your-writes)."""
+        return self._pending.get((post_id, user_id))
+
+    async def flush(self) -> int:
+        from app.db import session as db_session # Imported here: crud modules don't depend on the engine layer
+
+        async with self._flush_lock:
+            if not self._pending:
+                return 0
+            batch, self._pending = self._pending, {}
+            likes = [key for key, liked in batch.items() if liked]
+            unlikes = [key for key, liked in batch.items() if not liked]
+            try:
+                db_session.init_engines()
+                async with db_session.AsyncSessionLocal() as db:
+                    await statements.execute(db, "likes.flush", {
+                        "like_post_ids": [post_id for post_id, _ in likes],
+                        "like_user_ids": [user_id for _, user_id in likes],
+                        "unlike_post_ids": [post_id for post_id, _ in unlikes],
+                        "unlike_user_ids": [user_id for _, user_id in unlikes],
+                    })
+                    await db.commit()
+            except Exception:
+                logger.exception("Like flush of %d toggles failed; will retry", len(batch))
+                for key, liked in batch.items():
+                    self._pending.setdefault(key, liked) # Newer toggles win
+                raise
+            self.flushed_rows += len(batch)
+            return len(batch)
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception:
+                await asyncio.sleep(self.interval) # Already logged; back off before retrying
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the flusher and write out whatever is still buffered (graceful shutdown)."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+
+like_buffer = LikeBuffer(interval=settings.LIKES_FLUSH_INTERVAL_SECONDS, max_pending=settings.LIKES_MAX_PENDING)
+metrics.registry.register(metrics.Gauge(
+    "likes_pending", "Like/unlike toggles buffered and not yet flushed.", callback=lambda: {(): len(like_buffer)},
+))
+metrics.registry.register(metrics.Counter(
+    "likes_flushed_total", "Like/unlike toggles written to the database.", callback=lambda: {(): like_buffer.flushed_rows},
+))
+
+
+async def get_like_status(db: AsyncSession, post_id: UUID, user_id: UUID) -> Dict[str, object]:
+    """Like count from post_like_counts (no scan of `likes`), adjusted for the caller's own pending toggle."""
+    result = await statements.execute(db, "likes.get_count", {"post_id": post_id, "user_id": user_id})
+    row = result.fetchone()
+    like_count, liked_by_me = row.like_count, row.liked_by_me
+    pending = like_buffer.pending_state(post_id, user_id)
+    if pending is not None and pending != liked_by_me:
+        like_count += 1 if pending else -1
+        liked_by_me = pending
+    return {"post_id": post_id, "like_count": like_count, "liked_by_me": liked_by_me}
@@ -0,0 +1,114 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from uuid import UUID
+from typing import Optional, Dict, Any, List, Tuple
+
+from app.core import metrics
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.crud.base import statements, InvalidCursorError, encode_cursor, decode_cursor
+from app.crud.crud_like import like_buffer
+
+# First pages of the global feed (without the per-viewer liked_by_me flag), keyed by (cursor, limit).
+# Cleared whenever a post is created in this process; FEED_CACHE_TTL_SECONDS bounds staleness otherwise.
+feed_cache = TTLCache(maxsize=settings.FEED_CACHE_SIZE, ttl=settings.FEED_CACHE_TTL_SECONDS)
+metrics.registry.register(metrics.Counter(
+    "feed_cache_requests_total", "Global feed page cache lookups by result.", ("result",),
+    callback=lambda: {("hit",): feed_cache.hits, ("miss",): feed_cache.misses},
+))
+
+_POST_COLUMNS = "p.id, p.user_id, u.username, p.content, p.media_url, p.created_at, p.updated_at"
+
+# Keyset pagination on (created_at, id), newest first, served by idx_posts_created_at.
+# Like counts come from post_like_counts (kept by the like flusher), comment counts from a
+# correlated subquery on idx_comments_post_id, so a page is always a single query.
+_FEED_PAGE_SQL = f"""
+    WITH page AS (
+        SELECT p.id, p.user_id, p.content, p.media_url, p.created_at, p.updated_at
+        FROM posts p
+        {{where}}
+        ORDER BY p.created_at DESC, p.id DESC
+        LIMIT :limit
+    )
+    SELECT {_POST_COLUMNS},
+        COALESCE((SELECT lc.like_count FROM post_like_counts lc WHERE lc.post_id = p.id), 0) AS like_count,
+        (SELECT count(*) FROM comments c WHERE c.post_id = p.id) AS comment_count,
+        EXISTS (SELECT 1 FROM likes l WHERE l.post_id = p.id AND l.user_id = :viewer_id) AS liked_by_me
+    FROM page p
+    JOIN users u ON u.id = p.user_id
+    ORDER BY p.created_at DESC, p.id DESC
+"""
+# Separate statements rather than "cursor IS NULL OR ...", which would defeat the index under a generic plan
+statements.register("posts.feed_first_page", _FEED_PAGE_SQL.format(where=""))
+statements.register("posts.feed_after_cursor", _FEED_PAGE_SQL.format(
+    where="WHERE (p.created_at, p.id) < (:cursor_created_at, :cursor_id)"
+))
+statements.register("posts.liked_by_viewer", """
+    SELECT post_id FROM likes WHERE user_id = :viewer_id AND post_id = ANY(:post_ids)
+""")
+statements.register("posts.create", f"""
+    WITH p AS (
+        INSERT INTO posts (user_id, content, media_url)
+        VALUES (:user_id, :content, :media_url)
+        RETURNING id, user_id, content, media_url, created_at, updated_at
+    )
+    SELECT {_POST_COLUMNS}, 0 AS like_count, 0 AS comment_count, false AS liked_by_me
+    FROM p JOIN users u ON u.id = p.user_id
+""")
+
+
+async def _fetch_feed_page(
+    db: AsyncSession, viewer_id: Optional[UUID], cursor: Optional[str], limit: int
+) -> List[Dict[str, Any]]:
+    params: Dict[str, Any] = {"limit": limit, "viewer_id": viewer_id}
+    if cursor is None:
+        result = await statements.execute(db, "posts.feed_first_page", params)
+    else:
+        params["cursor_created_at"], params["cursor_id"] = decode_cursor(cursor)
+        result = await statements.execute(db, "posts.feed_after_cursor", params)
+    return [dict(row._mapping) for row in result.fetchall()]
+
+async def get_feed(
+    db: AsyncSession, viewer_id: Optional[UUID], cursor: Optional[str] = None, limit: int = 20
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    One page of the global feed, newest first, plus the cursor for the next page (None at the end).
+    Cached pages cost one small query for the viewer's liked_by_me flags instead of the full page query.
+    The viewer's own unflushed likes/unlikes are applied on top.
+    """
+    cache_key = (cursor, limit)
+    cached = feed_cache.get(cache_key)
+    if cached is None:
+        posts = await _fetch_feed_page(db, viewer_id, cursor, limit)
+        # Cache a viewer-independent copy; liked_by_me is filled in per request below
+        feed_cache.set(cache_key, [{**post, "liked_by_me": False} for post in posts])
+    else:
+        posts = [dict(post) for post in cached]
+        if viewer_id is not None and posts:
+            result = await statements.execute(
+                db, "posts.liked_by_viewer", {"viewer_id": viewer_id, "post_ids": [post["id"] for post in posts]}
+            )
+            liked = {row.post_id for row in result.fetchall()}
+            for post in posts:
+                post["liked_by_me"] = post["id"] in liked
+
+    if viewer_id is not None and len(like_buffer):
+        for post in posts:
+            pending = like_buffer.pending_state(post["id"], viewer_id)
+            if pending is not None and pending != post["liked_by_me"]:
+                post["like_count"] += 1 if pending else -1
+                post["liked_by_me"] = pending
+
+    next_cursor = None
+    if len(posts) == limit:
+        last = posts[-1]
+        next_cursor = encode_cursor(last["created_at"], last["id"])
+    return posts, next_cursor
+
+async def create_post(db: AsyncSession, user_id: UUID, content: Optional[str], media_url: Optional[str]) -> Dict[str, Any]:
+    result = await statements.execute(
+        db, "posts.create", {"user_id": user_id, "content": content, "media_url": media_url}
+    )
+    post = result.fetchone()
+    await db.commit()
+    feed_cache.clear() # Every cached page would now be missing the new post
+    return dict(post._mapping)
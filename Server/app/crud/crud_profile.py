@@ -0,0 +1,54 @@
+from datetime import datetime
+from sqlalchemy.ext.asyncio import AsyncSession
+from uuid import UUID
+from typing import Optional, Dict, Any
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.crud.base import statements
+from app.models.profile import ProfileUpdate
+
+_PROFILE_COLUMNS = "id, user_id, bio, profile_picture_url, fitness_goals, created_at, updated_at"
+
+# updated_at by user id, for conditional GETs; refreshed by every read and write of a profile here
+profile_versions = TTLCache(maxsize=settings.VERSION_CACHE_SIZE, ttl=settings.VERSION_CACHE_TTL_SECONDS)
+
+statements.register("profiles.get_by_user_id", f"SELECT {_PROFILE_COLUMNS} FROM profiles WHERE user_id = :user_id")
+statements.register("profiles.get_version", "SELECT updated_at FROM profiles WHERE user_id = :user_id")
+# updated_at is handled by the trigger
+statements.register_update_variants(
+    "profiles.update", table="profiles", columns=("bio", "profile_picture_url", "fitness_goals"),
+    where="user_id = :user_id", returning=_PROFILE_COLUMNS,
+)
+
+async def get_profile_by_user_id(db: AsyncSession, user_id: UUID) -> Optional[Dict[str, Any]]:
+    result = await statements.execute(db, "profiles.get_by_user_id", {"user_id": user_id})
+    profile = result.fetchone()
+    if profile is None:
+        return None
+    profile_versions.set(user_id, profile.updated_at)
+    return dict(profile._mapping)
+
+async def get_profile_version(db: AsyncSession, user_id: UUID) -> Optional[datetime]:
+    """The profile's updated_at, from the version cache or a probe of that one column. None if no profile."""
+    updated_at = profile_versions.get(user_id)
+    if updated_at is None:
+        result = await statements.execute(db, "profiles.get_version", {"user_id": user_id})
+        updated_at = result.scalar_one_or_none()
+        if updated_at is not None:
+            profile_versions.set(user_id, updated_at)
+    return updated_at
+
+async def update_profile(db: AsyncSession, user_id: UUID, profile_in: ProfileUpdate) -> Optional[Dict[str, Any]]:
+    params = {"user_id": user_id, **profile_in.dict(exclude_unset=True)}
+    columns = [column for column in params if column != "user_id"]
+    if not columns:
+        return await get_profile_by_user_id(db, user_id)
+
+    result = await statements.execute(db, statements.update_name("profiles.update", columns), params)
+    profile = result.fetchone()
+    await db.commit()
+    if profile is None:
+        return None
+    profile_versions.set(user_id, profile.updated_at)
+    return dict(profile._mapping)
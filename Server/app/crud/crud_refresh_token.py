@@ -0,0 +1,228 @@
+import asyncio
+import hashlib
+import logging
+import uuid
+from datetime import datetime, timedelta, timezone
+from sqlalchemy.ext.asyncio import AsyncSession
+from uuid import UUID
+from typing import Optional, Dict, Any, Iterable, Tuple
+
+from app.core import metrics
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.security import TokenPayload, create_refresh_token
+from app.crud.base import statements
+
+logger = logging.getLogger(__name__)
+
+statements.register("refresh_tokens.create", """
+    INSERT INTO refresh_tokens (user_id, token_hash, family_id, expires_at)
+    VALUES (:user_id, :token_hash, :family_id, :expires_at)
+""")
+# Revoke the presented token and issue its successor in one statement. Only a live token matches,
+# and the row lock makes a concurrent refresh with the same token find it revoked. The user comes
+# back from the same round trip, with the current username and role for the new access token.
+statements.register("refresh_tokens.rotate", """
+    WITH used AS (
+        UPDATE refresh_tokens SET revoked_at = now()
+        WHERE token_hash = :token_hash AND revoked_at IS NULL AND expires_at > now()
+        RETURNING user_id, family_id
+    ), issued AS (
+        INSERT INTO refresh_tokens (user_id, token_hash, family_id, expires_at)
+        SELECT user_id, :new_token_hash, family_id, :new_expires_at FROM used
+    )
+    SELECT u.id, u.username, u.role FROM used JOIN users u ON u.id = used.user_id
+""")
+statements.register("refresh_tokens.get_family_if_revoked", """
+    SELECT family_id FROM refresh_tokens WHERE token_hash = :token_hash AND revoked_at IS NOT NULL
+""")
+statements.register("refresh_tokens.revoke_family", """
+    UPDATE refresh_tokens SET revoked_at = now()
+    WHERE family_id = :family_id AND revoked_at IS NULL
+    RETURNING token_hash, expires_at
+""")
+# Logout: the session the token belongs to, if it is the caller's
+statements.register("refresh_tokens.revoke_family_of", """
+    UPDATE refresh_tokens SET revoked_at = now()
+    WHERE family_id = (SELECT family_id FROM refresh_tokens WHERE token_hash = :token_hash AND user_id = :user_id)
+        AND revoked_at IS NULL
+    RETURNING token_hash, expires_at
+""")
+statements.register("refresh_tokens.revoke_user", """
+    UPDATE refresh_tokens SET revoked_at = now()
+    WHERE user_id = :user_id AND revoked_at IS NULL
+    RETURNING token_hash, expires_at
+""")
+# One batch of expired rows (idx_refresh_tokens_expires_at); SKIP LOCKED so workers purging at
+# the same time split the work instead of queueing behind each other
+statements.register("refresh_tokens.purge_expired", """
+    DELETE FROM refresh_tokens
+    WHERE id IN (
+        SELECT id FROM refresh_tokens
+        WHERE expires_at < now()
+        ORDER BY expires_at
+        LIMIT :batch_size
+        FOR UPDATE SKIP LOCKED
+    )
+""")
+
+
+class RefreshTokenReuseError(Exception):
+    """A refresh token that was already rotated or revoked was presented again."""
+
+
+# Hashes of tokens this worker has seen revoked, kept until the token would have expired anyway.
+# A hit rejects a replayed token straight away; a miss (e.g. revoked by another worker) is caught
+# by the rotate statement, so the cache only ever saves work, never decides on its own.
+revoked_tokens = TTLCache(
+    maxsize=settings.REFRESH_TOKEN_REVOKED_CACHE_SIZE, ttl=settings.REFRESH_TOKEN_EXPIRE_DAYS * 86400
+)
+reuse_detected = 0
+metrics.registry.register(metrics.Counter(
+    "refresh_token_revoked_cache_requests_total", "Revoked refresh token cache lookups by result.", ("result",),
+    callback=lambda: {("hit",): revoked_tokens.hits, ("miss",): revoked_tokens.misses},
+))
+metrics.registry.register(metrics.Counter(
+    "refresh_token_reuse_total", "Revoked refresh tokens presented again (their family is revoked).",
+    callback=lambda: {(): reuse_detected},
+))
+
+
+def hash_token(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+def _remember_revoked(rows: Iterable[Tuple[str, datetime]]) -> None:
+    now = datetime.now(timezone.utc)
+    for token_hash, expires_at in rows:
+        ttl = (expires_at - now).total_seconds()
+        if ttl > 0:
+            revoked_tokens.set(token_hash, True, ttl=ttl)
+
+def _new_token(user_id: UUID) -> Tuple[str, datetime]:
+    expires_delta = timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
+    token = create_refresh_token(user_id=user_id, expires_delta=expires_delta)
+    return token, datetime.now(timezone.utc) + expires_delta
+
+async def issue_refresh_token(db: AsyncSession, user_id: UUID) -> str:
+    """A refresh token starting a new family (one per login)."""
+    token, expires_at = _new_token(user_id)
+    await statements.execute(db, "refresh_tokens.create", {
+        "user_id": user_id, "token_hash": hash_token(token), "family_id": uuid.uuid4(), "expires_at": expires_at,
+    })
+    await db.commit()
+    return token
+
+async def _revoke_family_if_reused(db: AsyncSession, token_hash: str) -> bool:
+    """True if `token_hash` is a revoked token, after revoking whatever is still live in its family."""
+    global reuse_detected
+    row = (await statements.execute(db, "refresh_tokens.get_family_if_revoked", {"token_hash": token_hash})).fetchone()
+    if row is None:
+        return False
+    result = await statements.execute(db, "refresh_tokens.revoke_family", {"family_id": row.family_id})
+    revoked = result.fetchall()
+    await db.commit()
+    _remember_revoked(revoked)
+    if revoked: # Otherwise the whole session was already over (logout, earlier reuse)
+        reuse_detected += 1
+        logger.warning("Refresh token reuse detected; revoked %d tokens of family %s", len(revoked), row.family_id)
+    return True
+
+async def rotate_refresh_token(
+    db: AsyncSession, token: str, payload: TokenPayload
+) -> Optional[Tuple[Dict[str, Any], str]]:
+    """
+    Exchange a (signature-checked) refresh token for its successor: (user, new refresh token).
+    None if the token is unknown or expired. Raises RefreshTokenReuseError, after revoking every
+    token of its family, if it had already been used or revoked: either the client or an attacker
+    holds a stolen copy, and we can't tell which.
+    """
+    token_hash = hash_token(token)
+    if revoked_tokens.get(token_hash) is not None:
+        await _revoke_family_if_reused(db, token_hash)
+        raise RefreshTokenReuseError()
+
+    new_token, new_expires_at = _new_token(payload.user_id)
+    result = await statements.execute(db, "refresh_tokens.rotate", {
+        "token_hash": token_hash, "new_token_hash": hash_token(new_token), "new_expires_at": new_expires_at,
+    })
+    user = result.fetchone()
+    await db.commit()
+    if user is not None:
+        _remember_revoked([(token_hash, payload.exp)])
+        return dict(user._mapping), new_token
+    if await _revoke_family_if_reused(db, token_hash):
+        raise RefreshTokenReuseError()
+    return None
+
+async def revoke_refresh_tokens(db: AsyncSession, user_id: UUID, token: Optional[str] = None) -> int:
+    """Revoke the session (token family) `token` belongs to, or every session of the user. Returns tokens revoked."""
+    if token is None:
+        result = await statements.execute(db, "refresh_tokens.revoke_user", {"user_id": user_id})
+    else:
+        result = await statements.execute(
+            db, "refresh_tokens.revoke_family_of", {"token_hash": hash_token(token), "user_id": user_id}
+        )
+    rows = result.fetchall()
+    await db.commit()
+    _remember_revoked(rows)
+    return len(rows)
+
+
+class ExpiredTokenPurger:
+    """
+    Deletes expired refresh_tokens rows every `interval` seconds, `batch_size` rows per statement
+    and transaction, so purging never holds many row locks or one long transaction. Revoked rows
+    are kept until they expire: reuse detection needs them.
+    """
+
+    def __init__(self, interval: float, batch_size: int):
+        self.interval = interval
+        self.batch_size = batch_size
+        self.purged_rows = 0
+        self._task: Optional[asyncio.Task] = None
+
+    async def purge(self) -> int:
+        from app.db import session as db_session # Runs outside any request, with its own session
+
+        db_session.init_engines()
+        purged = 0
+        while True:
+            async with db_session.AsyncSessionLocal() as db:
+                result = await statements.execute(db, "refresh_tokens.purge_expired", {"batch_size": self.batch_size})
+                await db.commit()
+            purged += result.rowcount
+            self.purged_rows += result.rowcount
+            if result.rowcount < self.batch_size:
+                return purged
+            await asyncio.sleep(0) # Let requests in between batches
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                purged = await self.purge()
+                if purged:
+                    logger.info("Purged %d expired refresh tokens", purged)
+            except Exception:
+                logger.exception("Refresh token purge failed; will retry")
+            await asyncio.sleep(self.interval)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+token_purger = ExpiredTokenPurger(
+    interval=settings.REFRESH_TOKEN_PURGE_INTERVAL_SECONDS, batch_size=settings.REFRESH_TOKEN_PURGE_BATCH_SIZE
+)
+metrics.registry.register(metrics.Counter(
+    "refresh_tokens_purged_total", "Expired refresh tokens deleted.", callback=lambda: {(): token_purger.purged_rows},
+))
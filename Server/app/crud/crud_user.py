@@ -1,92 +1,213 @@
+import functools
+from datetime import datetime
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError
 from uuid import UUID
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Hashable, List
 
-from app.core.security import get_password_hash
+from app.core import metrics
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.hashing import hash_password
+from app.core.loader import BatchLoader
+from app.crud.base import statements
 from app.models.user import UserCreate, UserUpdate
 
+# Authenticated users by id, filled by deps.get_current_user
+principal_cache = TTLCache(maxsize=settings.PRINCIPAL_CACHE_SIZE, ttl=settings.PRINCIPAL_CACHE_TTL_SECONDS)
+metrics.registry.register(metrics.Counter(
+    "principal_cache_requests_total", "Principal cache lookups by result.", ("result",),
+    callback=lambda: {("hit",): principal_cache.hits, ("miss",): principal_cache.misses},
+))
+# updated_at by user id, for conditional GETs; refreshed by every read and write of a user here
+user_versions = TTLCache(maxsize=settings.VERSION_CACHE_SIZE, ttl=settings.VERSION_CACHE_TTL_SECONDS)
+
+_USER_COLUMNS = "id, username, email, password_hash, role, created_at, updated_at"
+_PUBLIC_USER_COLUMNS = "id, username, email, role, created_at, updated_at"
+
+statements.register("users.get_by_email", f"SELECT {_USER_COLUMNS} FROM users WHERE email = :email")
+statements.register("users.get_by_username", f"SELECT {_USER_COLUMNS} FROM users WHERE username = :username")
+statements.register("users.get_by_id", f"SELECT {_USER_COLUMNS} FROM users WHERE id = :user_id")
+statements.register("users.get_many_by_id", f"SELECT {_PUBLIC_USER_COLUMNS} FROM users WHERE id = ANY(CAST(:user_ids AS uuid[]))")
+statements.register("users.get_version", "SELECT updated_at FROM users WHERE id = :user_id")
+statements.register("users.create", f"""
+    WITH new_user AS (
+        INSERT INTO users (username, email, password_hash, role)
+        VALUES (:username, :email, :password_hash, :role)
+        RETURNING {_PUBLIC_USER_COLUMNS}
+    ), new_profile AS (
+        INSERT INTO profiles (user_id, bio, fitness_goals)
+        SELECT id, '', '' FROM new_user
+    )
+    SELECT {_PUBLIC_USER_COLUMNS} FROM new_user
+""")
+# updated_at is handled by the trigger
+statements.register_update_variants(
+    "users.update", table="users", columns=("username", "email", "role"),
+    where="id = :user_id", returning=_PUBLIC_USER_COLUMNS,
+)
+statements.register("users.update_password_hash", "UPDATE users SET password_hash = :password_hash WHERE id = :user_id")
+
 async def get_user_by_email(db: AsyncSession, email: str) -> Optional[Dict[str, Any]]:
-    query = text("SELECT id, username, email, password_hash, role, created_at, updated_at FROM users WHERE email = :email")
-    result = await db.execute(query, {"email": email})
+    result = await statements.execute(db, "users.get_by_email", {"email": email})
     user = result.fetchone()
     return dict(user._mapping) if user else None
 
 
 async def get_user_by_username(db: AsyncSession, username: str) -> Optional[Dict[str, Any]]:
-    query = text("SELECT id, username, email, password_hash, role, created_at, updated_at FROM users WHERE username = :username")
-    result = await db.execute(query, {"username": username})
+    result = await statements.execute(db, "users.get_by_username", {"username": username})
     user = result.fetchone()
     return dict(user._mapping) if user else None
 
 async def get_user_by_id(db: AsyncSession, user_id: UUID) -> Optional[Dict[str, Any]]:
-    query = text("SELECT id, username, email, password_hash, role, created_at, updated_at FROM users WHERE id = :user_id")
-    result = await db.execute(query, {"user_id": user_id})
+    result = await statements.execute(db, "users.get_by_id", {"user_id": user_id})
     user = result.fetchone()
-    return dict(user._mapping) if user else None
+    if user is None:
+        return None
+    user_versions.set(user_id, user.updated_at)
+    return dict(user._mapping)
+
+async def _load_users(user_ids: List[Hashable], primary: bool = False) -> Dict[Hashable, Dict[str, Any]]:
+    from app.db import session as db_session # Shared by many requests, so it can't use any one request's session
+
+    db_session.init_engines()
+    session_factory = db_session.ReadOnlySessionLocal if primary else db_session.read_session_factory()
+    async with session_factory() as db:
+        result = await statements.execute(db, "users.get_many_by_id", {"user_ids": user_ids})
+    # A lagging replica's updated_at could be older than a version update_user just stored
+    from_primary = session_factory is db_session.ReadOnlySessionLocal
+    users = {}
+    for user in result:
+        if from_primary:
+            user_versions.set(user.id, user.updated_at)
+        users[user.id] = dict(user._mapping)
+    return users
+
+# Lookups by id from concurrent requests: one query per event-loop pass, one per id in flight.
+# Public reads may come from the replica; authenticated principals always come from the primary,
+# so a role change or rename is seen as soon as update_user invalidates principal_cache.
+user_loader = BatchLoader(_load_users, max_batch_size=settings.USER_LOADER_MAX_BATCH_SIZE)
+principal_loader = BatchLoader(
+    functools.partial(_load_users, primary=True), max_batch_size=settings.USER_LOADER_MAX_BATCH_SIZE
+)
+_loaders = (user_loader, principal_loader)
+metrics.registry.register(metrics.Counter(
+    "user_loader_loads_total", "User lookups by id through the loaders, by how they were answered.", ("result",),
+    callback=lambda: {
+        ("queried",): sum(loader.keys_loaded for loader in _loaders),
+        ("coalesced",): sum(loader.coalesced for loader in _loaders),
+    },
+))
+metrics.registry.register(metrics.Counter(
+    "user_loader_batches_total", "Batched users queries run by the loaders.",
+    callback=lambda: {(): sum(loader.batches for loader in _loaders)},
+))
+
+async def load_user(user_id: UUID) -> Optional[Dict[str, Any]]:
+    """
+    The user (without password_hash) through the shared loader, from the replica when healthy.
+    For public reads only; use load_principal for the caller and get_user_by_id to see the
+    request's own writes.
+    """
+    return await user_loader.load(user_id)
+
+async def load_users(user_ids: List[UUID]) -> Dict[UUID, Dict[str, Any]]:
+    """Users (without password_hash) by id, through the shared loader; unknown ids are left out."""
+    return await user_loader.load_many(user_ids)
+
+async def load_principal(user_id: UUID) -> Optional[Dict[str, Any]]:
+    """Like load_user, but always read from the primary: its result is what authorizes requests."""
+    return await principal_loader.load(user_id)
+
+async def get_user_version(db: AsyncSession, user_id: UUID) -> Optional[datetime]:
+    """The user's updated_at, from the version cache or a probe of that one column. None if no such user."""
+    updated_at = user_versions.get(user_id)
+    if updated_at is None:
+        result = await statements.execute(db, "users.get_version", {"user_id": user_id})
+        updated_at = result.scalar_one_or_none()
+        if updated_at is not None:
+            user_versions.set(user_id, updated_at)
+    return updated_at
+
+class UserAlreadyExistsError(Exception):
+    def __init__(self, field: str):
+        super().__init__(f"User with this {field} already exists.")
+        self.field = field # "email" or "username"
+
+# Postgres' default names for the UNIQUE constraints in sql/tables.sql
+_UNIQUE_CONSTRAINT_FIELDS = {
+    "users_email_key": "email",
+    "users_username_key": "username",
+}
+
+def _violated_unique_field(exc: IntegrityError) -> Optional[str]:
+    # asyncpg's UniqueViolationError carries the constraint name; fall back to the message text
+    original = getattr(exc.orig, "__cause__", None)
+    constraint = getattr(original, "constraint_name", None)
+    if constraint is None:
+        message = str(exc.orig)
+        constraint = next((name for name in _UNIQUE_CONSTRAINT_FIELDS if name in message), None)
+    return _UNIQUE_CONSTRAINT_FIELDS.get(constraint)
 
 async def create_user(db: AsyncSession, user_in: UserCreate) -> Dict[str, Any]:
-    hashed_password = get_password_hash(user_in.password)
-    query = text("""
-        INSERT INTO users (username, email, password_hash, role)
-        VALUES (:username, :email, :password_hash, :role)
-        RETURNING id, username, email, role, created_at, updated_at
-    """)
-    result = await db.execute(
-        query,
-        {
-            "username": user_in.username,
-            "email": user_in.email,
-            "password_hash": hashed_password,
-            "role": user_in.role or 'user'
-        }
-    )
+    """
+    Insert the user and their empty profile in one statement (one round trip).
+    Duplicate email/username is detected by the unique constraints, so concurrent
+    sign-ups cannot race past a check; raises UserAlreadyExistsError.
+    """
+    hashed_password = await hash_password(user_in.password)
+    if not db.in_transaction():
+        # A single statement is atomic on its own; skip the BEGIN/COMMIT round trips
+        await db.connection(execution_options={"isolation_level": "AUTOCOMMIT"})
+    try:
+        result = await statements.execute(
+            db,
+            "users.create",
+            {
+                "username": user_in.username,
+                "email": user_in.email,
+                "password_hash": hashed_password,
+                "role": user_in.role or 'user'
+            }
+        )
+    except IntegrityError as exc:
+        field = _violated_unique_field(exc)
+        if field is None:
+            raise
+        await db.rollback()
+        raise UserAlreadyExistsError(field) from exc
     created_user = result.fetchone()
     await db.commit()
-    
-    # Create a profile for the new user
-    profile_query = text("""
-        INSERT INTO profiles (user_id, bio, fitness_goals)
-        VALUES (:user_id, '', '') 
-        RETURNING id 
-    """) # Basic empty profile
-    await db.execute(profile_query, {"user_id": created_user.id})
-    await db.commit()
 
     return dict(created_user._mapping) if created_user else None
 
 async def update_user(db: AsyncSession, user_id: UUID, user_in: UserUpdate) -> Optional[Dict[str, Any]]:
-    # Construct SET clause dynamically
-    set_clauses = []
+    # Only the provided fields are written; each combination has its own pre-built statement
     params = {"user_id": user_id}
     if user_in.username is not None:
-        set_clauses.append("username = :username")
         params["username"] = user_in.username
     if user_in.email is not None:
-        set_clauses.append("email = :email")
         params["email"] = user_in.email
     if user_in.role is not None: # Be careful with role updates
-        set_clauses.append("role = :role")
         params["role"] = user_in.role
     
-    if not set_clauses:
+    columns = [column for column in params if column != "user_id"]
+    if not columns:
         # If nothing to update, fetch and return current user data or raise error
         return await get_user_by_id(db, user_id)
 
-    set_clause_str = ", ".join(set_clauses)
-    # updated_at will be handled by the trigger
-    
-    query_str = f"""
-        UPDATE users
-        SET {set_clause_str}
-        WHERE id = :user_id
-        RETURNING id, username, email, role, created_at, updated_at
-    """
-    query = text(query_str)
-    
-    result = await db.execute(query, params)
+    result = await statements.execute(db, statements.update_name("users.update", columns), params)
     updated_user = result.fetchone()
     await db.commit()
-    return dict(updated_user._mapping) if updated_user else None
+    principal_cache.invalidate(user_id)
+    if updated_user is None:
+        return None
+    user_versions.set(user_id, updated_user.updated_at)
+    return dict(updated_user._mapping)
+
+async def update_user_password_hash(db: AsyncSession, user_id: UUID, password_hash: str) -> None:
+    await statements.execute(db, "users.update_password_hash", {"user_id": user_id, "password_hash": password_hash})
+    await db.commit()
+    user_versions.invalidate(user_id) # The trigger moved updated_at
 
 # Add delete_user if needed
\ No newline at end of file
@@ -0,0 +1,180 @@
+import json
+from sqlalchemy.ext.asyncio import AsyncSession
+from uuid import UUID
+from typing import Optional, Dict, Any, List, Tuple
+
+from app.crud.base import statements, encode_cursor, decode_cursor
+
+_WORKOUT_COLUMNS = "id, user_id, name, description, created_at, updated_at"
+_EXERCISE_FIELDS = ("name", "sets", "reps", "weight", "duration_seconds", "notes")
+_EXERCISE_TYPES = ("varchar", "int", "int", "float8", "int", "text")
+
+
+def _exercises_json(source: str, order_by: str = "order_in_workout, id") -> str:
+    """json_agg of a workout's exercises from `source`, so a workout and its exercises come back as one row."""
+    fields = ", ".join(
+        f"'{column}', {column}"
+        for column in ("id", "workout_id", *_EXERCISE_FIELDS, "order_in_workout", "created_at", "updated_at")
+    )
+    return f"COALESCE((SELECT json_agg(json_build_object({fields}) ORDER BY {order_by}) FROM {source}), '[]')"
+
+# Workouts newest first on idx_workouts_user_id_created_at; each row carries its exercises
+# (ordered, via idx_exercises_workout_id) as a JSON array, so a page is a single query.
+_LIST_SQL = f"""
+    WITH w AS (
+        SELECT {_WORKOUT_COLUMNS} FROM workouts
+        WHERE user_id = :user_id {{where}}
+        ORDER BY created_at DESC, id DESC
+        LIMIT :limit
+    )
+    SELECT w.*, {_exercises_json("exercises e WHERE e.workout_id = w.id")} AS exercises
+    FROM w
+    ORDER BY created_at DESC, id DESC
+"""
+statements.register("workouts.list_first_page", _LIST_SQL.format(where=""))
+statements.register("workouts.list_after_cursor", _LIST_SQL.format(
+    where="AND (created_at, id) < (:cursor_created_at, :cursor_id)"
+))
+statements.register("workouts.get", f"""
+    SELECT w.{_WORKOUT_COLUMNS.replace(", ", ", w.")}, {_exercises_json("exercises e WHERE e.workout_id = w.id")} AS exercises
+    FROM workouts w
+    WHERE w.id = :id AND w.user_id = :user_id
+""")
+
+# All exercises go in with one multi-row INSERT from parallel arrays (one per column), so the
+# statement is the same for any number of exercises; order_in_workout is the array position.
+_UNNEST_EXERCISES = "unnest({}) WITH ORDINALITY AS x({}, order_in_workout)".format(
+    ", ".join(f"CAST(:exercise_{column} AS {sql_type}[])" for column, sql_type in zip(_EXERCISE_FIELDS, _EXERCISE_TYPES)),
+    ", ".join(_EXERCISE_FIELDS),
+)
+_INSERT_EXERCISES = f"""
+    INSERT INTO exercises (workout_id, {", ".join(_EXERCISE_FIELDS)}, order_in_workout)
+    SELECT w.id, {", ".join(f"x.{column}" for column in _EXERCISE_FIELDS)}, x.order_in_workout
+    FROM w, {_UNNEST_EXERCISES}
+    RETURNING *
+"""
+statements.register("workouts.create", f"""
+    WITH w AS (
+        INSERT INTO workouts (user_id, name, description)
+        VALUES (:user_id, :name, :description)
+        RETURNING {_WORKOUT_COLUMNS}
+    ), e AS ({_INSERT_EXERCISES})
+    SELECT w.*, {_exercises_json("e")} AS exercises FROM w
+""")
+# Replacing drops the old exercises and inserts the new list, all in one statement
+statements.register("workouts.replace", f"""
+    WITH w AS (
+        UPDATE workouts SET name = :name, description = :description
+        WHERE id = :id AND user_id = :user_id
+        RETURNING {_WORKOUT_COLUMNS}
+    ), removed AS (
+        DELETE FROM exercises WHERE workout_id IN (SELECT id FROM w)
+    ), e AS ({_INSERT_EXERCISES})
+    SELECT w.*, {_exercises_json("e")} AS exercises FROM w
+""")
+# One UPDATE for the whole new order, applied only if :exercise_ids is exactly the workout's set
+# of exercises (callers reject duplicates first). No row means no such workout; valid = false a bad list.
+statements.register("workouts.reorder_exercises", f"""
+    WITH w AS (
+        SELECT {_WORKOUT_COLUMNS} FROM workouts WHERE id = :id AND user_id = :user_id
+    ), current AS (
+        SELECT e.id FROM exercises e JOIN w ON e.workout_id = w.id
+    ), check_ids AS (
+        SELECT (SELECT count(*) FROM current) = cardinality(CAST(:exercise_ids AS uuid[]))
+            AND (SELECT count(*) FROM current WHERE id = ANY(CAST(:exercise_ids AS uuid[])))
+                = cardinality(CAST(:exercise_ids AS uuid[])) AS valid
+    ), e AS (
+        UPDATE exercises ex SET order_in_workout = x.position
+        FROM unnest(CAST(:exercise_ids AS uuid[])) WITH ORDINALITY AS x(id, position), check_ids
+        WHERE check_ids.valid AND ex.id = x.id AND ex.workout_id = :id
+        RETURNING ex.*
+    )
+    SELECT w.*, (SELECT valid FROM check_ids) AS valid, {_exercises_json("e")} AS exercises
+    FROM w
+""")
+statements.register("workouts.delete", """
+    DELETE FROM workouts WHERE id = :id AND user_id = :user_id RETURNING id
+""")
+
+
+class InvalidExerciseOrderError(ValueError):
+    pass
+
+def _decode(row) -> Dict[str, Any]:
+    workout = dict(row._mapping)
+    if isinstance(workout["exercises"], str): # asyncpg hands json back as text
+        workout["exercises"] = json.loads(workout["exercises"])
+    return workout
+
+def _exercise_params(exercises: List[Dict[str, Any]]) -> Dict[str, List[Any]]:
+    return {f"exercise_{column}": [exercise.get(column) for exercise in exercises] for column in _EXERCISE_FIELDS}
+
+async def get_workouts(
+    db: AsyncSession, user_id: UUID, cursor: Optional[str] = None, limit: int = 20
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """One page of the user's workouts, newest first, each with its ordered exercises."""
+    params: Dict[str, Any] = {"user_id": user_id, "limit": limit}
+    if cursor is None:
+        result = await statements.execute(db, "workouts.list_first_page", params)
+    else:
+        params["cursor_created_at"], params["cursor_id"] = decode_cursor(cursor)
+        result = await statements.execute(db, "workouts.list_after_cursor", params)
+    workouts = [_decode(row) for row in result.fetchall()]
+    next_cursor = None
+    if len(workouts) == limit:
+        next_cursor = encode_cursor(workouts[-1]["created_at"], workouts[-1]["id"])
+    return workouts, next_cursor
+
+async def get_workout(db: AsyncSession, user_id: UUID, workout_id: UUID) -> Optional[Dict[str, Any]]:
+    result = await statements.execute(db, "workouts.get", {"id": workout_id, "user_id": user_id})
+    row = result.fetchone()
+    return _decode(row) if row else None
+
+async def create_workout(db: AsyncSession, user_id: UUID, workout: Dict[str, Any]) -> Dict[str, Any]:
+    result = await statements.execute(db, "workouts.create", {
+        "user_id": user_id, "name": workout["name"], "description": workout.get("description"),
+        **_exercise_params(workout.get("exercises") or []),
+    })
+    row = result.fetchone()
+    await db.commit()
+    return _decode(row)
+
+async def replace_workout(
+    db: AsyncSession, user_id: UUID, workout_id: UUID, workout: Dict[str, Any]
+) -> Optional[Dict[str, Any]]:
+    """Overwrite the workout and its whole exercise list. None if it doesn't exist (or isn't theirs)."""
+    result = await statements.execute(db, "workouts.replace", {
+        "id": workout_id, "user_id": user_id, "name": workout["name"], "description": workout.get("description"),
+        **_exercise_params(workout.get("exercises") or []),
+    })
+    row = result.fetchone()
+    await db.commit()
+    return _decode(row) if row else None
+
+async def reorder_exercises(
+    db: AsyncSession, user_id: UUID, workout_id: UUID, exercise_ids: List[UUID]
+) -> Optional[Dict[str, Any]]:
+    """
+    Set the exercise order to `exercise_ids` (every exercise of the workout, once each).
+    None if the workout doesn't exist; InvalidExerciseOrderError if the ids don't match its exercises.
+    """
+    if len(set(exercise_ids)) != len(exercise_ids):
+        raise InvalidExerciseOrderError("Each exercise may appear only once.")
+    result = await statements.execute(
+        db, "workouts.reorder_exercises", {"id": workout_id, "user_id": user_id, "exercise_ids": exercise_ids}
+    )
+    row = result.fetchone()
+    await db.commit()
+    if row is None:
+        return None
+    if not row.valid:
+        raise InvalidExerciseOrderError("exercise_ids must list every exercise of the workout.")
+    workout = _decode(row)
+    del workout["valid"]
+    return workout
+
+async def delete_workout(db: AsyncSession, user_id: UUID, workout_id: UUID) -> bool:
+    result = await statements.execute(db, "workouts.delete", {"id": workout_id, "user_id": user_id})
+    deleted = result.fetchone() is not None
+    await db.commit()
+    return deleted
@@ -1,6 +1,23 @@
 import os
-from supabase import create_client, Client
+from functools import lru_cache
 
-url: str = os.environ.get("SUPABASE_URL")
-key: str = os.environ.get("SUPABASE_KEY")
-supa: Client = create_client(url, key)
\ No newline at end of file
+# The Supabase client is created on first use, not at import: importing app.db must not
+# require SUPABASE_URL/SUPABASE_KEY (or network access) just to boot a worker.
+
+
+@lru_cache(maxsize=None)
+def get_supabase_client():
+    from supabase import create_client
+
+    url: str = os.environ.get("SUPABASE_URL")
+    key: str = os.environ.get("SUPABASE_KEY")
+    if not url or not key:
+        raise RuntimeError("SUPABASE_URL and SUPABASE_KEY must be set to use the Supabase client.")
+    return create_client(url, key)
+
+
+def __getattr__(name):
+    # Keeps `from app.db import supa` working, lazily
+    if name == "supa":
+        return get_supabase_client()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
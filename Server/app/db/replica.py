@@ -0,0 +1,100 @@
+import asyncio
+import logging
+import time
+from typing import Any, Dict, Optional
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+logger = logging.getLogger(__name__)
+
+# Seconds the replica is behind the primary. An idle primary sends no new WAL, so a replica that
+# has replayed everything it received counts as 0 rather than "time since the last write".
+# Against a primary (same DSN configured twice) pg_is_in_recovery() is false and lag is 0.
+REPLICA_LAG_QUERY = text("""
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END AS lag_seconds
+""")
+
+
+def pool_stats(engine: AsyncEngine) -> Dict[str, Any]:
+    pool = engine.pool
+    return {
+        "size": pool.size(),
+        "checked_in": pool.checkedin(),
+        "checked_out": pool.checkedout(),
+        "overflow": pool.overflow(),
+    }
+
+
+class ReplicaMonitor:
+    """
+    Polls the read replica in the background and decides whether reads may go to it.
+    The replica is used only while its last check succeeded and lag is within `max_lag_seconds`.
+    """
+
+    def __init__(self, engine: Optional[AsyncEngine], max_lag_seconds: float, interval_seconds: float):
+        self.engine = engine
+        self.max_lag_seconds = max_lag_seconds
+        self.interval_seconds = interval_seconds
+        self.lag_seconds: Optional[float] = None
+        self.healthy = False
+        self.last_error: Optional[str] = None
+        self.last_checked: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def use_replica(self) -> bool:
+        return self.engine is not None and self.healthy
+
+    async def check(self) -> None:
+        try:
+            async with self.engine.connect() as conn:
+                result = await asyncio.wait_for(conn.execute(REPLICA_LAG_QUERY), timeout=self.interval_seconds)
+                self.lag_seconds = float(result.scalar())
+            self.healthy = self.lag_seconds <= self.max_lag_seconds
+            self.last_error = None
+        except Exception as exc: # Any failure means "route reads to the primary"
+            error = exc.__class__.__name__ # Shown by /health; the message (hosts, users) is logged only
+            if self.healthy or error != self.last_error:
+                logger.warning("Read replica unavailable, falling back to primary: %s", exc)
+            self.healthy = False
+            self.last_error = error
+        self.last_checked = time.time()
+
+    async def _run(self) -> None:
+        while True:
+            await self.check()
+            await asyncio.sleep(self.interval_seconds)
+
+    async def start(self) -> None:
+        if self.engine is None or self._task is not None:
+            return
+        await self.check() # Route correctly from the first request
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        if self.engine is None:
+            return {"configured": False}
+        return {
+            "configured": True,
+            "healthy": self.healthy,
+            "in_use": self.use_replica,
+            "lag_seconds": self.lag_seconds,
+            "max_lag_seconds": self.max_lag_seconds,
+            "last_checked": self.last_checked,
+            "last_error": self.last_error,
+            "pool": pool_stats(self.engine),
+        }
@@ -1,42 +1,244 @@
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
-from sqlalchemy.orm import sessionmaker
+import asyncio
+import re
+import time
+import uuid
+from functools import lru_cache
+from typing import Optional
+
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncEngine, AsyncSession
+from sqlalchemy.orm import sessionmaker, Session
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from sqlalchemy.sql.elements import TextClause
+from app.core import metrics
 from app.core.config import settings
+from app.db.replica import ReplicaMonitor
 # We don't need asyncpg directly here if using SQLAlchemy for all DB interactions.
 # SQLAlchemy's async engine will use asyncpg under the hood if specified in DATABASE_URL.
 
-# SQLAlchemy async engine for connection pooling
-async_engine = create_async_engine(
-    settings.DATABASE_URL,
-    echo=False,  # Set to True for debugging SQL queries
-    pool_pre_ping=True,
-    pool_recycle=1800, # Recycle connections every 30 minutes
-    pool_size=10,      # Default is 5, adjust based on expected load
-    max_overflow=20    # Default is 10
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """Default async pool, plus a histogram of how long each checkout waited (including connects)."""
+    metrics_name = "primary"
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            metrics.db_pool_checkout_wait.observe(time.perf_counter() - started, self.metrics_name)
+
+def _connect_args() -> dict:
+    # Per-connection prepared statements; app.crud.base keeps the SQL text stable so these get reused
+    connect_args = {"prepared_statement_cache_size": settings.DB_PREPARED_STATEMENT_CACHE_SIZE}
+    if settings.DB_PGBOUNCER_TRANSACTION_MODE:
+        # Consecutive statements can run on different server connections: turn off SQLAlchemy's
+        # and asyncpg's own statement caches, and give the statements the dialect still prepares
+        # unique names so they never collide with another client's on a shared server connection
+        connect_args.update(
+            prepared_statement_cache_size=0,
+            statement_cache_size=0,
+            prepared_statement_name_func=lambda: f"__asyncpg_{uuid.uuid4()}__",
+        )
+    return connect_args
+
+def _create_engine(url: str, name: str):
+    engine = create_async_engine(
+        url,
+        poolclass=InstrumentedQueuePool,
+        echo=False,  # Set to True for debugging SQL queries
+        pool_pre_ping=True,
+        pool_recycle=1800, # Recycle connections every 30 minutes
+        pool_size=10,      # Default is 5, adjust based on expected load
+        max_overflow=20,   # Default is 10
+        connect_args=_connect_args(),
+    )
+    engine.pool.metrics_name = name
+    return engine
+
+# Engines are created by init_engines() from the app lifespan (or lazily by the first
+# session dependency), so importing this module never touches the database.
+# SQLAlchemy async engine for connection pooling (primary: all writes go here)
+async_engine: Optional[AsyncEngine] = None
+
+# Optional read replica with its own pool; see get_read_db_session for routing
+replica_engine: Optional[AsyncEngine] = None
+replica_monitor = ReplicaMonitor(
+    None,
+    max_lag_seconds=settings.REPLICA_MAX_LAG_SECONDS,
+    interval_seconds=settings.REPLICA_CHECK_INTERVAL_SECONDS,
 )
 
+class TrackedSession(Session):
+    """
+    Sync session behind our AsyncSessions. Records in `info["has_writes"]` whether
+    anything other than a plain SELECT was executed, and refuses writes on read-only sessions.
+    """
+
+_DATA_MODIFYING = re.compile(r"\b(INSERT|UPDATE|DELETE|MERGE|TRUNCATE)\b", re.IGNORECASE)
+
+@lru_cache(maxsize=1024)
+def _is_read_sql(sql: str) -> bool:
+    sql = sql.lstrip()
+    keyword = sql[:6].upper()
+    if keyword == "SELECT":
+        return True
+    # A CTE is a read unless one of its parts modifies data (e.g. WITH ... INSERT)
+    return keyword.startswith("WITH") and not _DATA_MODIFYING.search(sql)
+
+def _is_read_statement(statement) -> bool:
+    if isinstance(statement, TextClause):
+        return _is_read_sql(statement.text)
+    return bool(getattr(statement, "is_select", False))
+
+@event.listens_for(TrackedSession, "do_orm_execute")
+def _track_writes(orm_execute_state):
+    if _is_read_statement(orm_execute_state.statement):
+        return
+    session = orm_execute_state.session
+    if session.info.get("read_only"):
+        raise RuntimeError("Write statement executed on a read-only session; use get_db_session instead.")
+    session.info["has_writes"] = True
+
+
+class ReadOnlyAsyncSession(AsyncSession):
+    """
+    AsyncSession on an AUTOCOMMIT connection: no BEGIN/COMMIT round trips, and the
+    connection goes back to the pool right after each statement. Rows are already
+    buffered by AsyncSession.execute, so results stay readable after the release.
+    """
+
+    async def execute(self, *args, **kwargs):
+        try:
+            return await super().execute(*args, **kwargs)
+        finally:
+            await self.close()
+
+
 # AsyncSession maker
+# Sessions are lazy: a pooled connection is only checked out by the first statement.
 AsyncSessionLocal = sessionmaker(
-    bind=async_engine,
     class_=AsyncSession,
+    sync_session_class=TrackedSession,
     expire_on_commit=False,
     autoflush=False,
     autocommit=False
 )
 
+def _read_only_sessionmaker():
+    # Bound by init_engines() to an AUTOCOMMIT view of an engine (same pool)
+    return sessionmaker(
+        class_=ReadOnlyAsyncSession,
+        sync_session_class=TrackedSession,
+        info={"read_only": True},
+        expire_on_commit=False,
+        autoflush=False,
+    )
+
+ReadOnlySessionLocal = _read_only_sessionmaker()
+ReplicaSessionLocal = _read_only_sessionmaker()
+
+def init_engines() -> None:
+    """Create the engines and bind the session makers. Safe to call more than once."""
+    global async_engine, replica_engine
+    if async_engine is not None:
+        return
+    async_engine = _create_engine(settings.DATABASE_URL, "primary")
+    AsyncSessionLocal.configure(bind=async_engine)
+    ReadOnlySessionLocal.configure(bind=async_engine.execution_options(isolation_level="AUTOCOMMIT"))
+    if settings.DATABASE_REPLICA_URL:
+        replica_engine = _create_engine(settings.DATABASE_REPLICA_URL, "replica")
+        ReplicaSessionLocal.configure(bind=replica_engine.execution_options(isolation_level="AUTOCOMMIT"))
+        replica_monitor.engine = replica_engine
+
+async def warm_up_pool(engine: AsyncEngine, connections: int) -> None:
+    # Open `connections` pooled connections concurrently so the first requests don't pay for connect + auth
+    async def touch():
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+            await asyncio.sleep(0) # Let the others check out too instead of reusing this one
+    await asyncio.gather(*(touch() for _ in range(connections)))
+
+def _pool_gauge(stat: str):
+    def collect():
+        engines = (("primary", async_engine), ("replica", replica_engine))
+        return {(name,): getattr(engine.pool, stat)() for name, engine in engines if engine is not None}
+    return collect
+
+metrics.registry.register(metrics.Gauge(
+    "db_pool_checked_out", "Connections currently checked out of the pool.", ("engine",), callback=_pool_gauge("checkedout"),
+))
+metrics.registry.register(metrics.Gauge(
+    "db_pool_overflow", "Connections open beyond pool_size (negative: unused pool_size slots).", ("engine",), callback=_pool_gauge("overflow"),
+))
+
+async def ping(timeout: float) -> None:
+    """SELECT 1 on the primary; raises on failure or timeout."""
+    init_engines()
+    async def _ping():
+        async with async_engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+    await asyncio.wait_for(_ping(), timeout=timeout)
+
+async def dispose_engines() -> None:
+    global async_engine, replica_engine
+    await replica_monitor.stop()
+    for engine in (async_engine, replica_engine):
+        if engine is not None:
+            await engine.dispose()
+    async_engine = replica_engine = None
+    replica_monitor.engine = None
+
 async def get_db_session() -> AsyncSession:
     """
-    Dependency to get an SQLAlchemy AsyncSession.
+    Dependency to get an SQLAlchemy AsyncSession for endpoints that write.
+    Commits here only if a write ran and is still uncommitted; a transaction that only read
+    is ended by close() with a ROLLBACK instead, which costs the same round trip. Reads that
+    don't need the write's transaction belong on get_read_db_session (AUTOCOMMIT, no BEGIN).
+
+    This teardown runs after the response has been sent, so the connection is only returned
+    before rendering if the endpoint's CRUD function commits itself (as app.crud does: after
+    commit the session holds no connection until its next statement).
     """
+    init_engines()
     async with AsyncSessionLocal() as session:
         try:
             yield session
-            await session.commit() # Commit if no exceptions occurred within the endpoint
+            if session.info.get("has_writes") and session.in_transaction():
+                await session.commit() # Commit if no exceptions occurred within the endpoint
         except Exception:
             await session.rollback() # Rollback on error
             raise
         finally:
             await session.close() # Ensure session is closed
 
+async def get_read_db_session() -> AsyncSession:
+    """
+    Dependency for endpoints that only read. Autocommit, no transaction, and the
+    connection is released after every statement (so never held while the response renders).
+    Served by the read replica when one is configured and healthy, otherwise by the primary.
+    """
+    init_engines()
+    async with read_session_factory()() as session:
+        yield session
+
+async def get_primary_read_db_session() -> AsyncSession:
+    """
+    Like get_read_db_session, but always on the primary: for reads that must see writes that
+    just committed, such as the credential check of a login right after registering.
+    """
+    init_engines()
+    async with ReadOnlySessionLocal() as session:
+        yield session
+
+def read_engine() -> AsyncEngine:
+    """The engine long read-only work should use right now: the replica while it is healthy, else the primary."""
+    init_engines()
+    return replica_engine if replica_monitor.use_replica else async_engine
+
+def read_session_factory() -> sessionmaker:
+    """The read-only session maker to use right now: the replica's while it is healthy, else the primary's."""
+    return ReplicaSessionLocal if replica_monitor.use_replica else ReadOnlySessionLocal
+
 # Raw asyncpg pool is not strictly necessary if all interaction is via SQLAlchemy session
 # but can be kept if you have specific use cases for it.
 # For simplicity with Supabase as a straightforward PG provider, relying on SQLAlchemy's
@@ -1,14 +1,70 @@
-from fastapi import FastAPI, Depends
+import inspect
+import logging
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Depends, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
 
 from app.core.config import settings
-from app.api.endpoints import auth, users #, profiles, posts, comments, etc.
+from app.api.endpoints import auth, users, posts, likes, health_logs, food_logs, diet_recommendations, workouts, exercises, profiles #, comments, etc.
 from app.api import deps
+from app.api.responses import FastJSONResponse
+from app.core import admission, metrics
+from app.core.hashing import password_hasher
+from app.crud import crud_diet_recommendation
+from app.crud.crud_exercise import exercise_catalog
+from app.crud.crud_like import like_buffer
+from app.crud.crud_refresh_token import token_purger
+from app.crud.crud_user import principal_cache
+from app.db import session as db_session
+from app.db.replica import pool_stats
+
+logger = logging.getLogger(__name__)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Everything external is set up here rather than at import, and the app only
+    # starts accepting requests once the pool is warm and the hash workers are up.
+    db_session.init_engines()
+    if settings.DB_POOL_WARMUP_CONNECTIONS > 0:
+        await db_session.warm_up_pool(db_session.async_engine, settings.DB_POOL_WARMUP_CONNECTIONS)
+    await db_session.replica_monitor.start()
+    await password_hasher.start()
+    metrics.loop_lag_monitor.start()
+    like_buffer.start()
+    crud_diet_recommendation.start_workers()
+    await exercise_catalog.start()
+    token_purger.start()
+    try:
+        yield
+    finally:
+        # Each step runs even if an earlier one failed, so worker processes and pooled
+        # connections are always released
+        for name, step in (
+            ("token purger", token_purger.stop),
+            ("exercise catalog", exercise_catalog.stop),
+            ("diet recommendation workers", crud_diet_recommendation.stop_workers),
+            ("like buffer", like_buffer.stop), # Writes out buffered likes while the pool is still open
+            ("loop lag monitor", metrics.loop_lag_monitor.stop),
+            ("password hasher", password_hasher.shutdown),
+            ("database engines", db_session.dispose_engines),
+        ):
+            try:
+                result = step()
+                if inspect.isawaitable(result):
+                    await result
+            except Exception:
+                logger.exception("Shutdown step failed: %s", name)
+
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
     version=settings.PROJECT_VERSION,
-    openapi_url=f"/api/v1/openapi.json"
+    openapi_url=f"/api/v1/openapi.json",
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse,
 )
 
 origins = [
@@ -16,6 +72,8 @@ origins = [
     "http://localhost:8080",
 ]
 
+# Sheds load before any routing or dependency work is done; inside CORS so 503s still carry its headers
+app.add_middleware(admission.AdmissionControlMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=origins,
@@ -23,27 +81,54 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
-
-# --- Database Pool Management---
-# from app.db.session import get_db_pool, _db_pool # Use the raw asyncpg pool
-# @app.on_event("startup")
-# async def startup_event():
-#     await get_db_pool() 
-# @app.on_event("shutdown")
-# async def shutdown_event():
-#     if _db_pool:
-#         await _db_pool.close()
-# --- End Database Pool Management ---
-
+# Outermost, so the recorded latency covers the whole stack (queueing for admission included)
+app.add_middleware(metrics.MetricsMiddleware)
 
 api_prefix = "/api/v1"
 
 app.include_router(auth.router, prefix=f"{api_prefix}/auth", tags=["Authentication"])
 app.include_router(users.router, prefix=f"{api_prefix}/users", tags=["Users"])
+app.include_router(profiles.router, prefix=f"{api_prefix}/profiles", tags=["Profiles"])
+app.include_router(posts.router, prefix=f"{api_prefix}/posts", tags=["Posts"])
+app.include_router(likes.router, prefix=f"{api_prefix}/likes", tags=["Likes"])
+app.include_router(health_logs.router, prefix=f"{api_prefix}/health-logs", tags=["Health Logs"])
+app.include_router(food_logs.router, prefix=f"{api_prefix}/food-logs", tags=["Food Logs"])
+app.include_router(workouts.router, prefix=f"{api_prefix}/workouts", tags=["Workouts"])
+app.include_router(exercises.router, prefix=f"{api_prefix}/exercises", tags=["Exercises"])
+app.include_router(
+    diet_recommendations.router, prefix=f"{api_prefix}/diet-recommendations", tags=["Diet Recommendations"]
+)
 
 @app.get(f"{api_prefix}/health", tags=["Health"])
-async def health_check():
-    return {"status": "healthy"}
+async def health_check(deep: bool = False):
+    """
+    Liveness and pool/cache stats. With `?deep=true` the primary database is pinged too
+    (bounded by HEALTH_DB_TIMEOUT_SECONDS) and a failure returns 503.
+    """
+    body = {
+        "status": "healthy",
+        "principal_cache": principal_cache.stats(),
+        "admission": admission.stats(),
+        "database": {
+            "primary": {"pool": pool_stats(db_session.async_engine)} if db_session.async_engine else None,
+            "replica": db_session.replica_monitor.stats(),
+        },
+    }
+    if deep:
+        try:
+            await db_session.ping(timeout=settings.HEALTH_DB_TIMEOUT_SECONDS)
+        except Exception as exc:
+            # Driver messages can name hosts, ports and users; those only go to the log
+            logger.exception("Deep health check: database ping failed")
+            body["status"] = "unhealthy"
+            body["database"]["error"] = exc.__class__.__name__
+            return JSONResponse(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, content=body)
+    return body
+
+@app.get(f"{api_prefix}/metrics", tags=["Health"], response_class=PlainTextResponse)
+async def read_metrics():
+    """Prometheus text exposition format."""
+    return PlainTextResponse(metrics.registry.render(), media_type="text/plain; version=0.0.4")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,20 @@
+from pydantic import BaseModel, UUID4
+from typing import Optional
+from datetime import datetime
+
+class DietRecommendation(BaseModel):
+    id: UUID4
+    user_id: UUID4
+    recommendation: str # JSON produced by the configured generator
+    input_hash: Optional[str] = None
+    generated_at: datetime
+
+    class Config:
+        orm_mode = True
+
+class DietRecommendationJob(BaseModel):
+    job_id: Optional[UUID4] = None # None when the answer came straight from the cache
+    status: str # queued, running, succeeded or failed
+    cached: bool = False
+    recommendation: Optional[DietRecommendation] = None # Set once succeeded
+    error: Optional[str] = None # Set when failed
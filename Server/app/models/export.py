@@ -0,0 +1,16 @@
+from enum import Enum
+
+class ExportFormat(str, Enum):
+    ndjson = "ndjson"
+    csv = "csv"
+
+class ExportSection(str, Enum):
+    # Same names and order as app.crud.crud_export.EXPORT_SECTIONS
+    account = "account"
+    posts = "posts"
+    comments = "comments"
+    workouts = "workouts"
+    exercises = "exercises"
+    health_logs = "health_logs"
+    food_logs = "food_logs"
+    diet_recommendations = "diet_recommendations"
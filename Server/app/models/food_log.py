@@ -0,0 +1,49 @@
+from pydantic import BaseModel, Field, UUID4
+from typing import Optional, List
+from datetime import date, datetime
+
+class FoodLogBase(BaseModel):
+    food_name: str = Field(..., min_length=1, max_length=255)
+    external_food_id: Optional[str] = Field(None, max_length=255)
+    calories: Optional[float] = Field(None, ge=0)
+    protein: Optional[float] = Field(None, ge=0) # grams
+    carbs: Optional[float] = Field(None, ge=0) # grams
+    fat: Optional[float] = Field(None, ge=0) # grams
+    serving_size: Optional[str] = Field(None, max_length=100)
+    meal_type: Optional[str] = Field(None, max_length=50) # e.g. 'breakfast', 'lunch', 'dinner', 'snack'
+
+class FoodLogCreate(FoodLogBase):
+    log_date: Optional[datetime] = None # Defaults to now
+
+class FoodLogUpdate(FoodLogBase):
+    log_date: datetime # Full replacement, so the date is required
+
+class FoodLog(FoodLogBase):
+    id: UUID4
+    user_id: UUID4
+    log_date: datetime
+    created_at: datetime
+    updated_at: datetime
+
+    class Config:
+        orm_mode = True
+
+class NutritionTotals(BaseModel):
+    item_count: int = 0
+    calories: float = 0
+    protein: float = 0
+    carbs: float = 0
+    fat: float = 0
+
+class MealTotals(NutritionTotals):
+    meal_type: Optional[str] = None
+
+class DailyNutrition(NutritionTotals):
+    day: date # UTC day
+    meals: List[MealTotals] = []
+
+class NutritionSummary(BaseModel):
+    start_day: date
+    end_day: date
+    totals: NutritionTotals # Over the whole range
+    days: List[DailyNutrition] = [] # Only days with logged items
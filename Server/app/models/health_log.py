@@ -0,0 +1,41 @@
+from pydantic import BaseModel
+from typing import List
+from datetime import datetime
+from enum import Enum
+
+class IngestRowError(BaseModel):
+    line: int # 1-based line number in the request body
+    error: str
+
+class IngestBatchResult(BaseModel):
+    batch: int
+    accepted: int = 0 # Newly stored
+    duplicates: int = 0 # Valid, but (log_type, log_date) was already stored
+    rejected: int = 0 # Failed validation
+    errors: List[IngestRowError] = [] # First few rejections of the batch
+
+class IngestResult(BaseModel):
+    accepted: int = 0
+    duplicates: int = 0
+    rejected: int = 0
+    batches: List[IngestBatchResult] = []
+
+class SeriesResolution(str, Enum):
+    auto = "auto"
+    raw = "raw"
+    day = "day"
+    week = "week"
+    month = "month"
+
+class SeriesPoint(BaseModel):
+    timestamp: datetime # Bucket start (UTC) or, for raw points, the sample time
+    avg: float
+    min: float
+    max: float
+    count: int = 1
+
+class HealthSeries(BaseModel):
+    log_type: str
+    resolution: SeriesResolution # What was actually served; never "auto"
+    points: List[SeriesPoint] = []
+    truncated: bool = False # Raw rows hit the fetch cap; narrow the range
@@ -0,0 +1,32 @@
+from pydantic import BaseModel, UUID4
+from typing import Optional, List
+from datetime import datetime
+
+class PostBase(BaseModel):
+    content: Optional[str] = None
+    media_url: Optional[str] = None
+
+class PostCreate(PostBase):
+    pass
+
+class Post(PostBase):
+    id: UUID4
+    user_id: UUID4
+    username: str
+    created_at: datetime
+    updated_at: datetime
+    like_count: int = 0
+    comment_count: int = 0
+    liked_by_me: bool = False
+
+    class Config:
+        orm_mode = True
+
+class FeedPage(BaseModel):
+    items: List[Post]
+    next_cursor: Optional[str] = None # Pass back as ?cursor= to get the next (older) page
+
+class LikeStatus(BaseModel):
+    post_id: UUID4
+    like_count: int = 0
+    liked_by_me: bool = False
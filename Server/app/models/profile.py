@@ -0,0 +1,20 @@
+from pydantic import BaseModel, Field, UUID4
+from typing import Optional
+from datetime import datetime
+
+class ProfileBase(BaseModel):
+    bio: Optional[str] = Field(None, max_length=2000)
+    profile_picture_url: Optional[str] = Field(None, max_length=1024)
+    fitness_goals: Optional[str] = Field(None, max_length=2000)
+
+class ProfileUpdate(ProfileBase):
+    pass # Only the fields sent are changed
+
+class Profile(ProfileBase):
+    id: UUID4
+    user_id: UUID4
+    created_at: datetime
+    updated_at: datetime
+
+    class Config:
+        orm_mode = True
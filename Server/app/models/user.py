@@ -27,14 +27,35 @@ class UserInDBBase(UserBase):
 class User(UserInDBBase):
     pass # What's returned to the client (NO password_hash)
 
+class UserPublic(BaseModel):
+    # Another user's record as any logged-in user may see it (no email)
+    id: UUID4
+    username: str
+    role: str
+    created_at: datetime
+    updated_at: datetime
+
 class UserInDB(UserInDBBase):
     password_hash: str # Stored in DB
 
+class Principal(BaseModel):
+    # Just enough to authorize a request; can be built from token claims alone
+    id: UUID4
+    username: str
+    role: str
+
 class Token(BaseModel):
     access_token: str
     refresh_token: Optional[str] = None # Optional for now
     token_type: str = "bearer"
 
+class RefreshTokenRequest(BaseModel):
+    refresh_token: str
+
+class LogoutRequest(BaseModel):
+    refresh_token: Optional[str] = None # Ends the session this token belongs to
+    all_sessions: bool = False # Ends every session of the user instead
+
 class TokenData(BaseModel):
     username: Optional[str] = None
     user_id: Optional[UUID4] = None
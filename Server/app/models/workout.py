@@ -0,0 +1,53 @@
+from pydantic import BaseModel, Field, UUID4
+from typing import Optional, List
+from datetime import datetime
+
+class ExerciseBase(BaseModel):
+    name: str = Field(..., min_length=1, max_length=255)
+    sets: Optional[int] = Field(None, ge=0)
+    reps: Optional[int] = Field(None, ge=0)
+    weight: Optional[float] = Field(None, ge=0) # kg or lbs, as the user entered it
+    duration_seconds: Optional[int] = Field(None, ge=0) # For time-based exercises
+    notes: Optional[str] = None
+
+class ExerciseCreate(ExerciseBase):
+    pass
+
+class Exercise(ExerciseBase):
+    id: UUID4
+    workout_id: UUID4
+    order_in_workout: int
+    created_at: datetime
+    updated_at: datetime
+
+    class Config:
+        orm_mode = True
+
+class WorkoutBase(BaseModel):
+    name: str = Field(..., min_length=1, max_length=255)
+    description: Optional[str] = None
+
+class WorkoutCreate(WorkoutBase):
+    exercises: List[ExerciseCreate] = Field([], max_items=100) # Stored in this order
+
+class Workout(WorkoutBase):
+    id: UUID4
+    user_id: UUID4
+    created_at: datetime
+    updated_at: datetime
+    exercises: List[Exercise] = []
+
+    class Config:
+        orm_mode = True
+
+class WorkoutPage(BaseModel):
+    items: List[Workout]
+    next_cursor: Optional[str] = None # Pass back as ?cursor= to get the next (older) page
+
+class ExerciseOrder(BaseModel):
+    exercise_ids: List[UUID4] # Every exercise of the workout, in the new order
+
+class ExerciseSearchResult(BaseModel):
+    name: str
+    uses: int # How many logged exercises have this name
+    score: float
@@ -0,0 +1,125 @@
+"""
+Latency of cheap routes while expensive ones overload the app, with and without admission control.
+
+Run from the Server directory:
+    python -m benchmarks.bench_admission --flood 600
+
+A stand-in app has a slow read (holding a "connection" for --hold-ms), a slow write and a
+token refresh; all of them share a 30-slot semaphore standing in for the DB pool. While
+--flood slow requests are in flight, refresh and health are called at a steady rate and
+their latency is recorded. "off" sends everything straight to the app (the old behaviour),
+"on" puts app.core.admission in front of it. No database is needed.
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+from app.core import admission
+from app.core.config import settings
+from benchmarks import asgi
+
+POOL_SIZE = 30 # pool_size + max_overflow of the primary engine
+
+
+def build_app(hold: float, enabled: bool):
+    pool = asyncio.Semaphore(POOL_SIZE)
+
+    async def use_connection(seconds: float):
+        async with pool:
+            await asyncio.sleep(seconds)
+
+    async def slow_read(request):
+        await use_connection(hold)
+        return JSONResponse({})
+
+    async def slow_write(request):
+        await use_connection(hold)
+        return JSONResponse({}, status_code=201)
+
+    async def refresh(request):
+        await use_connection(0.001)
+        return JSONResponse({})
+
+    async def health(request):
+        return JSONResponse({"status": "healthy"})
+
+    app = Starlette(routes=[
+        Route("/api/v1/workouts", slow_read, methods=["GET"]),
+        Route("/api/v1/workouts", slow_write, methods=["POST"]),
+        Route("/api/v1/auth/refresh-token", refresh, methods=["POST"]),
+        Route("/api/v1/health", health, methods=["GET"]),
+    ])
+    if enabled:
+        return admission.AdmissionControlMiddleware(app)
+    return app
+
+
+def percentile(samples: list, fraction: float) -> float:
+    return round(samples[min(len(samples) - 1, int(len(samples) * fraction))] * 1000, 1)
+
+
+async def run(mode: str, flood: int, hold: float, probes: int) -> dict:
+    settings.ADMISSION_CONTROL_ENABLED = mode == "on"
+    for limiter in admission.limiters.values():
+        limiter.rejected = dict.fromkeys(limiter.rejected, 0)
+    app = build_app(hold, enabled=mode == "on")
+    statuses: dict = {}
+
+    async def slow(i: int):
+        method = "GET" if i % 3 else "POST"
+        response = await asgi.request(app, method, "/api/v1/workouts")
+        statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    async def probe(method: str, path: str, samples: list):
+        for _ in range(probes):
+            started = time.perf_counter()
+            response = await asgi.request(app, method, path)
+            if response.status_code < 500:
+                samples.append(time.perf_counter() - started)
+            await asyncio.sleep(random.uniform(0.005, 0.015))
+
+    started = time.perf_counter()
+    flood_tasks = [asyncio.create_task(slow(i)) for i in range(flood)]
+    await asyncio.sleep(0) # Let the flood queue up first
+    refresh_samples: list = []
+    health_samples: list = []
+    await asyncio.gather(
+        probe("POST", "/api/v1/auth/refresh-token", refresh_samples),
+        probe("GET", "/api/v1/health", health_samples),
+    )
+    await asyncio.gather(*flood_tasks)
+    elapsed = time.perf_counter() - started
+
+    refresh_samples.sort()
+    health_samples.sort()
+    return {
+        "mode": mode,
+        "elapsed_s": round(elapsed, 2),
+        "flood_statuses": statuses,
+        "refresh_ok": len(refresh_samples),
+        "refresh_p50_ms": percentile(refresh_samples, 0.5) if refresh_samples else None,
+        "refresh_p99_ms": percentile(refresh_samples, 0.99) if refresh_samples else None,
+        "health_p50_ms": round(statistics.median(health_samples) * 1000, 1),
+        "health_p99_ms": percentile(health_samples, 0.99),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--flood", type=int, default=600, help="Concurrent slow requests")
+    parser.add_argument("--hold-ms", type=float, default=50, help="Connection hold time of a slow request")
+    parser.add_argument("--probes", type=int, default=50, help="Refresh and health calls each")
+    args = parser.parse_args()
+
+    for mode in ("off", "on"):
+        print(asyncio.run(run(mode, args.flood, args.hold_ms / 1000, args.probes)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+Diet recommendation pipeline: request coalescing, worker-pool throughput and cache hits.
+
+Needs a database with sql/tables.sql applied (DATABASE_URL). Run from the Server directory:
+    python -m benchmarks.bench_diet_recommendations --users 20 --requests-per-user 10
+
+Uses the deterministic generator with an artificial delay in place of a real model, and drives
+the app in-process over ASGI. Throwaway `bench_diet_*` users are deleted afterwards.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from sqlalchemy import text
+
+from app.core import security
+from app.core.diet_generator import DeterministicGenerator
+from app.crud import crud_diet_recommendation
+from app.db import session as db_session
+from app.main import app
+from benchmarks.asgi import lifespan, request
+
+PREFIX = "/api/v1/diet-recommendations"
+
+
+async def create_users(count: int):
+    async with db_session.async_engine.begin() as conn:
+        await conn.execute(text("DELETE FROM users WHERE username LIKE 'bench_diet_%'"))
+        rows = (await conn.execute(text("""
+            INSERT INTO users (username, email, password_hash)
+            SELECT 'bench_diet_' || g, 'bench_diet_' || g || '@example.com', 'x'
+            FROM generate_series(1, :count) g
+            RETURNING id, username
+        """), {"count": count})).fetchall()
+        await conn.execute(text("""
+            INSERT INTO food_log_daily_totals (user_id, log_day, meal_type, item_count, calories, protein)
+            SELECT id, current_date, 'lunch', 1, 2000 + random() * 1000, 80 FROM users WHERE username LIKE 'bench_diet_%'
+        """))
+    return [
+        {"Authorization": f"Bearer {security.create_access_token(row.username, row.id, 'user')}"} for row in rows
+    ]
+
+
+async def wait_for(job_ids, headers_by_job) -> None:
+    pending = set(job_ids)
+    while pending:
+        for job_id in list(pending):
+            response = await request(app, "GET", f"{PREFIX}/jobs/{job_id}", headers=headers_by_job[job_id])
+            if response.json()["status"] in ("succeeded", "failed"):
+                pending.discard(job_id)
+        await asyncio.sleep(0.02)
+
+
+async def burst(users, per_user: int):
+    """Every user fires `per_user` requests at once. Returns (latencies, responses)."""
+    latencies = []
+
+    async def one(headers):
+        started = time.perf_counter()
+        response = await request(app, "POST", f"{PREFIX}/", headers=headers)
+        latencies.append(time.perf_counter() - started)
+        return headers, response
+
+    results = await asyncio.gather(*(one(headers) for headers in users for _ in range(per_user)))
+    return latencies, results
+
+
+def ms(samples, q: float) -> float:
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(q * len(samples)))] * 1000
+
+
+async def run(args) -> None:
+    crud_diet_recommendation.set_generator(DeterministicGenerator(delay_seconds=args.delay))
+    async with lifespan(app):
+        users = await create_users(args.users)
+        try:
+            started = time.perf_counter()
+            latencies, results = await burst(users, args.requests_per_user)
+            headers_by_job = {r.json()["job_id"]: headers for headers, r in results if r.json()["job_id"]}
+            await wait_for(headers_by_job.keys(), headers_by_job)
+            elapsed = time.perf_counter() - started
+            requests = len(results)
+            print(f"cold:   {requests} requests -> {len(headers_by_job)} jobs "
+                  f"({crud_diet_recommendation.diet_jobs.coalesced} coalesced), all done in {elapsed:.2f}s "
+                  f"with {args.workers} workers x {args.delay * 1000:.0f} ms per generation")
+            print(f"        POST p50 {ms(latencies, 0.5):.1f} ms, p99 {ms(latencies, 0.99):.1f} ms")
+
+            latencies, results = await burst(users, args.requests_per_user)
+            cached = sum(1 for _, r in results if r.json()["cached"])
+            print(f"warm:   {cached}/{len(results)} served from the cache, "
+                  f"POST p50 {ms(latencies, 0.5):.1f} ms, p99 {ms(latencies, 0.99):.1f} ms, "
+                  f"mean {statistics.mean(latencies) * 1000:.1f} ms")
+
+            latencies = []
+            for headers in users: # One at a time: the cache-hit cost without queueing for connections
+                started = time.perf_counter()
+                await request(app, "POST", f"{PREFIX}/", headers=headers)
+                latencies.append(time.perf_counter() - started)
+            print(f"serial: cache hit p50 {ms(latencies, 0.5):.1f} ms, max {max(latencies) * 1000:.1f} ms")
+        finally:
+            async with db_session.async_engine.begin() as conn:
+                await conn.execute(text("DELETE FROM users WHERE username LIKE 'bench_diet_%'"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--requests-per-user", type=int, default=10)
+    parser.add_argument("--delay", type=float, default=0.2, help="Simulated seconds per generation")
+    parser.add_argument("--workers", type=int, default=None, help="Overrides DIET_RECOMMENDATION_WORKERS")
+    args = parser.parse_args()
+    if args.workers is not None:
+        crud_diet_recommendation.diet_jobs.workers = args.workers
+    args.workers = crud_diet_recommendation.diet_jobs.workers
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,273 @@
+"""
+End-to-end latency and throughput of the auth and user endpoints, driving app.main.app in-process
+over ASGI: register, login, refresh, GET /users/{id} and GET /users/me/, each at --concurrency
+requests in flight.
+
+--backend postgres (default) runs the real app and its lifespan against DATABASE_URL (bench
+users are deleted afterwards). --backend memory swaps the CRUD functions for the in-memory
+stand-in in benchmarks.memory_crud, so everything but SQL is measured and no database is
+needed; any "package.module:ClassName" with the same install() works too. bcrypt is real in
+both, which is what register and login mostly measure.
+
+Results go to --output as JSON; rps counts 2xx responses only. The exit status is 1 if a
+scenario got more than --max-errors non-2xx responses (default 0). With --baseline, every
+scenario is compared with the stored run and the exit status is also 1 if a --compare metric
+got worse by more than --threshold (fractional) or it got more errors than before;
+--update-baseline stores this run as the new baseline instead. Run from the Server directory:
+    python -m benchmarks.bench_e2e --backend memory --concurrency 32 --output e2e.json --baseline e2e-baseline.json
+"""
+import argparse
+import asyncio
+import importlib
+import json
+import math
+import os
+import platform
+import sys
+import time
+import uuid
+from typing import Awaitable, Callable, Dict, List
+
+from app.core import security
+from app.core.hashing import password_hasher
+from app.crud import crud_refresh_token
+from app.main import app
+from benchmarks.asgi import Response, lifespan, request
+
+SCENARIOS = ("register", "login", "refresh", "get_user", "me")
+AUTH_SCENARIOS = ("register", "login") # bcrypt-bound; they get --auth-requests
+LOWER_IS_BETTER = {"p50_ms", "p95_ms", "p99_ms", "mean_ms"}
+USERNAME_PREFIX = "bench_e2e_"
+PASSWORD = "bench-password"
+
+MakeRequest = Callable[[int, int], Awaitable[Response]]
+
+
+def load_backend(name: str):
+    if name == "postgres":
+        return None
+    if name == "memory":
+        name = "benchmarks.memory_crud:CrudStandIn"
+    module_name, _, class_name = name.partition(":")
+    if not class_name:
+        raise SystemExit(f"--backend must be postgres, memory or 'package.module:ClassName', not {name!r}")
+    return getattr(importlib.import_module(module_name), class_name)()
+
+
+def percentile(sorted_samples: List[float], fraction: float) -> float:
+    # Nearest rank: the smallest sample with at least `fraction` of all samples at or below it
+    # (rounded first so float error like 0.07 * 100 = 7.000000000000001 doesn't skip a rank)
+    rank = math.ceil(round(fraction * len(sorted_samples), 9))
+    return sorted_samples[max(0, min(len(sorted_samples), rank) - 1)]
+
+
+async def run_scenario(make_request: MakeRequest, requests: int, concurrency: int, warmup: int) -> Dict:
+    """`requests` calls spread over `concurrency` workers; make_request(worker, n) sends call n."""
+    for n in range(warmup):
+        await make_request(n % concurrency, n)
+
+    latencies: List[float] = []
+    statuses: Dict[str, int] = {}
+    issued = 0
+
+    async def worker(index: int):
+        nonlocal issued
+        while issued < requests:
+            n = issued
+            issued += 1
+            started = time.perf_counter()
+            response = await make_request(index, warmup + n)
+            latencies.append(time.perf_counter() - started)
+            statuses[str(response.status_code)] = statuses.get(str(response.status_code), 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(index) for index in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    errors = sum(count for status, count in statuses.items() if not status.startswith("2"))
+    return {
+        "requests": requests,
+        "errors": errors,
+        "statuses": statuses,
+        "rps": round((requests - errors) / elapsed, 1), # Successful responses only
+        "mean_ms": round(sum(latencies) / len(latencies) * 1000, 2),
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+    }
+
+
+async def register(username: str) -> Response:
+    return await request(app, "POST", "/api/v1/auth/register", json_body={
+        "username": username, "email": f"{username}@example.com", "password": PASSWORD,
+    })
+
+
+async def issue_refresh_token(user: Dict) -> str:
+    from app.db import session as db_session
+
+    db_session.init_engines()
+    async with db_session.AsyncSessionLocal() as db:
+        return await crud_refresh_token.issue_refresh_token(db, user["id"])
+
+
+async def run_all(args, run_id: str) -> Dict[str, Dict]:
+    # Users the read scenarios and login work with; created through the API like any other
+    users = []
+    for start in range(0, args.users, args.concurrency):
+        batch = [f"{USERNAME_PREFIX}{run_id}_u{n}" for n in range(start, min(args.users, start + args.concurrency))]
+        for response in await asyncio.gather(*(register(username) for username in batch)):
+            assert response.status_code == 201, response.content
+            user = response.json()
+            user["id"] = uuid.UUID(user["id"])
+            users.append(user)
+    access_headers = [
+        {"Authorization": f"Bearer {security.create_access_token(user['username'], user['id'], user['role'])}"}
+        for user in users
+    ]
+    # One rotation chain per worker: a refresh token can only be used once
+    chains = [await issue_refresh_token(users[index % len(users)]) for index in range(args.concurrency)]
+
+    async def do_register(worker: int, n: int) -> Response:
+        return await register(f"{USERNAME_PREFIX}{run_id}_r{n}")
+
+    async def do_login(worker: int, n: int) -> Response:
+        return await request(app, "POST", "/api/v1/auth/login", form={
+            "username": users[n % len(users)]["username"], "password": PASSWORD,
+        })
+
+    async def do_refresh(worker: int, n: int) -> Response:
+        response = await request(app, "POST", "/api/v1/auth/refresh-token", json_body={"refresh_token": chains[worker]})
+        if response.status_code == 200:
+            chains[worker] = response.json()["refresh_token"]
+        return response
+
+    async def do_get_user(worker: int, n: int) -> Response:
+        return await request(app, "GET", f"/api/v1/users/{users[n % len(users)]['id']}")
+
+    async def do_me(worker: int, n: int) -> Response:
+        return await request(app, "GET", "/api/v1/users/me/", headers=access_headers[n % len(users)])
+
+    handlers = {
+        "register": do_register, "login": do_login, "refresh": do_refresh, "get_user": do_get_user, "me": do_me,
+    }
+    results = {}
+    for scenario in args.scenarios:
+        requests = args.auth_requests if scenario in AUTH_SCENARIOS else args.requests
+        results[scenario] = await run_scenario(handlers[scenario], requests, args.concurrency, args.warmup)
+        print(f"{scenario:<9} {results[scenario]['rps']:>9,.1f} req/s  p50 {results[scenario]['p50_ms']:>8.2f} ms  "
+              f"p95 {results[scenario]['p95_ms']:>8.2f} ms  p99 {results[scenario]['p99_ms']:>8.2f} ms  "
+              f"errors {results[scenario]['errors']}", file=sys.stderr)
+    return results
+
+
+async def cleanup() -> None:
+    from sqlalchemy import text
+    from app.db import session as db_session
+
+    db_session.init_engines()
+    async with db_session.async_engine.begin() as conn:
+        await conn.execute(text("DELETE FROM users WHERE username LIKE :prefix"), {"prefix": USERNAME_PREFIX + "%"})
+
+
+async def bench(args) -> Dict[str, Dict]:
+    run_id = uuid.uuid4().hex[:8]
+    backend = load_backend(args.backend)
+    if backend is None:
+        async with lifespan(app):
+            try:
+                return await run_all(args, run_id)
+            finally:
+                await cleanup()
+
+    uninstall = backend.install()
+    await password_hasher.start()
+    try:
+        return await run_all(args, run_id)
+    finally:
+        password_hasher.shutdown()
+        uninstall()
+
+
+def compare(results: Dict[str, Dict], baseline: Dict[str, Dict], metrics: List[str], threshold: float) -> List[str]:
+    """Human-readable regressions of `results` against `baseline`: metrics beyond `threshold`, or more errors."""
+    regressions = []
+    print(f"{'':<9} {'metric':<7} {'baseline':>10}    {'current':>10}  change (+ is better)", file=sys.stderr)
+    for scenario, current in results.items():
+        previous = baseline.get(scenario)
+        if previous is None:
+            continue
+        if current["errors"] > previous.get("errors", 0):
+            regressions.append(f"{scenario} errors: {previous.get('errors', 0)} -> {current['errors']}")
+        for metric in metrics:
+            old, new = previous.get(metric), current.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old if metric in LOWER_IS_BETTER else (old - new) / old # > 0: worse
+            verdict = "REGRESSION" if change > threshold else "ok"
+            print(f"{scenario:<9} {metric:<7} {old:>10} -> {new:>10}  {change * -100:+7.1f}%  {verdict}", file=sys.stderr)
+            if change > threshold:
+                regressions.append(f"{scenario} {metric}: {old} -> {new} ({change:+.1%} worse)")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", default="postgres", help="postgres, memory or package.module:ClassName")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--concurrency", type=int, default=16, help="Requests in flight")
+    parser.add_argument("--requests", type=int, default=2000, help="Measured requests per scenario")
+    parser.add_argument("--auth-requests", type=int, default=200, help="Measured requests for register and login")
+    parser.add_argument("--warmup", type=int, default=20, help="Unmeasured requests before each scenario")
+    parser.add_argument("--users", type=int, default=50, help="Users created for login and the reads")
+    parser.add_argument("--output", help="Write the results here as JSON")
+    parser.add_argument("--baseline", help="JSON results of an earlier run to compare with")
+    parser.add_argument("--update-baseline", action="store_true", help="Store this run as --baseline")
+    parser.add_argument("--compare", default="rps,p95_ms", help="Metrics compared with the baseline")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Allowed fractional worsening, e.g. 0.1")
+    parser.add_argument("--max-errors", type=int, default=0, help="Non-2xx responses a scenario may get before the run fails")
+    args = parser.parse_args()
+
+    results = asyncio.run(bench(args))
+    report = {
+        "meta": {
+            "backend": args.backend, "concurrency": args.concurrency, "requests": args.requests,
+            "auth_requests": args.auth_requests, "python": platform.python_version(), "cpus": os.cpu_count(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        },
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(report, output, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+    # Failed requests are fast and would pass for throughput; a run with them measures the wrong thing
+    failing = [f"{scenario}: {result['errors']} errors {result['statuses']}"
+               for scenario, result in results.items() if result["errors"] > args.max_errors]
+    if failing:
+        print("Scenarios with more than --max-errors errors:\n  " + "\n  ".join(failing), file=sys.stderr)
+        sys.exit(1)
+
+    if not args.baseline:
+        return
+    if args.update_baseline or not os.path.exists(args.baseline):
+        with open(args.baseline, "w") as output:
+            json.dump(report, output, indent=2)
+        print(f"Baseline written to {args.baseline}", file=sys.stderr)
+        return
+    with open(args.baseline) as stored:
+        baseline = json.load(stored)
+    different = [key for key in ("backend", "concurrency", "cpus") if baseline["meta"].get(key) != report["meta"][key]]
+    if different:
+        print(f"Warning: baseline differs in {', '.join(different)}; the comparison may not mean much", file=sys.stderr)
+    regressions = compare(results, baseline["results"], args.compare.split(","), args.threshold)
+    if regressions:
+        print("Regressions beyond the threshold:\n  " + "\n  ".join(regressions), file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
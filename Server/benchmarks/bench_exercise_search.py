@@ -0,0 +1,117 @@
+"""
+Exercise catalog search: query latency and memory of the in-process trigram index.
+
+No database needed; the catalog is synthetic. Run from the Server directory:
+    python -m benchmarks.bench_exercise_search --names 100000 --queries 2000
+
+Names are built from equipment, position and movement words (so trigrams are as skewed as in a
+real catalog), popularity follows a Zipf-like curve, and queries mix exact names, prefixes,
+short prefixes and names with a typo.
+"""
+import argparse
+import random
+import time
+import tracemalloc
+
+from app.core.search import SearchIndex
+
+EQUIPMENT = ["barbell", "dumbbell", "kettlebell", "cable", "machine", "smith machine", "resistance band",
+             "ez bar", "trap bar", "landmine", "medicine ball", "sandbag", "suspension", "bodyweight", "plate"]
+POSITIONS = ["incline", "decline", "seated", "standing", "kneeling", "lying", "single arm", "single leg",
+             "alternating", "wide grip", "close grip", "reverse grip", "neutral grip", "pause", "tempo",
+             "deficit", "banded", "half kneeling", "split stance", "staggered stance"]
+MOVEMENTS = ["bench press", "shoulder press", "row", "curl", "hammer curl", "squat", "front squat", "lunge",
+             "deadlift", "romanian deadlift", "hip thrust", "fly", "lateral raise", "front raise", "shrug",
+             "pullover", "skull crusher", "tricep extension", "kickback", "calf raise", "good morning",
+             "step up", "split squat", "upright row", "face pull", "chest press", "pulldown", "pushdown",
+             "woodchopper", "farmer carry", "clean", "snatch", "thruster", "swing", "glute bridge",
+             "reverse fly", "preacher curl", "concentration curl", "overhead press", "push press"]
+SUFFIXES = ["", " hold", " iso", " drop set", " 1.5 rep", " partial", " to box", " with chains", " on floor",
+            " from pins", " with pause", " eccentric", " cluster", " complex", " ladder", " ii", " iii"]
+
+
+def catalog(count: int, seed: int):
+    rng = random.Random(seed)
+    names = set()
+    while len(names) < count:
+        parts = [rng.choice(POSITIONS) if rng.random() < 0.7 else "", rng.choice(EQUIPMENT), rng.choice(MOVEMENTS)]
+        name = " ".join(p for p in parts if p) + rng.choice(SUFFIXES)
+        if len(names) > count * 0.8: # The long tail: one-off custom names
+            name += f" {rng.choice(['v', 'x', 'var'])}{rng.randrange(1000)}"
+        names.add(name.title())
+    return [(name, max(1, int(10000 / (rank + 1) ** 0.8))) for rank, name in enumerate(rng.sample(sorted(names), count))]
+
+
+def typo(rng: random.Random, text: str) -> str:
+    i = rng.randrange(1, len(text) - 1)
+    kind = rng.randrange(3)
+    if kind == 0:
+        return text[:i] + text[i + 1:] # deletion
+    if kind == 1:
+        return text[:i] + text[i + 1] + text[i] + text[i + 2:] # transposition
+    return text[:i] + rng.choice("aeiourstn") + text[i + 1:] # substitution
+
+
+def queries(names, count: int, seed: int):
+    rng = random.Random(seed)
+    out = []
+    for _ in range(count):
+        name = rng.choice(names)[0].lower()
+        kind = rng.randrange(4)
+        if kind == 0:
+            out.append(("exact", name))
+        elif kind == 1:
+            out.append(("prefix", name[:rng.randint(3, 8)]))
+        elif kind == 2:
+            out.append(("short", name[:rng.randint(1, 2)]))
+        else:
+            out.append(("typo", typo(rng, name)))
+    return out
+
+
+def pct(samples, q: float) -> float:
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(q * len(samples)))] * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--names", type=int, default=100_000)
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    names = catalog(args.names, args.seed)
+    tracemalloc.start()
+    started = time.perf_counter()
+    index = SearchIndex(max_entries=args.names)
+    index.load(names)
+    build = time.perf_counter() - started
+    memory, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    stats = index.stats()
+    print(f"loaded {stats['entries']} names in {build:.2f}s: {stats['words']} distinct words, "
+          f"{stats['postings']} postings, {memory / 2 ** 20:.1f} MiB")
+
+    by_kind = {}
+    hits = 0
+    for kind, query in queries(names, args.queries, args.seed):
+        started = time.perf_counter()
+        results = index.search(query, args.limit)
+        by_kind.setdefault(kind, []).append(time.perf_counter() - started)
+        hits += bool(results)
+    everything = [t for samples in by_kind.values() for t in samples]
+    for kind, samples in [*sorted(by_kind.items()), ("all", everything)]:
+        print(f"{kind:>7}: {len(samples):5d} queries, p50 {pct(samples, 0.5):.2f} ms, "
+              f"p95 {pct(samples, 0.95):.2f} ms, p99 {pct(samples, 0.99):.2f} ms, max {max(samples) * 1000:.2f} ms")
+    print(f"{hits}/{len(everything)} queries returned results")
+
+    rng = random.Random(args.seed)
+    for name, _ in rng.sample(names, 3):
+        query = typo(rng, name.lower())
+        print(f"{query!r} -> {[n for n, _, _ in index.search(query, 3)]}")
+
+
+if __name__ == "__main__":
+    main()
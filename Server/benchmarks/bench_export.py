@@ -0,0 +1,175 @@
+"""
+Peak memory of a full account export as the account grows: streamed from server-side cursors
+(GET /users/me/export) vs. fetchall() + one in-memory NDJSON body (the naive way).
+
+Seeds one user with up to the largest --rows health samples, then for each size runs every
+variant in a fresh interpreter and reports how far its peak RSS rose above the RSS it had
+before exporting. The streaming variant reads the response like a slow client
+(--client-delay-ms per chunk) and asks for gzip, so it also shows the cursor pausing instead
+of buffering; its "sent" size is the compressed body.
+Needs a database with sql/tables.sql applied (DATABASE_URL). Run from the Server directory:
+    python -m benchmarks.bench_export --rows 50000 200000 500000
+"""
+import argparse
+import asyncio
+import json
+import resource
+import subprocess
+import sys
+import time
+
+from sqlalchemy import text
+
+BENCH_USERNAME = "bench_export_user"
+
+
+def rss_mb() -> float:
+    # Linux reports ru_maxrss in KiB
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def current_rss_mb() -> float:
+    with open("/proc/self/statm") as statm:
+        return int(statm.read().split()[1]) * resource.getpagesize() / 1024 / 1024
+
+
+async def stream_export(user_id, username: str, delay: float) -> int:
+    from app.core import security
+    from app.main import app
+
+    token = security.create_access_token(username, user_id, "user")
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET", "scheme": "http",
+        "path": "/api/v1/users/me/export", "raw_path": b"/api/v1/users/me/export", "query_string": b"",
+        "root_path": "", "client": ("127.0.0.1", 50000), "server": ("testserver", 80),
+        "headers": [(b"authorization", f"Bearer {token}".encode()), (b"accept-encoding", b"gzip")],
+    }
+    done = asyncio.Event()
+    received = 0
+
+    async def receive():
+        if scope.get("_sent"):
+            await done.wait() # No disconnect until the body is fully read
+            return {"type": "http.disconnect"}
+        scope["_sent"] = True
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        nonlocal received
+        if message["type"] == "http.response.start":
+            assert message["status"] == 200, message
+        elif message["type"] == "http.response.body":
+            received += len(message.get("body", b""))
+            if delay:
+                await asyncio.sleep(delay) # A slow client: the app can't send the next chunk yet
+            if not message.get("more_body"):
+                done.set()
+
+    await app(scope, receive, send)
+    return received
+
+
+async def fetchall_export(user_id) -> int:
+    from app.crud.crud_export import EXPORT_SECTIONS, encode_ndjson
+    from app.db import session as db_session
+
+    db_session.init_engines()
+    parts = []
+    async with db_session.async_engine.connect() as conn:
+        for section, sql in EXPORT_SECTIONS.items():
+            result = await conn.execute(text(sql), {"user_id": user_id})
+            rows = result.fetchall()
+            parts.append(encode_ndjson(section, list(result.keys()), [tuple(row) for row in rows]))
+    body = b"".join(parts)
+    await db_session.dispose_engines()
+    return len(body)
+
+
+def child(variant: str, user_id: str, delay: float) -> None:
+    import uuid
+    import app.main # noqa: F401 - imports count towards the baseline, not the export
+
+    user_id = uuid.UUID(user_id)
+    baseline = current_rss_mb()
+    started = time.perf_counter()
+    if variant == "stream":
+        size = asyncio.run(stream_export(user_id, BENCH_USERNAME, delay))
+    else:
+        size = asyncio.run(fetchall_export(user_id))
+    print(json.dumps({
+        "bytes": size, "seconds": round(time.perf_counter() - started, 2),
+        "rss_growth_mb": round(rss_mb() - baseline, 1),
+    }))
+
+
+async def seed(rows: int) -> str:
+    from app.db import session as db_session
+
+    db_session.init_engines()
+    try:
+        return await _seed(db_session.async_engine, rows)
+    finally:
+        await db_session.dispose_engines()
+
+
+async def _seed(engine, rows: int) -> str:
+    async with engine.begin() as conn:
+        user_id = (await conn.execute(text("SELECT id FROM users WHERE username = :username"), {"username": BENCH_USERNAME})).scalar()
+        if user_id is None:
+            user_id = (await conn.execute(text("""
+                INSERT INTO users (username, email, password_hash) VALUES (:username, :email, 'x')
+                RETURNING id
+            """), {"username": BENCH_USERNAME, "email": f"{BENCH_USERNAME}@example.com"})).scalar()
+        have = (await conn.execute(text("SELECT count(*) FROM health_logs WHERE user_id = :user_id"), {"user_id": user_id})).scalar()
+        if have < rows:
+            await conn.execute(text("""
+                INSERT INTO health_logs (user_id, log_type, value, log_date)
+                SELECT :user_id, 'weight_kg', 70 + random(), timestamptz '2020-01-01' + n * interval '1 minute'
+                FROM generate_series(CAST(:start AS int), CAST(:stop AS int)) AS n
+            """), {"user_id": user_id, "start": have, "stop": rows - 1})
+        elif have > rows:
+            await conn.execute(text("""
+                DELETE FROM health_logs WHERE id IN (
+                    SELECT id FROM health_logs WHERE user_id = :user_id ORDER BY log_date DESC LIMIT :extra
+                )
+            """), {"user_id": user_id, "extra": have - rows})
+    return str(user_id)
+
+
+async def cleanup() -> None:
+    from app.db import session as db_session
+
+    db_session.init_engines()
+    async with db_session.async_engine.begin() as conn:
+        await conn.execute(text("DELETE FROM users WHERE username = :username"), {"username": BENCH_USERNAME})
+    await db_session.dispose_engines()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[50000, 200000, 500000], help="Health samples per run")
+    parser.add_argument("--client-delay-ms", type=float, default=1, help="Pause after each chunk the client reads")
+    parser.add_argument("--child", nargs=3, metavar=("VARIANT", "USER_ID", "DELAY"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child(args.child[0], args.child[1], float(args.child[2]))
+        return
+
+    try:
+        for rows in sorted(args.rows):
+            user_id = asyncio.run(seed(rows))
+            for variant in ("fetchall", "stream"):
+                output = subprocess.run(
+                    [sys.executable, "-m", "benchmarks.bench_export", "--child", variant, user_id,
+                     str(args.client_delay_ms / 1000)],
+                    check=True, capture_output=True, text=True,
+                ).stdout.strip().splitlines()[-1]
+                result = json.loads(output)
+                print(f"{rows:>9,} rows  {variant:<8} peak RSS +{result['rss_growth_mb']:>7.1f} MB  "
+                      f"{result['bytes'] / 1e6:>7.1f} MB sent  {result['seconds']:>6.2f} s")
+    finally:
+        asyncio.run(cleanup())
+
+
+if __name__ == "__main__":
+    main()
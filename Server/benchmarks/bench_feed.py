@@ -0,0 +1,117 @@
+"""
+Feed page latency at depth: keyset cursor (what the API does) vs. the OFFSET equivalent.
+
+Needs a database with sql/tables.sql applied (DATABASE_URL). Run from the Server directory:
+    python -m benchmarks.bench_feed --posts 1000000
+
+Seeds posts (and some likes) under throwaway `bench_feed_*` users, which are deleted
+afterwards (cascading to their posts) unless --keep is given.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from sqlalchemy import text
+
+from app.crud import crud_post
+from app.db import session as db_session
+
+OFFSET_PAGE_SQL = text("""
+    SELECT p.id, p.created_at,
+        (SELECT count(*) FROM likes l WHERE l.post_id = p.id) AS like_count,
+        (SELECT count(*) FROM comments c WHERE c.post_id = p.id) AS comment_count
+    FROM posts p
+    ORDER BY p.created_at DESC, p.id DESC
+    LIMIT :limit OFFSET :offset
+""")
+
+
+async def seed(posts: int, likers: int) -> None:
+    async with db_session.async_engine.begin() as conn:
+        await conn.execute(text("""
+            INSERT INTO users (username, email, password_hash)
+            SELECT 'bench_feed_' || g, 'bench_feed_' || g || '@example.com', 'x'
+            FROM generate_series(0, :likers) g
+            ON CONFLICT DO NOTHING
+        """), {"likers": likers})
+        author_id = (await conn.execute(text("SELECT id FROM users WHERE username = 'bench_feed_0'"))).scalar()
+        await conn.execute(text("""
+            INSERT INTO posts (user_id, content, created_at)
+            SELECT :author_id, 'bench post ' || g, now() - g * interval '1 second'
+            FROM generate_series(1, :posts) g
+        """), {"author_id": author_id, "posts": posts})
+        # Every liker likes roughly one post in ten
+        await conn.execute(text("""
+            INSERT INTO likes (post_id, user_id)
+            SELECT p.id, u.id
+            FROM posts p JOIN users u ON u.username LIKE 'bench_feed_%' AND u.username <> 'bench_feed_0'
+            WHERE p.user_id = :author_id AND random() < 0.1
+            ON CONFLICT DO NOTHING
+        """), {"author_id": author_id})
+        await conn.execute(text("ANALYZE posts"))
+        await conn.execute(text("ANALYZE likes"))
+
+
+async def cleanup() -> None:
+    async with db_session.async_engine.begin() as conn:
+        await conn.execute(text("DELETE FROM users WHERE username LIKE 'bench_feed_%'"))
+
+
+async def time_it(fn, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        await fn()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples) * 1000
+
+
+async def run(args) -> None:
+    db_session.init_engines()
+    if not args.skip_seed:
+        started = time.perf_counter()
+        await seed(args.posts, args.likers)
+        print(f"seeded {args.posts} posts in {time.perf_counter() - started:.1f}s")
+
+    try:
+        print(f"{'page':>8} {'keyset ms':>10} {'offset ms':>10}")
+        for page in args.depths:
+            offset = page * args.limit
+            async with db_session.ReadOnlySessionLocal() as db:
+                row = (await db.execute(text(
+                    "SELECT created_at, id FROM posts ORDER BY created_at DESC, id DESC LIMIT 1 OFFSET :offset"
+                ), {"offset": max(offset - 1, 0)})).fetchone()
+                if row is None:
+                    break
+                cursor = crud_post.encode_cursor(row.created_at, row.id) if offset else None
+
+                async def keyset():
+                    await crud_post._fetch_feed_page(db, viewer_id=None, cursor=cursor, limit=args.limit)
+
+                async def with_offset():
+                    await db.execute(OFFSET_PAGE_SQL, {"limit": args.limit, "offset": offset})
+
+                keyset_ms = await time_it(keyset, args.repeat)
+                offset_ms = await time_it(with_offset, args.repeat)
+            print(f"{page:>8} {keyset_ms:>10.2f} {offset_ms:>10.2f}")
+    finally:
+        if not args.keep:
+            await cleanup()
+        await db_session.dispose_engines()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--posts", type=int, default=1_000_000)
+    parser.add_argument("--likers", type=int, default=20)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--depths", type=int, nargs="+", default=[0, 10, 100, 1000, 10000, 40000])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--keep", action="store_true", help="Keep the seeded rows")
+    parser.add_argument("--skip-seed", action="store_true", help="Reuse rows from a previous --keep run")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Health log ingestion throughput: the batched NDJSON ingest path vs. one INSERT per row.
+
+Needs a database with sql/tables.sql applied (DATABASE_URL). Run from the Server directory:
+    python -m benchmarks.bench_health_ingest --rows 200000
+
+Rows are written for a throwaway `bench_ingest` user, deleted afterwards (cascading to its logs).
+The body is generated lazily in 64 KiB chunks, as a client upload would arrive.
+"""
+import argparse
+import asyncio
+import json
+import time
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import text
+
+from app.crud import crud_health_log
+from app.db import session as db_session
+
+SINGLE_INSERT_SQL = text("""
+    INSERT INTO health_logs (user_id, log_type, value, log_date)
+    VALUES (:user_id, :log_type, :value, :log_date)
+    ON CONFLICT (user_id, log_type, log_date) DO NOTHING
+""")
+START = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+
+def samples(log_type: str, rows: int):
+    for i in range(rows):
+        yield log_type, 60 + i % 40, START + timedelta(seconds=i)
+
+
+async def ndjson_chunks(log_type: str, rows: int, chunk_size: int = 65536):
+    chunk = bytearray()
+    for log_type, value, log_date in samples(log_type, rows):
+        chunk += json.dumps({"log_type": log_type, "value": value, "log_date": log_date.isoformat()}).encode() + b"\n"
+        if len(chunk) >= chunk_size:
+            yield bytes(chunk)
+            chunk.clear()
+    if chunk:
+        yield bytes(chunk)
+
+
+async def create_user() -> str:
+    async with db_session.async_engine.begin() as conn:
+        await conn.execute(text("DELETE FROM users WHERE username = 'bench_ingest'"))
+        return (await conn.execute(text("""
+            INSERT INTO users (username, email, password_hash)
+            VALUES ('bench_ingest', 'bench_ingest@example.com', 'x') RETURNING id
+        """))).scalar()
+
+
+async def row_at_a_time(user_id, rows: int, commit_each: bool) -> float:
+    started = time.perf_counter()
+    async with db_session.AsyncSessionLocal() as db:
+        for log_type, value, log_date in samples(f"single_{commit_each}", rows):
+            await db.execute(SINGLE_INSERT_SQL, {
+                "user_id": user_id, "log_type": log_type, "value": value, "log_date": log_date,
+            })
+            if commit_each:
+                await db.commit()
+        await db.commit()
+    return rows / (time.perf_counter() - started)
+
+
+async def batched(user_id, rows: int, batch_size: int) -> float:
+    started = time.perf_counter()
+    async with db_session.AsyncSessionLocal() as db:
+        result = await crud_health_log.ingest_health_logs(
+            db, user_id, ndjson_chunks(f"batched_{batch_size}", rows), "ndjson", batch_size=batch_size
+        )
+    assert result["accepted"] == rows, result
+    return rows / (time.perf_counter() - started)
+
+
+async def run(args) -> None:
+    db_session.init_engines()
+    user_id = await create_user()
+    try:
+        print(f"{'mode':<32} {'rows':>8} {'rows/s':>10}")
+        rate = await row_at_a_time(user_id, args.single_rows, commit_each=True)
+        print(f"{'row-at-a-time, commit each':<32} {args.single_rows:>8} {rate:>10.0f}")
+        rate = await row_at_a_time(user_id, args.single_rows, commit_each=False)
+        print(f"{'row-at-a-time, one transaction':<32} {args.single_rows:>8} {rate:>10.0f}")
+        for batch_size in args.batch_sizes:
+            rate = await batched(user_id, args.rows, batch_size)
+            print(f"{f'ndjson ingest, batch {batch_size}':<32} {args.rows:>8} {rate:>10.0f}")
+    finally:
+        if not args.keep:
+            async with db_session.async_engine.begin() as conn:
+                await conn.execute(text("DELETE FROM users WHERE username = 'bench_ingest'"))
+        await db_session.dispose_engines()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=200_000, help="Rows per batched run")
+    parser.add_argument("--single-rows", type=int, default=5_000, help="Rows for the row-at-a-time baselines")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[100, 1000, 5000])
+    parser.add_argument("--keep", action="store_true", help="Keep the inserted rows")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Event-loop lag under concurrent logins, before and after moving bcrypt off the loop.
+
+Run from the Server directory:
+    python -m benchmarks.bench_password_hashing --logins 50
+
+"inline" calls passlib directly inside the coroutine (the old behaviour),
+"pool" goes through app.core.hashing. No database is needed.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from app.core import security
+from app.core.hashing import PasswordHasher
+
+TICK_SECONDS = 0.005
+
+
+async def measure_lag(stop: asyncio.Event, samples: list):
+    # A healthy loop wakes this task every TICK_SECONDS; anything beyond that is lag
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(TICK_SECONDS)
+        samples.append(time.perf_counter() - started - TICK_SECONDS)
+
+
+async def login_inline(password: str, hashed: str):
+    return security.verify_password(password, hashed)
+
+
+async def run(mode: str, logins: int, workers: int) -> dict:
+    hashed = security.get_password_hash("correct horse battery staple")
+    hasher = PasswordHasher(max_workers=workers, max_queue=logins)
+    if mode == "pool":
+        await hasher.start()
+
+    async def login():
+        if mode == "pool":
+            return await hasher.verify_and_update("correct horse battery staple", hashed)
+        return await login_inline("correct horse battery staple", hashed)
+
+    stop = asyncio.Event()
+    samples: list = []
+    ticker = asyncio.create_task(measure_lag(stop, samples))
+    await asyncio.sleep(TICK_SECONDS * 2)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(login() for _ in range(logins)))
+    elapsed = time.perf_counter() - started
+
+    stop.set()
+    await ticker
+    hasher.shutdown()
+
+    samples.sort()
+    return {
+        "mode": mode,
+        "logins": logins,
+        "elapsed_s": round(elapsed, 3),
+        "lag_p50_ms": round(statistics.median(samples) * 1000, 2),
+        "lag_p99_ms": round(samples[int(len(samples) * 0.99) - 1] * 1000, 2) if len(samples) > 1 else None,
+        "lag_max_ms": round(samples[-1] * 1000, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=50)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    for mode in ("inline", "pool"):
+        result = asyncio.run(run(mode, args.logins, args.workers))
+        print(result)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+User endpoint throughput: response_model validation + the stdlib JSON encoder (before) vs.
+returning rows through app.api.responses (after).
+
+Part one needs nothing: it serializes user rows both ways. Part two drives GET /users/{id},
+GET /users/me and PUT /users/{id} in-process over ASGI and needs a database with sql/tables.sql
+applied (DATABASE_URL); the "before" routes are the previous implementations, mounted next to
+the real ones for the run. Run from the Server directory:
+    python -m benchmarks.bench_user_endpoints --requests 3000
+"""
+import argparse
+import asyncio
+import time
+import uuid
+from datetime import datetime, timezone
+
+from fastapi import APIRouter, Depends
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+from pydantic import UUID4
+from sqlalchemy import text
+
+from app.api import deps
+from app.api.responses import FastJSONResponse, serializer_for
+from app.core import security
+from app.crud import crud_user
+from app.db import session as db_session
+from app.main import app
+from app.models.user import User, UserUpdate, Principal
+from benchmarks.asgi import lifespan, request
+
+LEGACY_PREFIX = "/api/v1/bench-legacy-users"
+
+
+def legacy_router() -> APIRouter:
+    """The user endpoints as they were: build User(**row), let response_model re-validate and encode it."""
+    router = APIRouter()
+
+    @router.get("/me/", response_model=User, response_class=JSONResponse)
+    async def read_users_me(current_user: User = Depends(deps.get_current_active_user)):
+        return current_user
+
+    @router.get("/{user_id}", response_model=User, response_class=JSONResponse)
+    async def read_user_by_id(user_id: UUID4, db=Depends(deps.get_read_db_session)):
+        return User(**await crud_user.get_user_by_id(db, user_id=user_id))
+
+    @router.put("/{user_id}", response_model=User, response_class=JSONResponse)
+    async def update_user_details(
+        user_id: UUID4, user_in: UserUpdate, db=Depends(deps.get_db_session),
+        current_user: Principal = Depends(deps.get_current_principal),
+    ):
+        return User(**await crud_user.update_user(db=db, user_id=user_id, user_in=user_in))
+
+    return router
+
+
+def sample_row():
+    now = datetime.now(timezone.utc)
+    return {
+        "id": uuid.uuid4(), "username": "bench_user", "email": "bench_user@example.com", "role": "user",
+        "password_hash": "$2b$12$" + "x" * 53, "created_at": now, "updated_at": now,
+    }
+
+
+async def bench_serialization(iterations: int) -> None:
+    row = sample_row()
+    field = create_response_field(name="response", type_=User)
+
+    started = time.perf_counter()
+    for _ in range(iterations):
+        content = await serialize_response(field=field, response_content=User(**row))
+        JSONResponse(content).body
+    before = iterations / (time.perf_counter() - started)
+
+    serialize = serializer_for(User)
+    started = time.perf_counter()
+    for _ in range(iterations):
+        FastJSONResponse(serialize(row)).body
+    after = iterations / (time.perf_counter() - started)
+    print(f"serialize one user: before {before:,.0f}/s, after {after:,.0f}/s ({after / before:.1f}x)")
+
+
+async def throughput(method: str, path: str, headers, json_body, count: int) -> float:
+    started = time.perf_counter()
+    for _ in range(count):
+        response = await request(app, method, path, headers=headers, json_body=json_body)
+        assert response.status_code == 200, response.content
+    return count / (time.perf_counter() - started)
+
+
+async def bench_endpoints(count: int) -> None:
+    app.include_router(legacy_router(), prefix=LEGACY_PREFIX)
+    async with lifespan(app):
+        async with db_session.async_engine.begin() as conn:
+            await conn.execute(text("DELETE FROM users WHERE username LIKE 'bench_user_%'"))
+            row = (await conn.execute(text("""
+                INSERT INTO users (username, email, password_hash)
+                VALUES ('bench_user_1', 'bench_user_1@example.com', 'x')
+                RETURNING id, username, role
+            """))).fetchone()
+        headers = {"Authorization": f"Bearer {security.create_access_token(row.username, row.id, row.role)}"}
+        try:
+            cases = [
+                ("GET /users/{id}", "GET", f"/{row.id}", None),
+                ("GET /users/me", "GET", "/me/", None),
+                ("PUT /users/{id}", "PUT", f"/{row.id}", {"role": "user"}),
+            ]
+            for label, method, path, body in cases:
+                # Warm up both, then alternate so drift affects them equally
+                await throughput(method, LEGACY_PREFIX + path, headers, body, 50)
+                await throughput(method, "/api/v1/users" + path, headers, body, 50)
+                before = after = 0.0
+                for _ in range(3):
+                    before += await throughput(method, LEGACY_PREFIX + path, headers, body, count // 3)
+                    after += await throughput(method, "/api/v1/users" + path, headers, body, count // 3)
+                print(f"{label:<16} before {before / 3:,.0f} req/s, after {after / 3:,.0f} req/s "
+                      f"({after / before:.2f}x)")
+        finally:
+            async with db_session.async_engine.begin() as conn:
+                await conn.execute(text("DELETE FROM users WHERE username LIKE 'bench_user_%'"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=50000, help="Rows serialized per variant")
+    parser.add_argument("--requests", type=int, default=3000, help="Requests per endpoint and variant")
+    parser.add_argument("--no-db", action="store_true", help="Only the serialization part")
+    args = parser.parse_args()
+    asyncio.run(bench_serialization(args.iterations))
+    if not args.no_db:
+        asyncio.run(bench_endpoints(args.requests))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Users-by-id lookups from many concurrent requests: one SELECT per request (before) vs. the
+batching, singleflight user loader in app.crud.crud_user (after).
+
+Seeds --users users, then runs waves of --concurrency lookups at once, ids drawn so that a few
+users are hot (like authors on a busy feed). Reports lookups/s and how many queries each
+variant sent. Needs a database with sql/tables.sql applied (DATABASE_URL). Run from the
+Server directory:
+    python -m benchmarks.bench_user_loader --concurrency 200 --waves 50
+"""
+import argparse
+import asyncio
+import random
+import time
+
+from sqlalchemy import text
+
+from app.crud import crud_user
+from app.crud.base import statements
+from app.db import session as db_session
+
+
+async def direct(user_id):
+    async with db_session.ReadOnlySessionLocal() as db:
+        return await crud_user.get_user_by_id(db, user_id)
+
+
+def queries_sent() -> int:
+    stats = statements.stats()
+    return sum(stats.get(name, {}).get("calls", 0) for name in ("users.get_by_id", "users.get_many_by_id"))
+
+
+async def run(label: str, lookup, waves, repeat: int) -> None:
+    for wave in waves[:3]: # Warm up connections and prepared statements
+        await asyncio.gather(*(lookup(user_id) for user_id in wave))
+    queries_before = queries_sent()
+    started = time.perf_counter()
+    lookups = 0
+    for _ in range(repeat):
+        for wave in waves:
+            results = await asyncio.gather(*(lookup(user_id) for user_id in wave))
+            assert all(result is not None for result in results)
+            lookups += len(wave)
+    elapsed = time.perf_counter() - started
+    queries = queries_sent() - queries_before
+    print(f"{label:<7} {lookups / elapsed:>9,.0f} lookups/s, {queries:>6} queries ({lookups / queries:.1f} lookups/query)")
+
+
+async def bench(users: int, concurrency: int, wave_count: int, repeat: int) -> None:
+    db_session.init_engines()
+    try:
+        async with db_session.async_engine.begin() as conn:
+            await conn.execute(text("DELETE FROM users WHERE username LIKE 'bench_loader_%'"))
+            result = await conn.execute(text("""
+                INSERT INTO users (username, email, password_hash)
+                SELECT 'bench_loader_' || n, 'bench_loader_' || n || '@example.com', 'x'
+                FROM generate_series(1, :users) AS n
+                RETURNING id
+            """), {"users": users})
+            ids = [row.id for row in result]
+
+        rng = random.Random(42)
+        weights = [1 / (rank + 1) for rank in range(len(ids))] # Zipf-like: a few hot users
+        waves = [rng.choices(ids, weights, k=concurrency) for _ in range(wave_count)]
+        print(f"{users} users, {wave_count} waves of {concurrency} concurrent lookups")
+        await run("before", direct, waves, repeat)
+        await run("after", crud_user.load_user, waves, repeat)
+    finally:
+        async with db_session.async_engine.begin() as conn:
+            await conn.execute(text("DELETE FROM users WHERE username LIKE 'bench_loader_%'"))
+        await db_session.dispose_engines()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=200, help="Lookups started at once per wave")
+    parser.add_argument("--waves", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    asyncio.run(bench(args.users, args.concurrency, args.waves, args.repeat))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""
+In-process stand-in for the CRUD functions behind the auth and user endpoints, for benchmarks
+that should measure the app (routing, dependencies, JWT, bcrypt, serialization) without a
+database. `CrudStandIn.install()` swaps the module attributes the endpoints call and returns a
+function that puts the originals back.
+
+Write your own by subclassing CrudStandIn (or any class with an `install()` like it) and pass
+it as `--backend package.module:ClassName`.
+"""
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+from app.core.hashing import hash_password
+from app.core.security import TokenPayload, create_refresh_token
+from app.crud import crud_refresh_token, crud_user
+from app.models.user import UserCreate, UserUpdate
+
+_PUBLIC_FIELDS = ("id", "username", "email", "role", "created_at", "updated_at")
+
+
+def _public(user: Dict[str, Any]) -> Dict[str, Any]:
+    return {field: user[field] for field in _PUBLIC_FIELDS}
+
+
+class CrudStandIn:
+    """Users and refresh tokens kept in dicts, with the same behaviour the endpoints rely on."""
+
+    def __init__(self):
+        self.users: Dict[uuid.UUID, Dict[str, Any]] = {}
+        self.by_username: Dict[str, Dict[str, Any]] = {}
+        self.emails: set = set()
+        self.tokens: Dict[str, Dict[str, Any]] = {} # token hash -> user_id, family_id, revoked
+
+    # crud_user
+
+    async def create_user(self, db, user_in: UserCreate) -> Dict[str, Any]:
+        if user_in.username in self.by_username:
+            raise crud_user.UserAlreadyExistsError("username")
+        if user_in.email in self.emails:
+            raise crud_user.UserAlreadyExistsError("email")
+        password_hash = await hash_password(user_in.password)
+        now = datetime.now(timezone.utc)
+        user = {
+            "id": uuid.uuid4(), "username": user_in.username, "email": user_in.email,
+            "password_hash": password_hash, "role": user_in.role or "user", "created_at": now, "updated_at": now,
+        }
+        self.users[user["id"]] = self.by_username[user["username"]] = user
+        self.emails.add(user["email"])
+        return _public(user)
+
+    async def get_user_by_username(self, db, username: str) -> Optional[Dict[str, Any]]:
+        user = self.by_username.get(username)
+        return dict(user) if user else None
+
+    async def get_user_by_id(self, db, user_id: uuid.UUID) -> Optional[Dict[str, Any]]:
+        user = self.users.get(user_id)
+        return dict(user) if user else None
+
+    async def load_user(self, user_id: uuid.UUID) -> Optional[Dict[str, Any]]:
+        user = self.users.get(user_id)
+        return _public(user) if user else None
+
+    async def load_principal(self, user_id: uuid.UUID) -> Optional[Dict[str, Any]]:
+        return await self.load_user(user_id)
+
+    async def load_users(self, user_ids: List[uuid.UUID]) -> Dict[uuid.UUID, Dict[str, Any]]:
+        return {user_id: _public(self.users[user_id]) for user_id in user_ids if user_id in self.users}
+
+    async def get_user_version(self, db, user_id: uuid.UUID) -> Optional[datetime]:
+        user = self.users.get(user_id)
+        return user["updated_at"] if user else None
+
+    async def update_user(self, db, user_id: uuid.UUID, user_in: UserUpdate) -> Optional[Dict[str, Any]]:
+        user = self.users.get(user_id)
+        if user is None:
+            return None
+        changes = user_in.dict(exclude_none=True)
+        if "username" in changes:
+            del self.by_username[user["username"]]
+            self.by_username[changes["username"]] = user
+        user.update(changes, updated_at=datetime.now(timezone.utc))
+        crud_user.principal_cache.invalidate(user_id)
+        return _public(user)
+
+    async def update_user_password_hash(self, db, user_id: uuid.UUID, password_hash: str) -> None:
+        self.users[user_id]["password_hash"] = password_hash
+
+    # crud_refresh_token
+
+    def _new_token(self, user: Dict[str, Any], family_id: uuid.UUID) -> str:
+        token = create_refresh_token(user_id=user["id"], expires_delta=timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS))
+        self.tokens[crud_refresh_token.hash_token(token)] = {
+            "user_id": user["id"], "family_id": family_id, "revoked": False,
+        }
+        return token
+
+    async def issue_refresh_token(self, db, user_id: uuid.UUID) -> str:
+        return self._new_token(self.users[user_id], uuid.uuid4())
+
+    async def rotate_refresh_token(
+        self, db, token: str, payload: TokenPayload
+    ) -> Optional[Tuple[Dict[str, Any], str]]:
+        stored = self.tokens.get(crud_refresh_token.hash_token(token))
+        if stored is None:
+            return None
+        if stored["revoked"]:
+            self._revoke(lambda entry: entry["family_id"] == stored["family_id"])
+            raise crud_refresh_token.RefreshTokenReuseError()
+        stored["revoked"] = True
+        user = self.users[stored["user_id"]]
+        return {"id": user["id"], "username": user["username"], "role": user["role"]}, self._new_token(
+            user, stored["family_id"]
+        )
+
+    async def revoke_refresh_tokens(self, db, user_id: uuid.UUID, token: Optional[str] = None) -> int:
+        if token is None:
+            return self._revoke(lambda entry: entry["user_id"] == user_id)
+        stored = self.tokens.get(crud_refresh_token.hash_token(token))
+        if stored is None or stored["user_id"] != user_id:
+            return 0
+        return self._revoke(lambda entry: entry["family_id"] == stored["family_id"])
+
+    def _revoke(self, match: Callable[[Dict[str, Any]], bool]) -> int:
+        revoked = 0
+        for entry in self.tokens.values():
+            if not entry["revoked"] and match(entry):
+                entry["revoked"] = True
+                revoked += 1
+        return revoked
+
+    # Wiring
+
+    PATCHED = {
+        crud_user: (
+            "create_user", "get_user_by_username", "get_user_by_id", "load_user", "load_users", "load_principal",
+            "get_user_version", "update_user", "update_user_password_hash",
+        ),
+        crud_refresh_token: ("issue_refresh_token", "rotate_refresh_token", "revoke_refresh_tokens"),
+    }
+
+    def install(self) -> Callable[[], None]:
+        originals = []
+        for module, names in self.PATCHED.items():
+            for name in names:
+                originals.append((module, name, getattr(module, name)))
+                setattr(module, name, getattr(self, name))
+
+        def uninstall():
+            for module, name, original in originals:
+                setattr(module, name, original)
+        return uninstall
@@ -57,7 +57,7 @@ BEFORE UPDATE ON posts
 FOR EACH ROW
 EXECUTE PROCEDURE trigger_set_timestamp();
 CREATE INDEX idx_posts_user_id ON posts(user_id);
-CREATE INDEX idx_posts_created_at ON posts(created_at DESC); -- For feed ordering
+CREATE INDEX idx_posts_created_at ON posts(created_at DESC, id DESC); -- For feed ordering (keyset pagination on created_at, id)
 
 -- Comments Table
 CREATE TABLE comments (
@@ -87,6 +87,13 @@ CREATE TABLE likes (
 CREATE INDEX idx_likes_post_id ON likes(post_id);
 CREATE INDEX idx_likes_user_id ON likes(user_id);
 
+-- Denormalized like counts, maintained by the batched like flusher (app/crud/crud_like.py)
+-- Kept out of `posts` so count changes don't fire set_timestamp_posts or contend with post edits.
+CREATE TABLE post_like_counts (
+    post_id UUID PRIMARY KEY REFERENCES posts(id) ON DELETE CASCADE,
+    like_count INTEGER NOT NULL DEFAULT 0
+);
+
 -- Workouts Table
 CREATE TABLE workouts (
     id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
@@ -100,7 +107,8 @@ CREATE TRIGGER set_timestamp_workouts
 BEFORE UPDATE ON workouts
 FOR EACH ROW
 EXECUTE PROCEDURE trigger_set_timestamp();
-CREATE INDEX idx_workouts_user_id ON workouts(user_id);
+-- Serves a user's workouts newest first with keyset pagination
+CREATE INDEX idx_workouts_user_id_created_at ON workouts(user_id, created_at DESC, id DESC);
 
 -- Exercises Table
 CREATE TABLE exercises (
@@ -120,7 +128,10 @@ CREATE TRIGGER set_timestamp_exercises
 BEFORE UPDATE ON exercises
 FOR EACH ROW
 EXECUTE PROCEDURE trigger_set_timestamp();
-CREATE INDEX idx_exercises_workout_id ON exercises(workout_id);
+CREATE INDEX idx_exercises_workout_id ON exercises(workout_id, order_in_workout);
+-- Exercise catalog search: incremental refresh, and recounting a name (same expression as crud_exercise)
+CREATE INDEX idx_exercises_updated_at ON exercises(updated_at);
+CREATE INDEX idx_exercises_name_key ON exercises ((btrim(regexp_replace(lower(name), '[^0-9a-z]+', ' ', 'g'))));
 
 -- HealthLogs Table
 CREATE TABLE health_logs (
@@ -138,7 +149,24 @@ FOR EACH ROW
 EXECUTE PROCEDURE trigger_set_timestamp();
 CREATE INDEX idx_health_logs_user_id ON health_logs(user_id);
 CREATE INDEX idx_health_logs_log_date ON health_logs(log_date DESC);
-CREATE INDEX idx_health_logs_user_id_log_type ON health_logs(user_id, log_type);
+-- One sample per (user, type, timestamp): bulk ingest dedupes on this with ON CONFLICT DO NOTHING.
+-- Also serves (user_id, log_type) lookups and range scans by log_date.
+CREATE UNIQUE INDEX idx_health_logs_user_id_log_type_log_date ON health_logs(user_id, log_type, log_date);
+
+-- Day/week/month aggregates of health_logs.value, in UTC buckets (weeks start on Monday).
+-- Kept up to date by the ingest statement (app/crud/crud_health_log.py) from the rows it actually
+-- inserts, so late or out-of-order samples just merge into their bucket. avg = value_sum / value_count.
+CREATE TABLE health_log_rollups (
+    user_id UUID NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    log_type VARCHAR(100) NOT NULL,
+    bucket VARCHAR(10) NOT NULL CHECK (bucket IN ('day', 'week', 'month')),
+    bucket_start TIMESTAMPTZ NOT NULL,
+    value_count INTEGER NOT NULL,
+    value_sum DOUBLE PRECISION NOT NULL,
+    value_min DOUBLE PRECISION NOT NULL,
+    value_max DOUBLE PRECISION NOT NULL,
+    PRIMARY KEY (user_id, log_type, bucket, bucket_start)
+);
 
 -- FoodLogs Table
 CREATE TABLE food_logs (
@@ -160,34 +188,54 @@ CREATE TRIGGER set_timestamp_food_logs
 BEFORE UPDATE ON food_logs
 FOR EACH ROW
 EXECUTE PROCEDURE trigger_set_timestamp();
-CREATE INDEX idx_food_logs_user_id ON food_logs(user_id);
+CREATE INDEX idx_food_logs_user_id_log_date ON food_logs(user_id, log_date);
 CREATE INDEX idx_food_logs_log_date ON food_logs(log_date DESC);
 
+-- Per-user, per-day (UTC), per-meal nutrition totals. Every food_logs write in app/crud/crud_food_log.py
+-- applies its delta here in the same statement; rebuild with `python -m app.commands.rebuild_food_totals`.
+-- meal_type is '' for items logged without one. NULL nutrients count as 0.
+CREATE TABLE food_log_daily_totals (
+    user_id UUID NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    log_day DATE NOT NULL,
+    meal_type VARCHAR(50) NOT NULL DEFAULT '',
+    item_count INTEGER NOT NULL DEFAULT 0,
+    calories DOUBLE PRECISION NOT NULL DEFAULT 0,
+    protein DOUBLE PRECISION NOT NULL DEFAULT 0,
+    carbs DOUBLE PRECISION NOT NULL DEFAULT 0,
+    fat DOUBLE PRECISION NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, log_day, meal_type)
+);
+
 -- DietRecommendations Table
 CREATE TABLE diet_recommendations (
     id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
     user_id UUID NOT NULL REFERENCES users(id) ON DELETE CASCADE,
     recommendation TEXT NOT NULL, -- Could be JSON for structured recommendations
+    input_hash VARCHAR(64), -- sha256 of the generator name and its inputs; identical inputs reuse this row
     generated_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
     created_at TIMESTAMPTZ DEFAULT NOW() -- 'generated_at' is specific to the AI process
     -- No updated_at, recommendations are generated, not typically updated
 );
-CREATE INDEX idx_diet_recommendations_user_id ON diet_recommendations(user_id);
+CREATE INDEX idx_diet_recommendations_user_id_input_hash ON diet_recommendations(user_id, input_hash);
 CREATE INDEX idx_diet_recommendations_generated_at ON diet_recommendations(generated_at DESC);
 
 -- Future tables (placeholder ideas)
 -- CREATE TABLE music_playlists (...)
 -- CREATE TABLE videos (...)
 
--- Optional: Table for refresh tokens if you implement more robust refresh token logic
+-- Refresh tokens (sha256 of the token, never the token itself). Each refresh revokes the token
+-- used and issues the next one in the same family; a revoked token coming back revokes the family.
 CREATE TABLE refresh_tokens (
     id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
     user_id UUID NOT NULL REFERENCES users(id) ON DELETE CASCADE,
     token_hash VARCHAR(255) NOT NULL UNIQUE, -- Store hash of the refresh token
+    family_id UUID NOT NULL, -- Shared by all tokens rotated from one login
     expires_at TIMESTAMPTZ NOT NULL,
     created_at TIMESTAMPTZ DEFAULT NOW(),
     revoked_at TIMESTAMPTZ NULL -- To mark if the token has been revoked
 );
 CREATE INDEX idx_refresh_tokens_user_id ON refresh_tokens(user_id);
+CREATE INDEX idx_refresh_tokens_family_id ON refresh_tokens(family_id);
+CREATE INDEX idx_refresh_tokens_expires_at ON refresh_tokens(expires_at); -- Purge of expired rows
 
 COMMIT;
\ No newline at end of file
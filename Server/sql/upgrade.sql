@@ -0,0 +1,97 @@
+-- Brings a database created from an earlier sql/tables.sql up to the current schema, with the
+-- data the new tables derive from what is already there. New databases only need tables.sql.
+-- Safe to run more than once. Index builds hold write locks on their table: run it while the
+-- app is stopped or quiet.
+--     psql -U your_postgres_user -d fitness_app -f sql/upgrade.sql
+
+BEGIN;
+
+-- Feed: keyset pagination on (created_at, id)
+DROP INDEX IF EXISTS idx_posts_created_at;
+CREATE INDEX idx_posts_created_at ON posts(created_at DESC, id DESC);
+
+-- Like counts, seeded from the likes already there (a no-op for posts that have a count)
+CREATE TABLE IF NOT EXISTS post_like_counts (
+    post_id UUID PRIMARY KEY REFERENCES posts(id) ON DELETE CASCADE,
+    like_count INTEGER NOT NULL DEFAULT 0
+);
+INSERT INTO post_like_counts (post_id, like_count)
+SELECT post_id, count(*) FROM likes GROUP BY post_id
+ON CONFLICT (post_id) DO NOTHING;
+
+-- Health logs: one sample per (user, type, timestamp), which bulk ingest dedupes on. Duplicates
+-- logged before have to go first; the earliest recorded one of each is kept.
+DELETE FROM health_logs
+WHERE id IN (
+    SELECT id FROM (
+        SELECT id, row_number() OVER (PARTITION BY user_id, log_type, log_date ORDER BY created_at, id) AS n
+        FROM health_logs
+    ) ranked
+    WHERE n > 1
+);
+DROP INDEX IF EXISTS idx_health_logs_user_id_log_type;
+CREATE UNIQUE INDEX IF NOT EXISTS idx_health_logs_user_id_log_type_log_date ON health_logs(user_id, log_type, log_date);
+
+-- Health log rollups, built from the (deduplicated) samples already there
+CREATE TABLE IF NOT EXISTS health_log_rollups (
+    user_id UUID NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    log_type VARCHAR(100) NOT NULL,
+    bucket VARCHAR(10) NOT NULL CHECK (bucket IN ('day', 'week', 'month')),
+    bucket_start TIMESTAMPTZ NOT NULL,
+    value_count INTEGER NOT NULL,
+    value_sum DOUBLE PRECISION NOT NULL,
+    value_min DOUBLE PRECISION NOT NULL,
+    value_max DOUBLE PRECISION NOT NULL,
+    PRIMARY KEY (user_id, log_type, bucket, bucket_start)
+);
+INSERT INTO health_log_rollups (user_id, log_type, bucket, bucket_start, value_count, value_sum, value_min, value_max)
+SELECT h.user_id, h.log_type, b.bucket, date_trunc(b.bucket, h.log_date, 'UTC'), count(*), sum(h.value), min(h.value), max(h.value)
+FROM health_logs h CROSS JOIN (VALUES ('day'), ('week'), ('month')) AS b(bucket)
+GROUP BY 1, 2, 3, 4
+ON CONFLICT DO NOTHING;
+
+-- Food logs: per-day totals, built from the items already logged (same as
+-- `python -m app.commands.rebuild_food_totals`, which can redo it later)
+DROP INDEX IF EXISTS idx_food_logs_user_id;
+CREATE INDEX IF NOT EXISTS idx_food_logs_user_id_log_date ON food_logs(user_id, log_date);
+CREATE TABLE IF NOT EXISTS food_log_daily_totals (
+    user_id UUID NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    log_day DATE NOT NULL,
+    meal_type VARCHAR(50) NOT NULL DEFAULT '',
+    item_count INTEGER NOT NULL DEFAULT 0,
+    calories DOUBLE PRECISION NOT NULL DEFAULT 0,
+    protein DOUBLE PRECISION NOT NULL DEFAULT 0,
+    carbs DOUBLE PRECISION NOT NULL DEFAULT 0,
+    fat DOUBLE PRECISION NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, log_day, meal_type)
+);
+INSERT INTO food_log_daily_totals (user_id, log_day, meal_type, item_count, calories, protein, carbs, fat)
+SELECT user_id, CAST(log_date AT TIME ZONE 'UTC' AS date), COALESCE(meal_type, ''), count(*),
+    COALESCE(sum(calories), 0), COALESCE(sum(protein), 0), COALESCE(sum(carbs), 0), COALESCE(sum(fat), 0)
+FROM food_logs
+GROUP BY 1, 2, 3
+ON CONFLICT DO NOTHING;
+
+-- Diet recommendations: reuse by input hash (older rows have none and are never reused)
+ALTER TABLE diet_recommendations ADD COLUMN IF NOT EXISTS input_hash VARCHAR(64);
+DROP INDEX IF EXISTS idx_diet_recommendations_user_id;
+CREATE INDEX IF NOT EXISTS idx_diet_recommendations_user_id_input_hash ON diet_recommendations(user_id, input_hash);
+
+-- Workouts: a user's workouts newest first (keyset pagination), exercises in workout order
+DROP INDEX IF EXISTS idx_workouts_user_id;
+CREATE INDEX IF NOT EXISTS idx_workouts_user_id_created_at ON workouts(user_id, created_at DESC, id DESC);
+DROP INDEX IF EXISTS idx_exercises_workout_id;
+CREATE INDEX idx_exercises_workout_id ON exercises(workout_id, order_in_workout);
+
+-- Exercise name search: incremental refresh, and recounting a name
+CREATE INDEX IF NOT EXISTS idx_exercises_updated_at ON exercises(updated_at);
+CREATE INDEX IF NOT EXISTS idx_exercises_name_key ON exercises ((btrim(regexp_replace(lower(name), '[^0-9a-z]+', ' ', 'g'))));
+
+-- Refresh token families. Rows stored before have no family: each becomes its own.
+ALTER TABLE refresh_tokens ADD COLUMN IF NOT EXISTS family_id UUID;
+UPDATE refresh_tokens SET family_id = id WHERE family_id IS NULL;
+ALTER TABLE refresh_tokens ALTER COLUMN family_id SET NOT NULL;
+CREATE INDEX IF NOT EXISTS idx_refresh_tokens_family_id ON refresh_tokens(family_id);
+CREATE INDEX IF NOT EXISTS idx_refresh_tokens_expires_at ON refresh_tokens(expires_at);
+
+COMMIT;